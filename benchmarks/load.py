@@ -0,0 +1,168 @@
+"""
+Teste de carga assíncrono da API de produtos.
+
+Dispara uma mistura configurável de operações (create, get, list, patch,
+delete) com N clientes concorrentes e reporta, em JSON, as requisições por
+segundo e as latências p50/p95/p99 de cada operação, para comparar commits.
+
+Por padrão, o app ASGI roda no mesmo processo (sem rede), com o repositório
+em memória ou com o MongoDB configurado no .env. Com --url, a carga vai para
+uma API já em execução.
+
+Uso: python -m benchmarks.load [--requests 5000] [--concurrency 32]
+         [--mix create=1,get=6,list=2,patch=1,delete=0.5]
+         [--backend memory|mongo] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_MIX = "create=1,get=6,list=2,patch=1,delete=0.5"
+OPERATIONS = ("create", "get", "list", "patch", "delete")
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # Percentil por posição mais próxima (nearest-rank) sobre valores já ordenados
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+def random_product(rng: random.Random) -> dict:
+    return {
+        "name": f"Produto {rng.randrange(1_000_000)}",
+        "quantity": rng.randrange(1000),
+        "price": round(rng.uniform(1, 5000), 2),
+    }
+
+class LoadRun:
+    """
+    Estado compartilhado entre os clientes: IDs conhecidos e latências por operação.
+    """
+    def __init__(self, client: httpx.AsyncClient, weights: Dict[str, float], requests: int, seed: int):
+        self.client = client
+        self.names = list(weights)
+        self.weights = list(weights.values())
+        self.remaining = requests
+        self.rng = random.Random(seed)
+        self.ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def seed_products(self, count: int) -> None:
+        for start in range(0, count, 1000):
+            body = [random_product(self.rng) for _ in range(min(1000, count - start))]
+            response = await self.client.post("/products/bulk", json=body)
+            response.raise_for_status()
+            self.ids.extend(item["id"] for item in response.json()["items"] if item["success"])
+
+    async def request(self, operation: str) -> None:
+        rng = self.rng
+        if operation in ("get", "patch", "delete") and not self.ids:
+            operation = "create"
+
+        start = time.perf_counter()
+        if operation == "create":
+            response = await self.client.post("/products/", json=random_product(rng))
+        elif operation == "get":
+            response = await self.client.get(f"/products/{rng.choice(self.ids)}")
+        elif operation == "list":
+            response = await self.client.get("/products/", params={"limit": 50, "sort_by": "price"})
+        elif operation == "patch":
+            response = await self.client.patch(f"/products/{rng.choice(self.ids)}", json={"price": round(rng.uniform(1, 5000), 2)})
+        else:
+            # Remove da lista antes de enviar para que nenhum outro cliente use o ID
+            product_id = self.ids.pop(rng.randrange(len(self.ids)))
+            response = await self.client.delete(f"/products/{product_id}")
+        elapsed = time.perf_counter() - start
+
+        self.latencies[operation].append(elapsed)
+        if response.status_code >= 400:
+            self.errors[operation] += 1
+        elif operation == "create":
+            self.ids.append(response.json()["id"])
+
+    async def worker(self) -> None:
+        while self.remaining > 0:
+            self.remaining -= 1
+            await self.request(self.rng.choices(self.names, self.weights)[0])
+
+async def run(requests: int, concurrency: int, mix: str, seed_products: int, seed: int, backend: str, url: Optional[str]) -> dict:
+    weights = parse_mix(mix)
+    startup = shutdown = None
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=30)
+    else:
+        # As configurações são lidas na importação do app
+        os.environ["PRODUCT_REPOSITORY"] = backend
+        from src.database import db_client
+        from src.main import app, shutdown_event, startup_event
+        startup, shutdown = startup_event, shutdown_event
+        await startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=30)
+
+    try:
+        load = LoadRun(client, weights, requests, seed)
+        await load.seed_products(seed_products)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(load.worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.aclose()
+        if shutdown is not None:
+            await shutdown()
+
+    total = sum(len(values) for values in load.latencies.values())
+    return {
+        "target": url or f"in-process ({backend})",
+        "concurrency": concurrency,
+        "requests": total,
+        "duration_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "endpoints": {
+            operation: summarize(load.latencies[operation], load.errors[operation], elapsed)
+            for operation in OPERATIONS if operation in load.latencies
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API de produtos com latências por operação.")
+    parser.add_argument("--requests", type=int, default=5000, help="Total de requisições medidas")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes concorrentes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Pesos das operações (padrão: {DEFAULT_MIX})")
+    parser.add_argument("--seed-products", type=int, default=1000, help="Produtos criados antes da medição")
+    parser.add_argument("--seed", type=int, default=42, help="Semente da escolha de operações e dados")
+    parser.add_argument("--backend", choices=("memory", "mongo"), default="memory", help="Repositório do app em processo")
+    parser.add_argument("--url", default=None, help="URL de uma API em execução (ignora --backend)")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.requests, args.concurrency, args.mix, args.seed_products, args.seed, args.backend, args.url))
+    print(json.dumps(result, indent=2))
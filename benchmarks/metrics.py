@@ -0,0 +1,96 @@
+"""
+Benchmark do custo das métricas por requisição.
+
+Chama diretamente, via ASGI e sem rede, um app FastAPI mínimo com e sem o
+MetricsMiddleware e reporta a diferença por requisição, além do custo de um
+Histogram.observe isolado. Sem banco de dados: mede apenas a instrumentação.
+
+Os dois apps são aquecidos e depois medidos em rodadas alternadas (a ordem
+inverte a cada rodada), no mesmo event loop; o resultado é a mediana das
+diferenças por rodada, para que a ordem de execução não vire "custo".
+
+Uso: python -m benchmarks.metrics [--requests 20000] [--rounds 9] [--warmup 2000]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from src.core.metrics import Histogram, MetricsMiddleware
+
+def make_app(with_metrics: bool):
+    app = FastAPI()
+
+    @app.get("/products/{id}")
+    async def get_product(id: str):
+        return {"id": id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware, histogram=Histogram("bench_seconds", "Benchmark", ("method", "route", "status")))
+    return app
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/products/42", "raw_path": b"/products/42",
+        "root_path": "", "query_string": b"", "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - start
+
+async def interleaved(baseline_app, instrumented_app, requests: int, rounds: int, warmup: int) -> tuple:
+    """
+    Mede os dois apps em rodadas alternadas; retorna os tempos de cada um por rodada.
+    """
+    for app in (baseline_app, instrumented_app):
+        await drive(app, warmup)  # aquecimento (montagem da pilha de middlewares, caches do interpretador)
+
+    baseline, instrumented = [], []
+    for number in range(rounds):
+        order = [(baseline_app, baseline), (instrumented_app, instrumented)]
+        if number % 2:
+            order.reverse()
+        for app, times in order:
+            times.append(await drive(app, requests))
+    return baseline, instrumented
+
+def observe_cost(samples: int) -> float:
+    histogram = Histogram("observe_seconds", "Benchmark", ("route",))
+    start = time.perf_counter()
+    for i in range(samples):
+        histogram.observe(i % 100 / 1000, "/products/{id}")
+    return (time.perf_counter() - start) / samples
+
+def run(requests: int, rounds: int, warmup: int) -> dict:
+    baseline, instrumented = asyncio.run(interleaved(make_app(False), make_app(True), requests, rounds, warmup))
+    overhead = statistics.median(i - b for b, i in zip(baseline, instrumented))
+    baseline_median = statistics.median(baseline)
+    return {
+        "requests": requests,
+        "rounds": rounds,
+        "baseline_us_per_request": round(baseline_median / requests * 1e6, 3),
+        "instrumented_us_per_request": round(statistics.median(instrumented) / requests * 1e6, 3),
+        "overhead_us_per_request": round(overhead / requests * 1e6, 3),
+        "overhead_percent": round(overhead / baseline_median * 100, 2),
+        "observe_us": round(observe_cost(requests) * 1e6, 3),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o custo do MetricsMiddleware por requisição.")
+    parser.add_argument("--requests", type=int, default=20000, help="Requisições por rodada")
+    parser.add_argument("--rounds", type=int, default=9, help="Rodadas alternadas; a mediana das diferenças é reportada")
+    parser.add_argument("--warmup", type=int, default=2000, help="Requisições de aquecimento por app antes das rodadas")
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.rounds, args.warmup), indent=2))
@@ -0,0 +1,118 @@
+"""
+Relatório de escala: latência e memória de cada método do ProductUsecase
+conforme o catálogo cresce.
+
+Para cada tamanho N, popula um catálogo sintético (benchmarks.seed) e mede
+o melhor tempo e o pico de memória alocada (tracemalloc) de cada operação.
+A coluna 'slope' é o expoente estimado entre dois tamanhos consecutivos
+(log t2/t1 ÷ log N2/N1): ~0 para operações por índice, ~1 para operações
+que varrem a coleção. get_all e get_by_price_range devolvem uma fração
+fixa do catálogo, então slope ~1 é esperado nelas; get_page, get_by_id e
+update devem ficar perto de 0, e um slope perto de 1 nelas indica uma
+varredura acidental.
+
+Uso: python -m benchmarks.scaling [--sizes 1000,10000,100000] [--repeat 3]
+         [--backend memory|mongo] [--json]
+
+No backend mongo, usa a coleção 'products' de um banco separado (DB_NAME +
+'_bench'), que é apagada a cada tamanho.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.seed import seed_catalog
+from src.repositories.memory import InMemoryProductRepository
+from src.schemas.product import ProductUpdate
+from src.usecases.product import ProductUsecase
+
+async def measure(operation: Callable[[], Awaitable], repeat: int) -> Dict[str, float]:
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        await operation()
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {"ms": min(timings) * 1000, "peak_kb": peak / 1024}
+
+def operations(usecase: ProductUsecase, ids: list, rng: random.Random) -> Dict[str, Callable[[], Awaitable]]:
+    # Faixa estreita (~1% do catálogo, pela distribuição do gerador) e consultas pontuais
+    return {
+        "get_all": lambda: usecase.get_all(),
+        "get_by_price_range": lambda: usecase.get_by_price_range(min_price=89.0, max_price=91.0),
+        "get_page": lambda: usecase.get_page(limit=100, sort_by="price"),
+        "get_by_id": lambda: usecase.get_by_id(rng.choice(ids)),
+        "update": lambda: usecase.update(rng.choice(ids), ProductUpdate(price=round(rng.uniform(1, 500), 2))),
+    }
+
+async def _usecase(backend: str):
+    if backend == "memory":
+        return ProductUsecase(repository=InMemoryProductRepository()), None
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from src.database import client_options
+    from src.repositories.product import MongoProductRepository
+    from src.settings import Settings
+    from src.usecases.indexes import ensure_indexes
+
+    settings = Settings()
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options(settings))
+    database = client.get_database(f"{settings.DB_NAME}_bench")
+    await database.drop_collection("products")
+    await ensure_indexes(database)
+    return ProductUsecase(repository=MongoProductRepository(database.get_collection("products"))), client
+
+async def run(sizes: List[int], repeat: int, backend: str) -> List[dict]:
+    rows = []
+    previous: Dict[str, float] = {}
+    previous_size = None
+    for size in sizes:
+        usecase, client = await _usecase(backend)
+        try:
+            await seed_catalog(usecase, size)
+            page, _ = await usecase.get_page(limit=1000)
+            ids = [product.id for product in page]
+            rng = random.Random(size)
+            for name, operation in operations(usecase, ids, rng).items():
+                result = await measure(operation, repeat)
+                slope = None
+                if previous_size and previous.get(name):
+                    slope = math.log(result["ms"] / previous[name]) / math.log(size / previous_size)
+                rows.append({
+                    "size": size,
+                    "operation": name,
+                    "ms": round(result["ms"], 3),
+                    "peak_kb": round(result["peak_kb"], 1),
+                    "slope": round(slope, 2) if slope is not None else None,
+                })
+                previous[name] = result["ms"]
+        finally:
+            if client is not None:
+                client.close()
+        previous_size = size
+    return rows
+
+def format_table(rows: List[dict]) -> str:
+    lines = [f"{'N':>10}  {'operation':<20}{'ms':>12}{'peak KB':>12}{'slope':>8}"]
+    for row in rows:
+        slope = "" if row["slope"] is None else f"{row['slope']:.2f}"
+        lines.append(f"{row['size']:>10}  {row['operation']:<20}{row['ms']:>12.3f}{row['peak_kb']:>12.1f}{slope:>8}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede como cada método do ProductUsecase escala com o tamanho do catálogo.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tamanhos do catálogo, separados por vírgula")
+    parser.add_argument("--repeat", type=int, default=3, help="Rodadas por operação; o melhor tempo é reportado")
+    parser.add_argument("--backend", choices=("memory", "mongo"), default="memory", help="Repositório medido")
+    parser.add_argument("--json", action="store_true", help="Imprime as linhas em JSON em vez da tabela")
+    args = parser.parse_args()
+    result = asyncio.run(run([int(size) for size in args.sizes.split(",")], args.repeat, args.backend))
+    print(json.dumps(result, indent=2) if args.json else format_table(result))
@@ -0,0 +1,86 @@
+"""
+Gerador de catálogo sintético.
+
+Gera produtos realistas e reprodutíveis (mesma semente, mesmos dados):
+nomes combinando categoria, marca e variante, preços com distribuição
+log-normal (muitos itens baratos, poucos caros) e estoques variados.
+A carga usa ProductUsecase.create_many, em lotes de insert_many.
+
+Uso: python -m benchmarks.seed --count 100000 [--seed 42] [--chunk-size 1000]
+         [--drop]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Iterator, List
+
+from src.schemas.product import ProductIn
+from src.usecases.product import ProductUsecase
+
+CATEGORIES = [
+    "Smartphone", "Notebook", "Fone de Ouvido", "Monitor", "Teclado", "Mouse", "Cadeira", "Mesa",
+    "Café", "Chá", "Cafeteira", "Liquidificador", "Panela", "Tênis", "Camiseta", "Mochila",
+    "Livro", "Caneta", "Luminária", "Relógio",
+]
+BRANDS = ["Acme", "Nimbus", "Orion", "Vértice", "Aurora", "Zênite", "Prisma", "Ativa", "Boreal", "Lótus"]
+VARIANTS = ["Pro", "Lite", "Max", "Plus", "Mini", "Eco", "Classic", "Sport", "Premium", "Basic"]
+
+def generate_products(count: int, seed: int = 42) -> Iterator[ProductIn]:
+    """
+    Gera 'count' produtos de forma determinística a partir da semente.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        name = f"{category} {rng.choice(BRANDS)} {rng.choice(VARIANTS)} {i % 1000:03d}"
+        # Mediana em torno de 90, cauda longa até alguns milhares
+        price = round(min(rng.lognormvariate(4.5, 1.1), 50_000), 2)
+        quantity = 0 if rng.random() < 0.05 else int(rng.expovariate(1 / 80))
+        yield ProductIn(name=name, quantity=quantity, price=price)
+
+async def seed_catalog(usecase: ProductUsecase, count: int, seed: int = 42, chunk_size: int = 1000) -> int:
+    """
+    Insere o catálogo gerado em lotes e retorna a quantidade de produtos inseridos.
+    Os lotes são montados sob demanda para não manter o catálogo inteiro em memória.
+    """
+    inserted = 0
+    batch: List[ProductIn] = []
+    for product in generate_products(count, seed):
+        batch.append(product)
+        if len(batch) == chunk_size:
+            inserted += (await usecase.create_many(batch, chunk_size=chunk_size)).inserted
+            batch = []
+    if batch:
+        inserted += (await usecase.create_many(batch, chunk_size=chunk_size)).inserted
+    return inserted
+
+async def _main(count: int, seed: int, chunk_size: int, drop: bool) -> dict:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from src.database import client_options
+    from src.settings import Settings
+    from src.usecases.indexes import ensure_indexes
+
+    settings = Settings()
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options(settings))
+    try:
+        database = client.get_database()
+        if drop:
+            await database.drop_collection("products")
+        await ensure_indexes(database)
+        start = time.perf_counter()
+        inserted = await seed_catalog(ProductUsecase(client=client), count, seed, chunk_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    return {"inserted": inserted, "seconds": round(elapsed, 3), "docs_per_second": round(inserted / elapsed, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popula a coleção de produtos com um catálogo sintético.")
+    parser.add_argument("--count", type=int, required=True, help="Quantidade de produtos")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Produtos por insert_many")
+    parser.add_argument("--drop", action="store_true", help="Apaga a coleção de produtos antes de popular")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_main(args.count, args.seed, args.chunk_size, args.drop)), indent=2))
@@ -0,0 +1,81 @@
+"""
+Benchmark do custo de serialização por item nas leituras.
+
+Compara o caminho padrão (ProductOut(**doc) no usecase, revalidação pelo
+response_model do FastAPI e encoder JSON padrão) com o caminho confiável
+(model_construct + orjson) usado quando TRUSTED_READS está ativo.
+
+Uso: python -m benchmarks.serialization [--items 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Callable, List
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.core.serialization import fast_response
+from src.schemas.product import ProductOut
+from src.usecases.product import _to_product
+
+def make_documents(count: int) -> List[dict]:
+    """
+    Gera documentos no mesmo formato que ProductUsecase grava no MongoDB.
+    """
+    documents = []
+    now = datetime.now().replace(microsecond=0)
+    for i in range(count):
+        product_id = uuid4()
+        documents.append({
+            "_id": product_id, "id": product_id,
+            "name": f"Produto {i}", "quantity": i % 100, "price": round(10 + i * 0.37, 2),
+            "created_at": now, "updated_at": now,
+        })
+    return documents
+
+def validated_path(documents: List[dict]) -> bytes:
+    # O que acontece hoje: validação no usecase, revalidação e serialização pelo
+    # response_model do FastAPI e, por fim, o JSONResponse padrão.
+    adapter = TypeAdapter(List[ProductOut])
+    products = [_to_product(document) for document in documents]
+    validated = adapter.validate_python(products, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return JSONResponse(content=content).body
+
+def trusted_path(documents: List[dict]) -> bytes:
+    products = [_to_product(document, trusted=True) for document in documents]
+    return fast_response(products).body
+
+def best_of(function: Callable[[List[dict]], bytes], documents: List[dict], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(documents)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(items: int, repeat: int) -> dict:
+    documents = make_documents(items)
+    # As duas saídas precisam representar o mesmo JSON
+    assert json.loads(validated_path(documents[:10])) == json.loads(trusted_path(documents[:10]))
+
+    validated = best_of(validated_path, documents, repeat)
+    trusted = best_of(trusted_path, documents, repeat)
+    return {
+        "items": items,
+        "validated_us_per_item": round(validated / items * 1e6, 3),
+        "trusted_us_per_item": round(trusted / items * 1e6, 3),
+        "saved_us_per_item": round((validated - trusted) / items * 1e6, 3),
+        "speedup": round(validated / trusted, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o custo de serialização por item nas leituras de produtos.")
+    parser.add_argument("--items", type=int, default=10000, help="Quantidade de documentos por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas; o melhor tempo é reportado")
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.repeat), indent=2))
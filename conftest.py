@@ -1,7 +1,8 @@
 import pytest
 from motor.motor_asyncio import AsyncIOMotorClient
 from src.settings import Settings
-from src.database import db_client # Importa a instância global db_client do seu database.py
+from src.database import client_options, db_client # Importa a instância global db_client do seu database.py
+from src.repositories.memory import InMemoryProductRepository
 from uuid import UUID
 from datetime import datetime, timedelta
 
@@ -12,17 +13,24 @@ async def mongo_client_fixture():
     """
     Fixtura que gerencia a conexão com o cliente MongoDB para a sessão de testes.
     'autouse=True' garante que esta fixture seja executada automaticamente uma vez por sessão.
+    No modo PRODUCT_REPOSITORY=memory não há banco: a fixtura fornece None.
     """
-    db_client.client = AsyncIOMotorClient(settings.DATABASE_URL)
+    if settings.PRODUCT_REPOSITORY == "memory":
+        yield None
+        return
+
+    # Referência local: o shutdown da aplicação nos testes zera db_client.client
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options(settings))
+    db_client.client = client
     try:
-        await db_client.client.admin.command('ping')
+        await client.admin.command('ping')
         print("Conexão com MongoDB estabelecida com sucesso!")
     except Exception as e:
         print(f"Erro ao conectar ao MongoDB: {e}")
         raise # Re-levanta a exceção para que o erro seja propagada
 
-    yield db_client.client
-    db_client.client.close()
+    yield client
+    client.close()
     print("Conexão com MongoDB fechada.")
 
 @pytest.fixture(scope="function")
@@ -31,11 +39,17 @@ async def clear_database(mongo_client_fixture: AsyncIOMotorClient):
     Fixtura que limpa todas as coleções do banco de dados de teste antes de cada função de teste.
     Isso garante que os testes sejam isolados e não interfiram uns nos outros.
     """
-    db = mongo_client_fixture[settings.DB_NAME]
-    for collection_name in await db.list_collection_names():
-        if collection_name.startswith("system."):
-            continue
-        await db.drop_collection(collection_name)
+    if mongo_client_fixture is not None:
+        db = mongo_client_fixture[settings.DB_NAME]
+        for collection_name in await db.list_collection_names():
+            if collection_name.startswith("system."):
+                continue
+            await db.drop_collection(collection_name)
+
+    # No modo PRODUCT_REPOSITORY=memory os produtos ficam no repositório do processo
+    from src.controllers.product import product_repository
+    if isinstance(product_repository, InMemoryProductRepository):
+        product_repository.clear()
 
 # Fixture para dados de produto de entrada (agora em conftest.py)
 @pytest.fixture
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, status
+
+from src.controllers.product import admission_controller, product_cache, product_flights, quantity_buffer
+from src.core.monitoring import pool_monitor
+from src.settings import settings
+
+# Roteador com endpoints operacionais (métricas internas do processo)
+internal_controller = APIRouter(prefix="/internal", tags=["internal"])
+
+@internal_controller.get(
+    "/cache",
+    status_code=status.HTTP_200_OK,
+    summary="Estatísticas do cache de produtos"
+)
+async def get_cache_stats():
+    """
+    Retorna os contadores do cache de leitura por ID deste processo
+    (hits, misses, evictions, expirations e tamanho atual).
+    Retorna `{"enabled": false}` quando o cache está desativado.
+    """
+    if product_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **product_cache.stats()}
+
+@internal_controller.get(
+    "/single-flight",
+    status_code=status.HTTP_200_OK,
+    summary="Estatísticas do agrupamento de leituras concorrentes"
+)
+async def get_single_flight_stats():
+    """
+    Retorna os contadores do SingleFlight deste processo: consultas executadas,
+    chamadas que aguardaram uma consulta idêntica já em andamento (coalesced)
+    e consultas em andamento.
+    Retorna `{"enabled": false}` quando o agrupamento está desativado.
+    """
+    if product_flights is None:
+        return {"enabled": False}
+    return {"enabled": True, **product_flights.stats()}
+
+@internal_controller.get(
+    "/pool",
+    status_code=status.HTTP_200_OK,
+    summary="Estado do pool de conexões do MongoDB"
+)
+async def get_pool_stats():
+    """
+    Retorna a configuração do pool e os contadores do PoolMonitor deste processo:
+    conexões abertas e em uso (atual e máximo), checkouts, falhas de checkout
+    por motivo, tempo de espera por uma conexão (ms) e limpezas do pool.
+
+    Um `checked_out_max` próximo de `max_pool_size` ou um `wait_ms_max` alto
+    indicam que o pool está pequeno para a carga deste worker.
+    """
+    return {
+        "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+        "max_idle_time_ms": settings.MONGO_MAX_IDLE_TIME_MS,
+        "wait_queue_timeout_ms": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        **pool_monitor.stats(),
+    }
+
+@internal_controller.get(
+    "/quantity-buffer",
+    status_code=status.HTTP_200_OK,
+    summary="Estado do buffer de ajustes de quantidade"
+)
+async def get_quantity_buffer_stats():
+    """
+    Retorna os contadores do buffer de ajustes deste processo: ajustes recebidos,
+    gravações (flushes) e falhas, produtos alterados, o que ainda está pendente
+    e os lotes gravados sem confirmação (repetidos na próxima gravação).
+    Retorna `{"enabled": false}` quando o buffer está desativado.
+    """
+    if quantity_buffer is None:
+        return {"enabled": False}
+    return {"enabled": True, **quantity_buffer.stats()}
+
+@internal_controller.get(
+    "/admission",
+    status_code=status.HTTP_200_OK,
+    summary="Estado do controle de admissão"
+)
+async def get_admission_stats():
+    """
+    Retorna, para cada classe de requisição (read, list, write), o limite, a fila,
+    as requisições em andamento e aguardando e os contadores de admitidas e recusadas
+    (as recusas por tempo de espera também aparecem em `timeouts`).
+    Retorna `{"enabled": false}` quando o controle está desativado.
+    """
+    if admission_controller is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission_controller.stats()}
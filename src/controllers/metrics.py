@@ -0,0 +1,20 @@
+from fastapi import APIRouter, status
+from fastapi.responses import Response
+
+from src.core.metrics import CONTENT_TYPE, registry
+
+# Roteador da exportação de métricas no formato de texto do Prometheus
+metrics_controller = APIRouter(tags=["metrics"])
+
+@metrics_controller.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    summary="Métricas no formato do Prometheus"
+)
+async def get_metrics():
+    """
+    Retorna as métricas deste processo no formato de texto do Prometheus:
+    latência das requisições HTTP por método, rota e status, e latência e
+    falhas dos comandos do MongoDB por comando e coleção.
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -1,21 +1,116 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, status, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from datetime import datetime
+from typing import FrozenSet, List, Literal, Optional
 from uuid import UUID
 
-from src.schemas.product import ProductIn, ProductOut, ProductUpdate
+from src.schemas.product import (
+    PRODUCT_FIELDS, BulkCreateOut, BulkWriteOut, ProductBulkDeleteIn, ProductBulkUpdateItem, ProductChangesOut,
+    ProductIn, ProductOut, ProductStatsOut, ProductUpdate, QuantityAdjustIn, QuantityAdjustQueuedOut,
+    ReserveBatchOut, ReserveLine, StockChangeIn,
+)
 from src.usecases.product import ProductUsecase
+from src.usecases.quantity_buffer import QuantityBuffer, QuantityJournal
 from src.database import db_client
-from src.core.exceptions import NotFoundException
+from src.repositories.memory import InMemoryProductRepository
+from src.repositories.product import ProductRepository
+from src.core.admission import AdmissionController
+from src.core.cache import LRUCache
+from src.core.singleflight import SingleFlight
+from src.core.exceptions import (
+    DeadlineExceededException, ExpiredWatermarkException, NotFoundException, InsufficientStockException, InvalidCursorException, InvalidFieldsException,
+    InvalidHistogramException,
+)
+from src.core.fields import parse_fields
+from src.core.histogram import parse_boundaries
+from src.core.serialization import fast_response
+from src.core.http_cache import is_conditional, is_not_modified, list_etag, not_modified, product_etag, set_validators
+from src.core.streaming import encode_stream, streaming_media_type
+from src.settings import settings
 
 # Cria um roteador de API para os endpoints de produto
-product_controller = APIRouter(prefix="/products", tags=["products"])
+product_controller = APIRouter(prefix="/products", tags=["products"], default_response_class=ORJSONResponse)
+
+# Cache de leitura por ID compartilhado entre as requisições do processo (opcional)
+product_cache: Optional[LRUCache] = None
+if settings.PRODUCT_CACHE_ENABLED:
+    product_cache = LRUCache(max_size=settings.PRODUCT_CACHE_MAX_SIZE, ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS)
+
+# Agrupamento de leituras concorrentes idênticas, compartilhado pelo processo (opcional)
+product_flights: Optional[SingleFlight] = SingleFlight() if settings.SINGLE_FLIGHT_ENABLED else None
+
+# Repositório em memória compartilhado pelo processo (PRODUCT_REPOSITORY=memory)
+product_repository: Optional[ProductRepository] = None
+if settings.PRODUCT_REPOSITORY == "memory":
+    product_repository = InMemoryProductRepository()
+
+# Buffer de ajustes de quantidade do processo (opcional); iniciado no startup do app
+quantity_buffer: Optional[QuantityBuffer] = None
+if settings.QUANTITY_BUFFER_ENABLED:
+    quantity_buffer = QuantityBuffer(
+        flush_interval=settings.QUANTITY_BUFFER_FLUSH_INTERVAL_MS / 1000,
+        max_pending=settings.QUANTITY_BUFFER_MAX_PENDING,
+        journal=QuantityJournal(settings.QUANTITY_BUFFER_JOURNAL_DIR),
+    )
+
+# Controle de admissão das rotas de produtos (opcional); aplicado pelo AdmissionMiddleware
+admission_controller: Optional[AdmissionController] = None
+if settings.ADMISSION_ENABLED:
+    admission_controller = AdmissionController(
+        max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+        limits={
+            "read": (settings.ADMISSION_READ_LIMIT, settings.ADMISSION_READ_QUEUE),
+            "list": (settings.ADMISSION_LIST_LIMIT, settings.ADMISSION_LIST_QUEUE),
+            "write": (settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE),
+        },
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    )
+
+# Prazo de cada lote das respostas em streaming (segundos), que não seguem o prazo total da requisição
+stream_batch_timeout: Optional[float] = None
+if settings.DEADLINE_ENABLED and settings.DEADLINE_STREAM_BATCH_MS:
+    stream_batch_timeout = settings.DEADLINE_STREAM_BATCH_MS / 1000
+
+# Prazo de cada bloco das escritas em lote (segundos): até BULK_MAX_ITEMS itens não
+# cabem no prazo de uma escrita, e um 504 no meio perderia o resultado dos blocos já gravados
+bulk_chunk_timeout: Optional[float] = None
+if settings.DEADLINE_ENABLED and settings.DEADLINE_BULK_CHUNK_MS:
+    bulk_chunk_timeout = settings.DEADLINE_BULK_CHUNK_MS / 1000
 
 # Dependência para obter a instância do usecase de produto
 def get_product_usecase() -> ProductUsecase:
     """
-    Retorna uma instância de ProductUsecase com o cliente de banco de dados.
+    Retorna uma instância de ProductUsecase com o cliente de banco de dados
+    ou, no modo em memória, com o repositório do processo.
+    """
+    return ProductUsecase(
+        client=db_client.client,
+        cache=product_cache,
+        trusted_reads=settings.TRUSTED_READS,
+        repository=product_repository,
+        flights=product_flights,
+    )
+
+# Dependência que interpreta o parâmetro de sparse fieldsets
+def get_fields(
+    fields: Optional[str] = Query(None, description=f"Campos da resposta, separados por vírgula ({', '.join(PRODUCT_FIELDS)})")
+) -> Optional[FrozenSet[str]]:
+    """
+    Retorna o conjunto de campos pedidos em '?fields=' ou None para a resposta completa.
+    Levanta um erro 400 para campos inexistentes.
     """
-    return ProductUsecase(client=db_client.client)
+    try:
+        return parse_fields(fields, PRODUCT_FIELDS)
+    except InvalidFieldsException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+def skip_response_model(fields: Optional[FrozenSet[str]]) -> bool:
+    """
+    Indica se a leitura deve ser enviada direto (fast_response), sem o response_model:
+    respostas parciais não cabem no ProductOut completo, e no caminho confiável
+    (TRUSTED_READS) os documentos já foram montados sem revalidação.
+    """
+    return fields is not None or settings.TRUSTED_READS
 
 @product_controller.post(
     "/",
@@ -39,22 +134,294 @@ async def create_product(
     try:
         product = await usecase.create(body=product_in)
         return product
+    except DeadlineExceededException:
+        raise  # respondida com 504 pelo handler do app
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@product_controller.post(
+    "/bulk",
+    response_model=BulkCreateOut,
+    status_code=status.HTTP_200_OK,
+    summary="Cria produtos em lote"
+)
+async def create_products_bulk(
+    products_in: List[ProductIn] = Body(..., max_length=settings.BULK_MAX_ITEMS),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Cria vários produtos em uma única requisição.
+
+    - **products_in**: Array de produtos (ProductIn)
+
+    Os itens são gravados com `insert_many` não ordenado em blocos de `BULK_CHUNK_SIZE`,
+    cada um com o prazo `DEADLINE_BULK_CHUNK_MS`.
+    Retorna o resultado de cada item, na ordem enviada, com o ID gerado ou o erro.
+    """
+    return await usecase.create_many(bodies=products_in, chunk_size=settings.BULK_CHUNK_SIZE, chunk_timeout=bulk_chunk_timeout)
+
+@product_controller.patch(
+    "/bulk",
+    response_model=BulkWriteOut,
+    status_code=status.HTTP_200_OK,
+    summary="Atualiza produtos em lote"
+)
+async def update_products_bulk(
+    items: List[ProductBulkUpdateItem] = Body(..., max_length=settings.BULK_MAX_ITEMS),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Atualiza parcialmente vários produtos em uma única requisição.
+
+    - **items**: Array de objetos com `id` e os campos de ProductUpdate
+
+    As atualizações são enviadas com `bulk_write` em blocos de `BULK_CHUNK_SIZE`,
+    cada um com o prazo `DEADLINE_BULK_CHUNK_MS`.
+    Retorna as contagens matched/modified/missing de cada bloco e o total.
+    """
+    return await usecase.update_many(items=items, chunk_size=settings.BULK_CHUNK_SIZE, chunk_timeout=bulk_chunk_timeout)
+
+@product_controller.delete(
+    "/bulk",
+    response_model=BulkWriteOut,
+    status_code=status.HTTP_200_OK,
+    summary="Deleta produtos em lote"
+)
+async def delete_products_bulk(
+    body: ProductBulkDeleteIn,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Deleta vários produtos em uma única requisição.
+
+    - **ids**: Array de IDs (UUID)
+
+    As deleções são enviadas com `bulk_write` em blocos de `BULK_CHUNK_SIZE`,
+    cada um com o prazo `DEADLINE_BULK_CHUNK_MS`.
+    Retorna as contagens por bloco; `missing` conta os IDs que não existiam.
+    """
+    if len(body.ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"At most {settings.BULK_MAX_ITEMS} ids per request")
+    return await usecase.delete_many(ids=body.ids, chunk_size=settings.BULK_CHUNK_SIZE, chunk_timeout=bulk_chunk_timeout)
+
+@product_controller.post(
+    "/reserve-batch",
+    response_model=ReserveBatchOut,
+    status_code=status.HTTP_200_OK,
+    summary="Reserva o estoque de vários produtos de uma vez"
+)
+async def reserve_products_batch(
+    lines: List[ReserveLine] = Body(..., min_length=1, max_length=settings.RESERVE_BATCH_MAX_ITEMS),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Reserva o estoque de todos os itens de um pedido, ou de nenhum.
+
+    - **lines**: Array de `{id, quantity}`
+
+    As linhas são enviadas em um único `bulk_write` ordenado de decrementos condicionais.
+    Se alguma falhar, as já reservadas são devolvidas (ou a transação é abortada, com
+    `RESERVE_BATCH_TRANSACTIONS`). Levanta um erro 404 se um produto não existir e 409
+    se faltar estoque, indicando o item que falhou.
+    """
+    try:
+        return await usecase.reserve_batch(lines=lines, transaction=settings.RESERVE_BATCH_TRANSACTIONS)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    except InsufficientStockException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+
 @product_controller.get(
     "/",
     response_model=List[ProductOut],
     status_code=status.HTTP_200_OK,
-    summary="Lista todos os produtos"
+    summary="Lista os produtos com paginação por cursor"
 )
 async def get_all_products(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX, description="Quantidade máxima de produtos na página"),
+    after: Optional[str] = Query(None, description="Token opaco retornado no header X-Next-Cursor da página anterior"),
+    sort_by: Literal["id", "price"] = Query("id", description="Chave de ordenação"),
+    stream: bool = Query(False, description="Envia todo o catálogo em streaming como array JSON"),
+    batch_size: int = Query(settings.STREAM_BATCH_SIZE, ge=1, le=settings.STREAM_BATCH_SIZE_MAX, description="Documentos por lote no modo streaming"),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Retorna uma página de produtos cadastrados.
+
+    - **limit**: Tamanho da página
+    - **after**: Cursor da página anterior (opcional)
+    - **sort_by**: Ordena por `id` ou por `price` (desempate por id)
+    - **fields**: Campos da resposta, ex.: `id,name,price` (opcional; projeção feita no MongoDB)
+
+    Quando existe uma próxima página, o token para buscá-la é enviado no header `X-Next-Cursor`.
+    A página tem `ETag`; com `If-None-Match`, retorna 304 se nenhum item da página mudou.
+    Levanta um erro 400 se o cursor for inválido.
+
+    Com `Accept: application/x-ndjson` ou `?stream=true`, todo o catálogo é enviado em
+    streaming (NDJSON ou array JSON), lendo o cursor em lotes de `batch_size`.
+    """
+    media_type = streaming_media_type(request, stream)
+    if media_type:
+        products = usecase.iter_products(batch_size=batch_size, fields=fields, batch_timeout=stream_batch_timeout)
+        return StreamingResponse(encode_stream(products, media_type, batch_size), media_type=media_type)
+
+    try:
+        products, next_cursor = await usecase.get_page(limit=limit, after=after, sort_by=sort_by, fields=fields)
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+    # Listagens levam só ETag: a maior data de atualização não muda quando um item
+    # é deletado, então Last-Modified poderia gerar um 304 incorreto.
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    etag = list_etag((p.version() for p in products), fields)
+    if is_not_modified(request, etag, None):
+        return not_modified(etag, None, headers=headers)
+    headers["ETag"] = etag
+    if skip_response_model(fields):
+        return fast_response(products, headers)
+    response.headers.update(headers)
+    return products
+
+# Rotas com caminho fixo precisam ser registradas antes de "/{id}",
+# senão o FastAPI tenta interpretar o caminho como um UUID.
+@product_controller.get(
+    "/search",
+    response_model=List[ProductOut],
+    status_code=status.HTTP_200_OK,
+    summary="Busca produtos pelo nome"
+)
+async def search_products(
+    q: str = Query(..., min_length=1, description="Texto da busca"),
+    mode: Literal["prefix", "text"] = Query("prefix", description="prefix: início do nome; text: busca textual por palavras"),
+    limit: int = Query(settings.SEARCH_LIMIT_DEFAULT, ge=1, le=settings.SEARCH_LIMIT_MAX, description="Quantidade máxima de resultados"),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Busca produtos pelo nome.
+
+    - **q**: Texto da busca
+    - **mode**: `prefix` (padrão) ou `text`
+    - **limit**: Quantidade máxima de resultados
+    - **fields**: Campos da resposta, ex.: `id,name` (opcional)
+
+    No modo `prefix`, a busca ignora acentos e maiúsculas e usa o índice de
+    `name_normalized`; os resultados vêm em ordem alfabética. No modo `text`, usa o
+    índice de texto do MongoDB e ordena pela relevância.
+    """
+    products = await usecase.search(q=q, mode=mode, limit=limit, fields=fields)
+    if skip_response_model(fields):
+        return fast_response(products)
+    return products
+
+@product_controller.get(
+    "/changes",
+    response_model=ProductChangesOut,
+    status_code=status.HTTP_200_OK,
+    summary="Feed de mudanças do catálogo (sincronização incremental)"
+)
+async def get_product_changes(
+    since: Optional[datetime] = Query(None, description="Retorna as mudanças posteriores a esta data (início da sincronização)"),
+    after: Optional[str] = Query(None, description="Token next_cursor da página anterior (tem precedência sobre since)"),
+    limit: int = Query(settings.CHANGES_LIMIT_DEFAULT, ge=1, le=settings.CHANGES_LIMIT_MAX, description="Quantidade máxima de mudanças na página"),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Retorna os produtos criados ou alterados e os deletados depois de uma posição,
+    em ordem de (`changed_at`, `id`), para que consumidores transfiram só o que mudou.
+
+    - **since**: Data inicial (ex.: o momento da última carga completa)
+    - **after**: Token `next_cursor` da página anterior
+    - **limit**: Tamanho da página
+
+    Sem `since` nem `after`, começa do início do catálogo. Guarde sempre o `next_cursor`
+    e continue a partir dele; `has_more` indica que há mais páginas disponíveis agora.
+    Mudanças feitas há menos de CHANGES_SETTLE_MS só aparecem nas chamadas seguintes.
+    Levanta um erro 400 se o token for inválido e 410 se a posição for mais antiga que
+    a retenção das remoções (CHANGES_TOMBSTONE_TTL_SECONDS): nesse caso, refaça a carga completa.
+    """
+    if since is not None and since.tzinfo is not None:
+        # As datas são gravadas sem fuso, no horário local do servidor
+        since = since.astimezone().replace(tzinfo=None)
+    try:
+        return await usecase.get_changes(
+            since=since,
+            after=after,
+            limit=limit,
+            settle_ms=settings.CHANGES_SETTLE_MS,
+            retention_seconds=settings.CHANGES_TOMBSTONE_TTL_SECONDS,
+        )
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except ExpiredWatermarkException as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=e.message)
+
+@product_controller.get(
+    "/stats",
+    response_model=ProductStatsOut,
+    status_code=status.HTTP_200_OK,
+    summary="Estatísticas do catálogo"
+)
+async def get_products_stats(
+    boundaries: Optional[str] = Query(None, description="Limites do histograma de preços, separados por vírgula (ex.: 0,10,100)"),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Retorna a quantidade de produtos, soma/média/mínimo/máximo dos preços,
+    o valor total do estoque (`price * quantity`) e um histograma de preços.
+
+    - **boundaries**: Limites crescentes das faixas; cada faixa inclui o limite inferior
+      e exclui o superior (opcional, padrão `STATS_PRICE_BOUNDARIES`)
+
+    Calculado em uma única agregação no MongoDB. Levanta um erro 400 para limites inválidos.
+    """
+    try:
+        bounds = parse_boundaries(boundaries, settings.STATS_PRICE_BOUNDARIES, settings.STATS_MAX_BUCKETS)
+    except InvalidHistogramException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    return await usecase.get_stats(bounds)
+
+@product_controller.get(
+    "/price_range",
+    response_model=List[ProductOut],
+    status_code=status.HTTP_200_OK,
+    summary="Lista produtos por faixa de preço"
+)
+async def get_products_by_price_range(
+    request: Request,
+    response: Response,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    stream: bool = Query(False, description="Envia o resultado em streaming como array JSON"),
+    batch_size: int = Query(settings.STREAM_BATCH_SIZE, ge=1, le=settings.STREAM_BATCH_SIZE_MAX, description="Documentos por lote no modo streaming"),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
     usecase: ProductUsecase = Depends(get_product_usecase)
 ):
     """
-    Retorna uma lista de todos os produtos cadastrados.
+    Retorna uma lista de produtos dentro de uma faixa de preço especificada.
+
+    - **min_price**: Preço mínimo (opcional)
+    - **max_price**: Preço máximo (opcional)
+    - **fields**: Campos da resposta, ex.: `id,name,price` (opcional)
+
+    Suporta GET condicional com `ETag`/`If-None-Match`, como GET /products.
+    Aceita o mesmo modo streaming de GET /products (`Accept: application/x-ndjson` ou `?stream=true`).
     """
-    products = await usecase.get_all()
+    media_type = streaming_media_type(request, stream)
+    if media_type:
+        products = usecase.iter_products(min_price=min_price, max_price=max_price, batch_size=batch_size, fields=fields, batch_timeout=stream_batch_timeout)
+        return StreamingResponse(encode_stream(products, media_type, batch_size), media_type=media_type)
+
+    products = await usecase.get_by_price_range(min_price=min_price, max_price=max_price, fields=fields)
+    etag = list_etag((p.version() for p in products), fields)
+    if is_not_modified(request, etag, None):
+        return not_modified(etag, None)
+    if skip_response_model(fields):
+        return fast_response(products, {"ETag": etag})
+    set_validators(response, etag, None)
     return products
 
 @product_controller.get(
@@ -65,19 +432,40 @@ async def get_all_products(
 )
 async def get_product_by_id(
     id: UUID,
+    request: Request,
+    response: Response,
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
     usecase: ProductUsecase = Depends(get_product_usecase)
 ):
     """
     Busca um produto específico pelo seu ID.
 
     - **id**: ID do produto (UUID)
+    - **fields**: Campos da resposta, ex.: `id,name,price` (opcional)
 
-    Retorna o produto encontrado.
+    Retorna o produto encontrado, com os headers `ETag` e `Last-Modified`.
+    Com `If-None-Match` ou `If-Modified-Since`, retorna 304 se o produto não mudou,
+    decidindo pela data de atualização, sem buscar o documento inteiro.
     Levanta um erro 404 se o produto não for encontrado.
     """
-    product = await usecase.get_by_id(id=id)
+    if is_conditional(request):
+        updated_at = await usecase.get_version(id=id)
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
+        etag = product_etag(id, updated_at, fields)
+        if is_not_modified(request, etag, updated_at):
+            return not_modified(etag, updated_at)
+
+    product = await usecase.get_by_id(id=id, fields=fields)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
+    product_id, updated_at = product.version()
+    etag = product_etag(product_id, updated_at, fields)
+    if skip_response_model(fields):
+        response = fast_response(product)
+        set_validators(response, etag, updated_at)
+        return response
+    set_validators(response, etag, updated_at)
     return product
 
 @product_controller.patch(
@@ -105,6 +493,96 @@ async def update_product(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
     return updated_product
 
+@product_controller.post(
+    "/{id}/reserve",
+    response_model=ProductOut,
+    status_code=status.HTTP_200_OK,
+    summary="Reserva unidades do estoque de um produto"
+)
+async def reserve_product(
+    id: UUID,
+    body: StockChangeIn,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Reserva (decrementa) unidades do estoque de forma atômica.
+
+    - **id**: ID do produto (UUID)
+    - **quantity**: Unidades a reservar (inteiro positivo)
+
+    A verificação e o decremento são um único comando no MongoDB, seguro sob
+    concorrência sem locks externos. Retorna o produto atualizado.
+    Levanta um erro 404 se o produto não for encontrado e 409 se o estoque for insuficiente.
+    """
+    try:
+        product = await usecase.reserve(id=id, quantity=body.quantity)
+    except InsufficientStockException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
+    return product
+
+@product_controller.post(
+    "/{id}/release",
+    response_model=ProductOut,
+    status_code=status.HTTP_200_OK,
+    summary="Devolve unidades reservadas ao estoque de um produto"
+)
+async def release_product(
+    id: UUID,
+    body: StockChangeIn,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Devolve (incrementa) unidades ao estoque de forma atômica, ex.: ao cancelar uma reserva.
+
+    - **id**: ID do produto (UUID)
+    - **quantity**: Unidades a devolver (inteiro positivo)
+
+    Retorna o produto atualizado.
+    Levanta um erro 404 se o produto não for encontrado.
+    """
+    product = await usecase.release(id=id, quantity=body.quantity)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
+    return product
+
+@product_controller.post(
+    "/{id}/adjust",
+    response_model=ProductOut,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_202_ACCEPTED: {"model": QuantityAdjustQueuedOut}},
+    summary="Soma um ajuste (positivo ou negativo) à quantidade de um produto"
+)
+async def adjust_product_quantity(
+    id: UUID,
+    body: QuantityAdjustIn,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Soma `delta` à quantidade em estoque, sem verificação de estoque mínimo
+    (para contadores muito atualizados, ex.: entradas e saídas de inventário).
+
+    - **id**: ID do produto (UUID)
+    - **delta**: Unidades a somar (negativo para subtrair)
+
+    Com QUANTITY_BUFFER_ENABLED, o ajuste é agregado em memória e gravado em lote
+    em até QUANTITY_BUFFER_FLUSH_INTERVAL_MS; retorna 202 com o total pendente
+    do produto, sem verificar se ele existe (ajustes de produtos inexistentes são
+    descartados na gravação). Sem o buffer, grava na hora e retorna o produto atualizado.
+    Levanta um erro 404 se o produto não for encontrado (somente sem o buffer).
+    """
+    if quantity_buffer is not None:
+        pending = quantity_buffer.add(id, body.delta)
+        return ORJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=QuantityAdjustQueuedOut(id=id, pending=pending).model_dump(mode="json"),
+        )
+    product = await usecase.adjust(id=id, delta=body.delta)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
+    return product
+
 @product_controller.delete(
     "/{id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -126,23 +604,3 @@ async def delete_product(
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product not found with id: {id}")
     return
-
-@product_controller.get(
-    "/price_range",
-    response_model=List[ProductOut],
-    status_code=status.HTTP_200_OK,
-    summary="Lista produtos por faixa de preço"
-)
-async def get_products_by_price_range(
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    usecase: ProductUsecase = Depends(get_product_usecase)
-):
-    """
-    Retorna uma lista de produtos dentro de uma faixa de preço especificada.
-
-    - **min_price**: Preço mínimo (opcional)
-    - **max_price**: Preço máximo (opcional)
-    """
-    products = await usecase.get_by_price_range(min_price=min_price, max_price=max_price)
-    return products
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import orjson
+
+# Classes de requisição em ordem de prioridade: quando uma vaga é liberada,
+# quem espera em uma classe anterior é admitido primeiro.
+PRIORITY = ("read", "write", "list")
+
+def classify_request(scope) -> Optional[str]:
+    """
+    Classe de admissão de uma requisição às rotas de produtos, pelo método e caminho
+    (o middleware roda antes do roteamento). None para as demais rotas, que não passam
+    pelo controle (raiz, /internal, /metrics).
+
+    - read: leituras pontuais e baratas (GET /products/{id}, /products/search)
+    - list: leituras que varrem a coleção (listagem, streaming, faixa de preço, stats, changes)
+    - write: todo método que não é GET/HEAD, inclusive os endpoints em lote
+    """
+    path = scope["path"].rstrip("/")
+    if path != "/products" and not path.startswith("/products/"):
+        return None
+    if scope["method"] not in ("GET", "HEAD"):
+        return "write"
+    if path in ("/products", "/products/changes", "/products/price_range", "/products/stats"):
+        return "list"
+    return "read"
+
+class AdmissionClass:
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+class AdmissionController:
+    """
+    Limita as requisições simultâneas por classe e no total (a soma disputa o mesmo
+    pool de conexões do MongoDB). Acima do limite, a requisição espera em uma fila
+    curta; com a fila cheia, ou depois de 'queue_timeout' segundos, é recusada na hora,
+    em vez de ficar esperando uma conexão até o cliente desistir.
+
+    Vagas liberadas vão primeiro para as classes de maior prioridade (PRIORITY):
+    leituras pontuais não ficam atrás de listagens.
+    """
+    def __init__(self, max_concurrency: int, limits: Dict[str, Tuple[int, int]], queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.classes = {name: AdmissionClass(name, *limits[name]) for name in PRIORITY}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(c.in_flight for c in self.classes.values())
+
+    def _can_run(self, admission_class: AdmissionClass) -> bool:
+        return admission_class.in_flight < admission_class.limit and self.in_flight < self.max_concurrency
+
+    def _has_priority_waiters(self, admission_class: AdmissionClass) -> bool:
+        # Alguém na mesma classe já espera (FIFO), ou uma classe mais prioritária
+        # espera por uma vaga do limite total (e não pelo seu próprio limite)
+        for name in PRIORITY:
+            other = self.classes[name]
+            if name == admission_class.name:
+                return bool(other.waiters)
+            if other.waiters and other.in_flight < other.limit:
+                return True
+        return False
+
+    async def acquire(self, name: str) -> bool:
+        """
+        Reserva uma vaga na classe; retorna False se a requisição deve ser recusada.
+        """
+        admission_class = self.classes[name]
+        if self._can_run(admission_class) and not self._has_priority_waiters(admission_class):
+            admission_class.in_flight += 1
+            admission_class.admitted += 1
+            return True
+        if len(admission_class.waiters) >= admission_class.queue_size:
+            admission_class.rejected += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        admission_class.waiters.append(future)
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Cliente desconectou enquanto esperava; se a vaga já tinha sido dada, devolve
+            if future.done() and not future.cancelled():
+                self.release(name)
+            else:
+                self._forget(admission_class, future)
+            raise
+
+        if future.done() and not future.cancelled():
+            admission_class.admitted += 1
+            return True
+        self._forget(admission_class, future)
+        admission_class.timeouts += 1
+        admission_class.rejected += 1
+        return False
+
+    def _forget(self, admission_class: AdmissionClass, future: asyncio.Future) -> None:
+        future.cancel()
+        try:
+            admission_class.waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self, name: str) -> None:
+        self.classes[name].in_flight -= 1
+        # Repassa as vagas livres a quem espera, na ordem de prioridade
+        for admission_class in (self.classes[name] for name in PRIORITY):
+            while admission_class.waiters and self._can_run(admission_class):
+                future = admission_class.waiters.popleft()
+                if future.done():
+                    continue
+                admission_class.in_flight += 1
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "classes": {
+                name: {
+                    "limit": c.limit,
+                    "queue_size": c.queue_size,
+                    "in_flight": c.in_flight,
+                    "queued": len(c.waiters),
+                    "admitted": c.admitted,
+                    "rejected": c.rejected,
+                    "timeouts": c.timeouts,
+                }
+                for name, c in self.classes.items()
+            },
+        }
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que passa as rotas de produtos pelo AdmissionController e
+    responde 503 com Retry-After quando a classe da requisição está saturada.
+    A vaga fica ocupada até o último byte da resposta (inclusive em streaming).
+    """
+    def __init__(self, app, controller: AdmissionController, retry_after_seconds: int = 1, classify: Callable = classify_request):
+        self.app = app
+        self.controller = controller
+        self.retry_after = str(retry_after_seconds).encode()
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        name = self.classify(scope) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(name):
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+    async def _reject(self, send) -> None:
+        body = orjson.dumps({"detail": "Server is overloaded, retry later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", self.retry_after),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
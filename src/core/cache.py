@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """
+    Cache em memória limitado por tamanho (LRU) e por tempo de vida (TTL).
+    É local ao processo: com vários workers, cada um tem o seu, e o TTL limita
+    por quanto tempo uma escrita feita em outro worker pode ficar invisível.
+
+    Cada invalidate() avança uma geração. Quem lê do banco para popular o cache
+    guarda generation() antes da leitura e a passa ao set(): se a chave foi
+    invalidada no meio do caminho, o valor lido (já antigo) não é gravado.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_fills = 0
+        self._generation = 0
+        # Geração da última invalidação de cada chave, limitado a 'max_size' chaves;
+        # as descartadas sobem o piso, que vale para todas as chaves fora do dicionário
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._generation_floor = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Retorna o valor em cache ou None (miss), descartando entradas expiradas.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        """
+        Geração atual, a ser passada ao set() de um valor lido a partir de agora.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and self._invalidated.get(key, self._generation_floor) > generation:
+                # A chave foi invalidada depois da leitura do valor
+                self.stale_fills += 1
+                return
+            self._entries[key] = (value, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._invalidated[key] = self._generation
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_size:
+                _, generation = self._invalidated.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, generation)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale_fills": self.stale_fills,
+            }
@@ -0,0 +1,156 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from src.core.admission import classify_request
+from src.core.exceptions import DeadlineExceededException
+
+# Prazo (time.monotonic) da requisição atual; None quando não há prazo
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def remaining() -> Optional[float]:
+    """
+    Segundos que restam até o prazo da requisição atual (negativo se já passou),
+    ou None se não há prazo.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+@contextmanager
+def deadline(seconds: Optional[float], override: bool = False) -> Iterator[None]:
+    """
+    Define o prazo do bloco. Um prazo externo mais curto continua valendo, a não
+    ser com 'override', que substitui o prazo externo (ex.: cada lote de uma
+    resposta em streaming, que não está mais sujeita ao prazo da requisição).
+    """
+    current = None if override else _deadline.get()
+    value = None if seconds is None else time.monotonic() + seconds
+    if current is not None and (value is None or current < value):
+        value = current
+    token = _deadline.set(value)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def query_deadline() -> Iterator[None]:
+    """
+    Aplica o que resta do prazo às operações do MongoDB do bloco (pymongo.timeout:
+    maxTimeMS em cada comando, inclusive getMore, e o mesmo limite na espera por
+    uma conexão do pool). Levanta DeadlineExceededException se o prazo já passou
+    ou se uma operação estourou o tempo.
+    """
+    budget = remaining()
+    if budget is None:
+        yield
+        return
+    if budget <= 0:
+        raise DeadlineExceededException("Request deadline exceeded")
+    try:
+        with pymongo.timeout(budget):
+            yield
+    except PyMongoError as e:
+        if e.timeout:
+            raise DeadlineExceededException("Request deadline exceeded") from e
+        raise
+
+async def detached(function: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Executa 'function()' fora do prazo da requisição: em uma task própria, com um
+    contexto vazio (sem o prazo nem o pymongo.timeout do chamador, que não podem ser
+    estendidos por blocos internos) e protegida por shield, para que o cancelamento
+    do chamador (ex.: cliente desconectou) não a interrompa no meio. Para escritas
+    que não podem ficar pela metade, como desfazer uma reserva.
+    """
+    task = asyncio.get_running_loop().create_task(function(), context=contextvars.Context())
+    task.add_done_callback(_consume_exception)
+    return await asyncio.shield(task)
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Marca a exceção como observada mesmo que o chamador já tenha sido cancelado
+    if not task.cancelled():
+        task.exception()
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI que define o prazo de cada requisição: o header (em ms, limitado
+    a 'max_ms') ou o padrão da classe da rota (read, list, write; ver classify_request).
+    Respostas em streaming não estão sujeitas a ele: depois dos headers não há como
+    responder 504, então cada lote usa o próprio prazo (ver ProductUsecase.iter_products).
+
+    Também cancela a requisição quando o cliente desconecta: a task do app é
+    cancelada e os cursores abertos são fechados, em vez de a consulta seguir
+    rodando no MongoDB para uma resposta que ninguém vai ler.
+    """
+    def __init__(self, app, defaults_ms: Dict[str, Optional[int]], header: str = "x-request-timeout-ms", max_ms: Optional[int] = None, classify: Callable = classify_request):
+        self.app = app
+        self.defaults_ms = defaults_ms
+        self.header = header.lower().encode("latin-1")
+        self.max_ms = max_ms
+        self.classify = classify
+
+    def _budget_ms(self, scope) -> Optional[int]:
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                try:
+                    requested = int(value)
+                except ValueError:
+                    break  # header inválido: vale o padrão da rota
+                if requested > 0:
+                    return min(requested, self.max_ms) if self.max_ms else requested
+                break
+        name = self.classify(scope)
+        return self.defaults_ms.get(name) if name else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget_ms = self._budget_ms(scope)
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = disconnected = False
+
+        async def send_wrapper(message):
+            nonlocal response_complete
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+
+        with deadline(budget_ms / 1000 if budget_ms else None):
+            # A task herda o contexto com o prazo
+            app_task = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+
+        async def pump():
+            # Único leitor do receive original: repassa as mensagens ao app e
+            # cancela a requisição se o cliente desconectar antes da resposta.
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    # Depois da resposta completa, o disconnect é só o fim normal da conexão
+                    if not app_task.done() and not response_complete:
+                        disconnected = True
+                        app_task.cancel()
+                    return
+
+        pump_task = asyncio.ensure_future(pump())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            # Cliente desconectou: não há a quem responder. Outros cancelamentos
+            # (ex.: servidor encerrando) seguem adiante.
+            if not disconnected:
+                raise
+        finally:
+            pump_task.cancel()
@@ -2,4 +2,40 @@ class NotFoundException(Exception):
     """Exceção levantada quando um recurso não é encontrado."""
     def __init__(self, message: str):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class InvalidCursorException(Exception):
+    """Exceção levantada quando um token de paginação é inválido ou não corresponde à ordenação."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidFieldsException(Exception):
+    """Exceção levantada quando o parâmetro 'fields' pede campos inexistentes."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidHistogramException(Exception):
+    """Exceção levantada quando os limites do histograma de preços são inválidos."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class InsufficientStockException(Exception):
+    """Exceção levantada quando não há estoque suficiente para uma reserva."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class ExpiredWatermarkException(Exception):
+    """Exceção levantada quando a posição do feed de mudanças é mais antiga que a retenção das remoções."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+class DeadlineExceededException(Exception):
+    """Exceção levantada quando o prazo da requisição termina antes da consulta ao banco."""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
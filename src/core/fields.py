@@ -0,0 +1,18 @@
+from typing import FrozenSet, Iterable, Optional
+
+from src.core.exceptions import InvalidFieldsException
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[FrozenSet[str]]:
+    """
+    Converte o parâmetro '?fields=id,name,price' em um conjunto de campos.
+    Retorna None quando o parâmetro não foi enviado (resposta completa).
+    """
+    if fields is None:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    if not requested:
+        raise InvalidFieldsException("At least one field must be requested")
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise InvalidFieldsException(f"Unknown fields: {', '.join(unknown)}")
+    return requested
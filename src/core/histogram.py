@@ -0,0 +1,25 @@
+from typing import Iterable, Optional, Tuple
+
+from src.core.exceptions import InvalidHistogramException
+
+def parse_boundaries(boundaries: Optional[str], default: Iterable[float], max_buckets: int) -> Tuple[float, ...]:
+    """
+    Converte o parâmetro '?boundaries=0,10,100' nos limites do histograma.
+    Os limites seguem o $bucket do MongoDB: cada faixa inclui o limite inferior
+    e exclui o superior. Sem o parâmetro, usa os limites padrão.
+    """
+    if boundaries is None:
+        values = tuple(default)
+    else:
+        try:
+            values = tuple(float(value) for value in boundaries.split(",") if value.strip())
+        except ValueError:
+            raise InvalidHistogramException("Boundaries must be numbers")
+
+    if len(values) < 2:
+        raise InvalidHistogramException("At least two boundaries are required")
+    if len(values) - 1 > max_buckets:
+        raise InvalidHistogramException(f"At most {max_buckets} buckets are allowed")
+    if any(lower >= upper for lower, upper in zip(values, values[1:])):
+        raise InvalidHistogramException("Boundaries must be strictly increasing")
+    return values
@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from fastapi import Request, Response, status
+
+# As datas são gravadas sem fuso, no horário local do servidor (datetime.now()),
+# e convertidas para UTC nos headers HTTP.
+
+def _as_utc(value: datetime) -> datetime:
+    # astimezone() interpreta datas sem fuso como horário local
+    return value.astimezone(timezone.utc)
+
+def _digest(parts: Iterable[str]) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    return f'"{hasher.hexdigest()}"'
+
+def _variant(fields: Optional[Iterable[str]]) -> str:
+    # Respostas parciais ('?fields=') são representações diferentes e precisam de outro ETag
+    return ",".join(sorted(fields)) if fields is not None else "*"
+
+def product_etag(id: UUID, updated_at: datetime, fields: Optional[Iterable[str]] = None) -> str:
+    """
+    ETag forte de um produto. Toda escrita atualiza 'updated_at', então o par
+    (id, updated_at) muda sempre que a representação muda.
+    """
+    return _digest([_variant(fields), str(id), updated_at.isoformat()])
+
+def list_etag(versions: Iterable[Tuple[UUID, datetime]], fields: Optional[Iterable[str]] = None) -> str:
+    """
+    ETag forte de uma listagem: impressão digital dos pares (id, updated_at) na ordem da resposta.
+    """
+    return _digest([_variant(fields), *(f"{id}:{updated_at.isoformat()}" for id, updated_at in versions)])
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Avalia If-None-Match e If-Modified-Since (RFC 9110).
+    If-None-Match tem precedência; If-Modified-Since só é usado quando ele está ausente.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags:
+            return True
+        # Comparação fraca, como a RFC exige para If-None-Match
+        return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # O header HTTP tem resolução de segundos
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+def not_modified(etag: str, last_modified: Optional[datetime], headers: Optional[Dict[str, str]] = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    set_validators(response, etag, last_modified)
+    return response
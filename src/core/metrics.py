@@ -0,0 +1,213 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Limites padrão dos histogramas de latência, em segundos
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """
+    Contador monotônico por combinação de labels, no formato de texto do Prometheus.
+    """
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    """
+    Histograma por combinação de labels. Cada observação custa uma busca binária
+    nos limites e um incremento sob lock; os acumulados são montados só na exportação.
+    """
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [contagem por faixa (+Inf no fim), soma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas exportadas em GET /metrics.
+    """
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP, por método, rota (template) e status",
+    ("method", "route", "status"),
+))
+
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds",
+    "Duração dos comandos enviados ao MongoDB, por comando e coleção",
+    ("command", "collection"),
+))
+
+mongo_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total",
+    "Comandos do MongoDB que falharam, por comando e coleção",
+    ("command", "collection"),
+))
+
+deadline_exceeded = registry.register(Counter(
+    "http_request_deadline_exceeded_total",
+    "Requisições encerradas com 504 porque o prazo terminou, por rota (template)",
+    ("route",),
+))
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Listener do pymongo que alimenta os histogramas de duração dos comandos.
+    O evento de término não traz o nome da coleção, então ele é guardado no início.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, object], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = collection
+
+    def _pop(self, event) -> str:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.connection_id), "")
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, self._pop(event))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._pop(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+        mongo_command_failures.inc(event.command_name, collection)
+
+# Instância global registrada no cliente Motor (ver src/database.py)
+command_metrics = CommandMetrics()
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP até o último byte da resposta.
+    A rota é o template ("/products/{id}"), não o caminho, para limitar a
+    cardinalidade; requisições sem rota correspondente usam "unmatched".
+    """
+    def __init__(self, app, histogram: Histogram = http_request_duration):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template: Optional[str] = getattr(route, "path", None)
+            self.histogram.observe(
+                time.perf_counter() - start,
+                scope["method"], template or "unmatched", str(status_code),
+            )
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from pymongo import monitoring
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Listener do pymongo que conta os comandos enviados ao MongoDB (round trips).
+    Os eventos chegam das threads do driver, por isso a contagem usa um lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self._counts[event.command_name] += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    @contextmanager
+    def measure(self) -> Iterator[Counter]:
+        """
+        Conta apenas os comandos enviados dentro do bloco 'with'.
+        O Counter retornado é preenchido ao sair do bloco.
+        """
+        before = Counter(self.counts)
+        delta: Counter = Counter()
+        try:
+            yield delta
+        finally:
+            delta.update(Counter(self.counts) - before)
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Listener do pymongo que acompanha o pool de conexões: conexões abertas e em
+    uso, tempo de espera no checkout, falhas de checkout e limpezas do pool.
+    Somado entre todos os servidores do cluster.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # O checkout começa e termina na mesma thread do driver
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._open = 0
+            self._checked_out = 0
+            self._checked_out_max = 0
+            self._checkouts = 0
+            self._failures: Counter = Counter()
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._cleared = 0
+
+    def _wait(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._open += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._open -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        wait = self._wait()
+        with self._lock:
+            self._failures[str(event.reason)] += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        wait = self._wait()
+        with self._lock:
+            self._checkouts += 1
+            self._checked_out += 1
+            self._checked_out_max = max(self._checked_out_max, self._checked_out)
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._checked_out -= 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            attempts = self._checkouts + sum(self._failures.values())
+            return {
+                "open": self._open,
+                "checked_out": self._checked_out,
+                "checked_out_max": self._checked_out_max,
+                "checkouts": self._checkouts,
+                "checkout_failures": dict(self._failures),
+                "wait_ms_total": round(self._wait_total * 1000, 3),
+                "wait_ms_avg": round(self._wait_total * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 3),
+                "pool_cleared": self._cleared,
+            }
+
+# Instâncias globais registradas no cliente Motor (ver src/database.py)
+command_counter = CommandCounter()
+pool_monitor = PoolMonitor()
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from src.core.exceptions import InvalidCursorException
+
+# Chaves de ordenação aceitas na listagem e o campo correspondente no MongoDB.
+# Toda ordenação usa '_id' como desempate, de modo que (chave, _id) é único.
+SORT_FIELDS: Dict[str, str] = {
+    "id": "_id",
+    "price": "price",
+}
+
+def encode_cursor(sort_by: str, document: Dict[str, Any]) -> str:
+    """
+    Gera um token opaco a partir do último documento de uma página.
+    O token guarda a chave de ordenação, o valor dessa chave e o '_id'.
+    """
+    field = SORT_FIELDS[sort_by]
+    payload = {"s": sort_by, "id": str(document["_id"])}
+    if field != "_id":
+        payload["v"] = document[field]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, sort_by: str) -> Tuple[Any, UUID]:
+    """
+    Decodifica um token gerado por encode_cursor.
+    Retorna o par (valor da chave de ordenação, _id) do último item visto.
+    Levanta InvalidCursorException se o token estiver corrompido ou tiver
+    sido gerado para outra ordenação.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        last_id = UUID(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorException("Invalid pagination cursor")
+
+    if payload.get("s") != sort_by:
+        raise InvalidCursorException(f"Pagination cursor does not match sort_by={sort_by}")
+
+    field = SORT_FIELDS[sort_by]
+    if field == "_id":
+        return last_id, last_id
+    if "v" not in payload:
+        raise InvalidCursorException("Invalid pagination cursor")
+    return payload["v"], last_id
+
+def encode_change_cursor(changed_at: Optional[datetime], last_id: Optional[UUID]) -> str:
+    """
+    Gera o token do feed de mudanças a partir do último (data da mudança, _id) entregue.
+    Sem _id, a posição é "depois de tudo o que mudou até changed_at"; sem data, o início.
+    """
+    payload = {
+        "s": "changes",
+        "t": changed_at.isoformat() if changed_at else None,
+        "id": str(last_id) if last_id else None,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_change_cursor(token: str) -> Tuple[Optional[datetime], Optional[UUID]]:
+    """
+    Decodifica um token gerado por encode_change_cursor.
+    Levanta InvalidCursorException se o token estiver corrompido ou não for do feed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        changed_at = datetime.fromisoformat(payload["t"]) if payload["t"] else None
+        last_id = UUID(payload["id"]) if payload["id"] else None
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorException("Invalid changes cursor")
+
+    if payload.get("s") != "changes" or (last_id and not changed_at):
+        raise InvalidCursorException("Invalid changes cursor")
+    return changed_at, last_id
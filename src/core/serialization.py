@@ -0,0 +1,27 @@
+from typing import Iterable, Optional, Union
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from src.core.timing import timed
+
+def dump_model(model: BaseModel) -> bytes:
+    """
+    Serializa um schema direto para bytes com orjson, sem passar pelo encoder
+    padrão do FastAPI. orjson já sabe lidar com UUID e datetime, e produz a mesma
+    saída que model_dump_json() para os schemas de produto.
+    """
+    return orjson.dumps(model.model_dump())
+
+def fast_response(content: Union[BaseModel, Iterable[BaseModel]], headers: Optional[dict] = None) -> ORJSONResponse:
+    """
+    Resposta para o caminho de leitura confiável: o conteúdo é enviado como está,
+    sem a revalidação do response_model que o FastAPI faria no retorno do endpoint.
+    """
+    with timed("serialize"):
+        if isinstance(content, BaseModel):
+            body = content.model_dump()
+        else:
+            body = [item.model_dump() for item in content]
+        return ORJSONResponse(content=body, headers=headers)
@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from src.core.deadline import remaining
+from src.core.exceptions import DeadlineExceededException
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave: a primeira executa a função
+    e as demais, enquanto ela estiver em andamento, aguardam o mesmo resultado
+    (ou a mesma exceção). Nada fica guardado depois que a chamada termina; é a
+    proteção contra rajadas de leituras idênticas, não um cache.
+
+    A execução roda em uma task própria, em um contexto vazio: não herda o prazo
+    (nem as medições) da requisição que a iniciou. Cada chamador aplica o próprio
+    prazo (deadline.remaining) enquanto aguarda, e a execução só é cancelada
+    quando não resta ninguém aguardando.
+    As chaves são tuplas; forget() libera as que começam por um prefixo, para
+    que leituras iniciadas depois de uma escrita não recebam o resultado anterior.
+    """
+    def __init__(self):
+        self._flights: Dict[Tuple, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Tuple, function: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.get_running_loop().create_task(function(), context=contextvars.Context())
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda done: self._done(key, flight))
+
+        flight.waiters += 1
+        try:
+            # shield: o prazo ou o cancelamento de um chamador não cancela a execução compartilhada
+            budget = remaining()
+            if budget is None:
+                return await asyncio.shield(flight.task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight.task), max(budget, 0))
+            except asyncio.TimeoutError:
+                raise DeadlineExceededException("Request deadline exceeded")
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Ninguém mais aguarda o resultado: a consulta não precisa continuar,
+                # e uma nova chamada com a mesma chave executa de novo
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _done(self, key: Tuple, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Marca a exceção como observada mesmo que ninguém mais a aguarde
+            flight.task.exception()
+
+    def forget(self, *prefix: Any) -> None:
+        """
+        Desassocia as chamadas em andamento cujas chaves começam por 'prefix'.
+        Quem já aguarda continua recebendo o resultado; novas chamadas executam de novo.
+        """
+        size = len(prefix)
+        for key in [key for key in self._flights if key[:size] == prefix]:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
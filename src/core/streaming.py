@@ -0,0 +1,50 @@
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from pydantic import BaseModel
+
+from src.core.serialization import dump_model
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+def streaming_media_type(request: Request, stream: bool) -> Optional[str]:
+    """
+    Decide se a listagem deve ser enviada em streaming e em qual formato.
+    'Accept: application/x-ndjson' ativa o NDJSON; '?stream=true' sem esse
+    header envia um array JSON em streaming. Retorna None no modo normal.
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+async def encode_stream(items: AsyncIterator[BaseModel], media_type: str, batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Serializa os itens à medida que chegam do cursor, agrupando até 'batch_size'
+    itens por chunk para não pagar uma escrita no socket por documento.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        chunk = []
+        async for item in items:
+            chunk.append(dump_model(item) + b"\n")
+            if len(chunk) >= batch_size:
+                yield b"".join(chunk)
+                chunk = []
+        if chunk:
+            yield b"".join(chunk)
+        return
+
+    chunk = []
+    prefix = b"["
+    async for item in items:
+        chunk.append(dump_model(item))
+        if len(chunk) >= batch_size:
+            yield prefix + b",".join(chunk)
+            prefix = b","
+            chunk = []
+    if chunk:
+        yield prefix + b",".join(chunk)
+        prefix = b","
+    yield b"[]" if prefix == b"[" else b"]"
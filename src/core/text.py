@@ -0,0 +1,10 @@
+import unicodedata
+
+def normalize_name(name: str) -> str:
+    """
+    Forma canônica do nome usada na busca por prefixo: sem acentos, em
+    minúsculas e com espaços colapsados ("  Café  Torrado" -> "cafe torrado").
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
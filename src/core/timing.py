@@ -0,0 +1,106 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+import orjson
+
+logger = logging.getLogger("store_api.timing")
+
+class RequestTimings:
+    """
+    Tempo acumulado por fase de uma requisição (ex.: 'db', 'model', 'serialize').
+    Uma fase pode ser medida várias vezes; as durações são somadas.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def header(self, total: float) -> str:
+        # Formato do header Server-Timing: "db;dur=1.234, total;dur=5.678" (em ms)
+        entries = [f"{phase};dur={seconds * 1000:.3f}" for phase, seconds in self.phases.items()]
+        entries.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(entries)
+
+# Medições da requisição atual; None quando a instrumentação está desligada
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Soma a duração do bloco à fase informada da requisição atual.
+    Fora de uma requisição instrumentada, não mede nada.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que instrumenta cada requisição: as fases medidas com timed()
+    vão no header Server-Timing e as requisições lentas são registradas em log
+    estruturado (JSON), por amostragem.
+
+    O header sai junto com o início da resposta; em respostas em streaming, o que
+    acontece depois (leitura do cursor, serialização dos lotes) só aparece no log.
+    """
+    def __init__(self, app, slow_threshold_ms: float = 500.0, sample_rate: float = 1.0):
+        self.app = app
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(timings.elapsed()).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = timings.elapsed()
+            if total >= self.slow_threshold and random.random() < self.sample_rate:
+                self._log(scope, status_code, timings, total)
+
+    def _log(self, scope, status_code: int, timings: RequestTimings, total: float) -> None:
+        route = getattr(scope.get("route"), "path", None)
+        record = {
+            "event": "slow_request",
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "total_ms": round(total * 1000, 3),
+            **{f"{phase}_ms": round(seconds * 1000, 3) for phase, seconds in timings.phases.items()},
+        }
+        logger.warning(orjson.dumps(record).decode())
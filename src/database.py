@@ -1,5 +1,29 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from src.settings import Settings
+from src.core.metrics import command_metrics
+from src.core.monitoring import command_counter, pool_monitor
+
+def client_options(settings: Settings) -> dict:
+    """
+    Opções do AsyncIOMotorClient a partir das configurações: tamanho e tempos do
+    pool, compressão e os listeners de monitoramento.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        # Os IDs dos produtos são UUIDs; sem isso o pymongo 4 se recusa a codificá-los
+        "uuidRepresentation": "standard",
+        "event_listeners": [command_counter, pool_monitor],
+    }
+    if settings.METRICS_ENABLED:
+        options["event_listeners"].append(command_metrics)
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
 
 class MongoClient:
     """
@@ -15,7 +39,7 @@ class MongoClient:
         """
         if self.client is None:
             try:
-                self.client = AsyncIOMotorClient(self.settings.DATABASE_URL)
+                self.client = AsyncIOMotorClient(self.settings.DATABASE_URL, **client_options(self.settings))
                 # O comando ping é uma forma leve de verificar a conexão
                 await self.client.admin.command('ping')
                 print("Conexão com MongoDB estabelecida com sucesso!")
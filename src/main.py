@@ -1,27 +1,108 @@
-from fastapi import FastAPI
-from src.controllers.product import product_controller
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
+from src.controllers.product import admission_controller, get_product_usecase, product_controller, quantity_buffer
+from src.controllers.internal import internal_controller
+from src.controllers.metrics import metrics_controller
+from src.core.admission import AdmissionMiddleware
+from src.core.deadline import DeadlineMiddleware
+from src.core.exceptions import DeadlineExceededException
+from src.core.metrics import MetricsMiddleware, deadline_exceeded
+from src.core.timing import ServerTimingMiddleware
 from src.database import db_client
+from src.settings import settings
+from src.usecases.indexes import ensure_indexes
 
 # Cria uma instância da aplicação FastAPI
 app = FastAPI(title="Store API", version="0.1.0")
 
 # Inclui o roteador de produtos na aplicação
 app.include_router(product_controller)
+app.include_router(internal_controller)
+
+# Prazo por requisição (header ou padrão da classe da rota) e cancelamento das
+# consultas quando o cliente desconecta. Mais interno que a admissão: o tempo
+# na fila de admissão não consome o prazo das consultas.
+if settings.DEADLINE_ENABLED:
+    app.add_middleware(
+        DeadlineMiddleware,
+        defaults_ms={
+            "read": settings.DEADLINE_READ_MS,
+            "list": settings.DEADLINE_LIST_MS,
+            "write": settings.DEADLINE_WRITE_MS,
+        },
+        header=settings.DEADLINE_HEADER,
+        max_ms=settings.DEADLINE_MAX_MS,
+    )
+
+@app.exception_handler(DeadlineExceededException)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededException):
+    """
+    Responde 504 quando o prazo da requisição termina antes das consultas ao banco.
+    """
+    route = getattr(request.scope.get("route"), "path", None)
+    deadline_exceeded.inc(route or "unmatched")
+    return ORJSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": exc.message})
+
+# Limite de concorrência por classe nas rotas de produtos. Registrado antes dos
+# demais para ficar mais interno: as respostas 503 também entram nas métricas.
+if admission_controller is not None:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
+# Histogramas de latência por rota e exportação em GET /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_controller)
+
+# Tempo por fase (db, model, serialize) no header Server-Timing e log das requisições lentas
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        slow_threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+        sample_rate=settings.SLOW_REQUEST_LOG_SAMPLE_RATE,
+    )
+
+async def connect_database():
+    """
+    Conecta ao MongoDB e, se configurado, reconcilia os índices declarados.
+    """
+    await db_client.connect()
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        try:
+            reports = await ensure_indexes(db_client.client.get_database())
+        except Exception as e:
+            # Índice ausente degrada o desempenho, mas não deve impedir a API de subir
+            print(f"Erro ao reconciliar índices: {e}")
+        else:
+            for report in reports:
+                if report.created or report.modified or report.mismatched or report.undeclared:
+                    print(f"Índices de '{report.collection}': {report.model_dump(exclude={'collection', 'missing'})}")
 
 @app.on_event("startup")
 async def startup_event():
     """
     Evento de inicialização da aplicação.
-    Conecta ao banco de dados MongoDB.
+    Conecta ao banco de dados MongoDB, reconcilia os índices declarados e inicia
+    o buffer de ajustes de quantidade (se habilitado).
+    No modo em memória (PRODUCT_REPOSITORY=memory) não há banco a conectar.
     """
-    await db_client.connect()
+    if settings.PRODUCT_REPOSITORY != "memory":
+        await connect_database()
+    if quantity_buffer is not None:
+        # Recupera o journal e grava o que ficou pendente antes de aceitar ajustes
+        await quantity_buffer.start(get_product_usecase())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     Evento de desligamento da aplicação.
-    Fecha a conexão com o banco de dados MongoDB.
+    Grava os ajustes de quantidade pendentes e fecha a conexão com o banco de dados MongoDB.
     """
+    if quantity_buffer is not None:
+        await quantity_buffer.stop()
     await db_client.close()
 
 @app.get("/")
@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from src.core.text import normalize_name
+from src.repositories.product import STATS_SUMMARY, ProductRepository
+
+# Sentinelas para montar limites de busca nos índices ordenados por (valor, _id)
+_MIN_ID = UUID(int=0)
+_MAX_ID = UUID(int=(1 << 128) - 1)
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    # Cópia rasa: quem chama nunca recebe a referência guardada no índice
+    if projection is None:
+        return dict(document)
+    return {key: value for key, value in document.items() if key == "_id" or projection.get(key)}
+
+class InMemoryProductRepository(ProductRepository):
+    """
+    Repositório em memória com índice hash por '_id' e índices ordenados
+    (bisect) por '_id', por (price, _id) e por (name_normalized, _id).
+
+    Buscas por ID são O(1); faixas de preço e páginas custam O(log n + k).
+    Inserções e mudanças de preço custam O(n) no pior caso por causa do
+    deslocamento da lista, mas isso é um memmove e é rápido na prática.
+
+    Nenhum método faz 'await' no meio de uma alteração, então cada operação
+    é atômica dentro do event loop. Serve para testes locais sem MongoDB,
+    benchmarks de carga e réplicas de leitura em memória.
+    """
+    def __init__(self, documents: Optional[List[dict]] = None):
+        self._documents: Dict[UUID, dict] = {}
+        self._ids: List[UUID] = []
+        self._prices: List[Tuple[float, UUID]] = []
+        self._names: List[Tuple[str, UUID]] = []
+        # Registros de remoção do feed de mudanças, em ordem de (deleted_at, _id)
+        self._tombstones: List[Tuple[Any, UUID]] = []
+        if documents:
+            self.load(documents)
+
+    def load(self, documents: List[dict]) -> None:
+        """
+        Substitui o conteúdo pelos documentos informados (ex.: snapshot do MongoDB).
+        """
+        self._documents = {document["_id"]: dict(document) for document in documents}
+        self._ids = sorted(self._documents)
+        self._prices = sorted((document["price"], id) for id, document in self._documents.items())
+        self._names = sorted((document.get("name_normalized", ""), id) for id, document in self._documents.items())
+
+    def clear(self) -> None:
+        self.load([])
+        self._tombstones = []
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _index(self, document: dict) -> None:
+        insort(self._ids, document["_id"])
+        insort(self._prices, (document["price"], document["_id"]))
+        insort(self._names, (document.get("name_normalized", ""), document["_id"]))
+
+    def _unindex(self, document: dict) -> None:
+        del self._ids[bisect_left(self._ids, document["_id"])]
+        del self._prices[bisect_left(self._prices, (document["price"], document["_id"]))]
+        del self._names[bisect_left(self._names, (document.get("name_normalized", ""), document["_id"]))]
+
+    def _price_slice(self, min_price: Optional[float], max_price: Optional[float]) -> Tuple[int, int]:
+        start = 0 if min_price is None else bisect_left(self._prices, (min_price, _MIN_ID))
+        end = len(self._prices) if max_price is None else bisect_right(self._prices, (max_price, _MAX_ID))
+        return start, max(start, end)
+
+    async def insert_one(self, document: dict) -> None:
+        if document["_id"] in self._documents:
+            raise ValueError(f"Duplicate key: {document['_id']}")
+        self._documents[document["_id"]] = dict(document)
+        self._index(document)
+
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        errors = {}
+        for index, document in enumerate(documents):
+            try:
+                await self.insert_one(document)
+            except ValueError as e:
+                errors[index] = str(e)
+        return errors
+
+    async def find_one(self, id: UUID, projection: Optional[dict] = None) -> Optional[dict]:
+        document = self._documents.get(id)
+        return _project(document, projection) if document is not None else None
+
+    async def find_page(self, sort_field: str, limit: int, after: Optional[Tuple[Any, UUID]] = None, projection: Optional[dict] = None) -> List[dict]:
+        if sort_field == "_id":
+            start = bisect_right(self._ids, after[1]) if after else 0
+            ids = self._ids[start:start + limit]
+        elif sort_field == "price":
+            start = bisect_right(self._prices, (after[0], after[1])) if after else 0
+            ids = [id for _, id in self._prices[start:start + limit]]
+        else:
+            raise ValueError(f"Unsupported sort field: {sort_field}")
+        return [_project(self._documents[id], projection) for id in ids]
+
+    async def find_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None) -> List[dict]:
+        start, end = self._price_slice(min_price, max_price)
+        return [_project(self._documents[id], projection) for _, id in self._prices[start:end]]
+
+    async def iter_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None, batch_size: int = 500) -> AsyncIterator[dict]:
+        # Como um cursor, retoma a partir do último (price, _id) emitido:
+        # escritas concorrentes entre lotes não invalidam a posição.
+        position = None
+        while True:
+            if position is not None:
+                start = bisect_right(self._prices, position)
+            else:
+                start = self._price_slice(min_price, max_price)[0]
+            end = self._price_slice(min_price, max_price)[1]
+            keys = self._prices[start:min(end, start + batch_size)]
+            if not keys:
+                return
+            # Copia o lote antes de ceder o controle: o consumidor pode aguardar entre itens
+            batch = [_project(self._documents[id], projection) for _, id in keys]
+            for document in batch:
+                yield document
+            position = keys[-1]
+            await asyncio.sleep(0)
+
+    async def find_by_name_prefix(self, prefix: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        documents = []
+        for name, id in self._names[bisect_left(self._names, (prefix, _MIN_ID)):]:
+            if not name.startswith(prefix) or len(documents) == limit:
+                break
+            documents.append(_project(self._documents[id], projection))
+        return documents
+
+    async def find_by_text(self, text: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        # Aproximação do $text sem stemming: a relevância é o número de termos
+        # da busca presentes no nome. Varre o catálogo (O(n)).
+        terms = set(normalize_name(text).split())
+        scored = []
+        for name, id in self._names:
+            score = len(terms.intersection(name.split()))
+            if score:
+                scored.append((-score, name, id))
+        scored.sort()
+        return [_project(self._documents[id], projection) for _, _, id in scored[:limit]]
+
+    async def find_changed(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        # Sem índice por updated_at (ele muda em quase toda escrita): varredura O(n log limit)
+        value, last_id = after or (None, None)
+        keys = (
+            (document["updated_at"], id) for id, document in self._documents.items()
+            if document["updated_at"] <= until
+            and (value is None or (document["updated_at"], id) > (value, last_id or _MAX_ID))
+        )
+        return [dict(self._documents[id]) for _, id in heapq.nsmallest(limit, keys)]
+
+    async def find_deleted(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        value, last_id = after or (None, None)
+        start = 0 if value is None else bisect_right(self._tombstones, (value, last_id or _MAX_ID))
+        end = bisect_right(self._tombstones, (until, _MAX_ID))
+        return [{"_id": id, "deleted_at": deleted_at} for deleted_at, id in self._tombstones[start:max(start, end)][:limit]]
+
+    async def insert_tombstones(self, ids: List[UUID], deleted_at: Any) -> None:
+        # Sem TTL: os registros ficam até o processo reiniciar
+        existing = set(ids)
+        self._tombstones = [entry for entry in self._tombstones if entry[1] not in existing]
+        for id in ids:
+            insort(self._tombstones, (deleted_at, id))
+
+    async def price_stats(self, boundaries: Sequence[float]) -> Dict[str, Any]:
+        stats = dict(STATS_SUMMARY)
+        if self._prices:
+            documents = self._documents.values()
+            stats["count"] = len(self._prices)
+            stats["total_quantity"] = sum(d["quantity"] for d in documents)
+            stats["inventory_value"] = sum(d["price"] * d["quantity"] for d in documents)
+            stats["price_sum"] = sum(price for price, _ in self._prices)
+            stats["price_avg"] = stats["price_sum"] / stats["count"]
+            stats["price_min"] = self._prices[0][0]
+            stats["price_max"] = self._prices[-1][0]
+
+        # O índice de preços já está ordenado: cada faixa é contada com duas buscas binárias
+        positions = [bisect_left(self._prices, (boundary, _MIN_ID)) for boundary in boundaries]
+        stats["buckets"] = {
+            lower: end - start
+            for lower, start, end in zip(boundaries, positions, positions[1:])
+        }
+        stats["outside"] = len(self._prices) - (positions[-1] - positions[0])
+        return stats
+
+    async def update_one(self, id: UUID, values: dict) -> Optional[dict]:
+        document = self._documents.get(id)
+        if document is None:
+            return None
+        if any(key in values and values[key] != document.get(key) for key in ("price", "name_normalized")):
+            self._unindex(document)
+            document.update(values)
+            self._index(document)
+        else:
+            document.update(values)
+        return dict(document)
+
+    async def adjust_quantity(self, id: UUID, delta: int, values: dict, minimum: Optional[int] = None) -> Optional[dict]:
+        document = self._documents.get(id)
+        if document is None or (minimum is not None and document["quantity"] < minimum):
+            return None
+        document["quantity"] += delta
+        document.update(values)
+        return dict(document)
+
+    async def reserve_many(self, lines: List[Tuple[UUID, int]], values: dict, transaction: bool = False) -> Optional[int]:
+        # Sem 'await' entre a verificação e a aplicação: a reserva é atômica no event loop
+        remaining: Dict[UUID, int] = {}
+        for index, (id, quantity) in enumerate(lines):
+            document = self._documents.get(id)
+            if document is None:
+                return index
+            available = remaining.get(id, document["quantity"])
+            if available < quantity:
+                return index
+            remaining[id] = available - quantity
+        for id, quantity in remaining.items():
+            self._documents[id]["quantity"] = quantity
+            self._documents[id].update(values)
+        return None
+
+    async def bulk_increment(self, deltas: List[Tuple[UUID, int]], values: dict, node: str, epoch: int) -> int:
+        modified = 0
+        for id, delta in deltas:
+            document = self._documents.get(id)
+            if document is None:
+                continue
+            epochs = document.setdefault("quantity_epochs", {})
+            if epochs.get(node, -1) >= epoch:
+                continue
+            document["quantity"] += delta
+            document.update(values)
+            epochs[node] = epoch
+            modified += 1
+        return modified
+
+    async def delete_one(self, id: UUID) -> bool:
+        document = self._documents.pop(id, None)
+        if document is None:
+            return False
+        self._unindex(document)
+        return True
+
+    async def bulk_update(self, updates: List[Tuple[UUID, dict]]) -> Tuple[int, int]:
+        matched = modified = 0
+        for id, values in updates:
+            document = self._documents.get(id)
+            if document is None:
+                continue
+            matched += 1
+            if any(document.get(key) != value for key, value in values.items()):
+                modified += 1
+                await self.update_one(id, values)
+        return matched, modified
+
+    async def bulk_delete(self, ids: List[UUID]) -> int:
+        deleted = 0
+        for id in ids:
+            if await self.delete_one(id):
+                deleted += 1
+        return deleted
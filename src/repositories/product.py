@@ -0,0 +1,436 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.core.deadline import detached
+
+# Código do erro de conversão ($toInt) que reserve_many força quando falta estoque
+CONVERSION_FAILURE = 241
+
+# Os repositórios trabalham com documentos no formato gravado no MongoDB
+# (dicts com '_id'); montar os schemas de saída é responsabilidade do usecase.
+# 'projection' segue o formato do MongoDB: {"campo": 1, ...}, sempre com '_id'.
+
+def price_range_query(min_price: Optional[float] = None, max_price: Optional[float] = None) -> dict:
+    query = {}
+    if min_price is not None and max_price is not None:
+        query["price"] = {"$gte": min_price, "$lte": max_price}
+    elif min_price is not None:
+        query["price"] = {"$gte": min_price}
+    elif max_price is not None:
+        query["price"] = {"$lte": max_price}
+    return query
+
+def changed_after_query(field: str, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any) -> dict:
+    # Posição do feed de mudanças: (valor, _id) estritamente maior que 'after' e valor <= 'until'.
+    # Sem _id em 'after', tudo o que tem exatamente aquele valor já foi visto.
+    value, last_id = after or (None, None)
+    bounds = {"$lte": until}
+    if value is None:
+        return {field: bounds}
+    if last_id is None:
+        return {field: {**bounds, "$gt": value}}
+    return {field: bounds, "$or": [
+        {field: {"$gt": value}},
+        {field: value, "_id": {"$gt": last_id}},
+    ]}
+
+# Campos do resumo em price_stats e seus valores quando não há produtos
+STATS_SUMMARY = {
+    "count": 0,
+    "total_quantity": 0,
+    "inventory_value": 0.0,
+    "price_sum": 0.0,
+    "price_avg": None,
+    "price_min": None,
+    "price_max": None,
+}
+
+class ProductRepository(ABC):
+    """
+    Interface de persistência de produtos usada pelo ProductUsecase.
+    """
+
+    @abstractmethod
+    async def insert_one(self, document: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        """
+        Insere sem ordem garantida e devolve os erros por posição na lista.
+        Falhas que afetam a lista inteira são levantadas como exceção.
+        """
+
+    @abstractmethod
+    async def find_one(self, id: UUID, projection: Optional[dict] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_page(self, sort_field: str, limit: int, after: Optional[Tuple[Any, UUID]] = None, projection: Optional[dict] = None) -> List[dict]:
+        """
+        Retorna até 'limit' documentos ordenados por (sort_field, _id), a partir
+        do último par (valor, _id) visto. 'sort_field' pode ser o próprio '_id'.
+        """
+
+    @abstractmethod
+    async def find_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def iter_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None, batch_size: int = 500) -> AsyncIterator[dict]:
+        """
+        Gerador assíncrono com no máximo 'batch_size' documentos em memória por vez.
+        Sem limites de preço, percorre o catálogo inteiro.
+        """
+
+    @abstractmethod
+    async def find_by_name_prefix(self, prefix: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        """
+        Produtos cujo 'name_normalized' começa com 'prefix' (já normalizado),
+        ordenados por (name_normalized, _id).
+        """
+
+    @abstractmethod
+    async def find_by_text(self, text: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        """
+        Busca textual no nome, do resultado mais relevante para o menos relevante.
+        """
+
+    @abstractmethod
+    async def find_changed(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        """
+        Busca os produtos com (updated_at, _id) depois de 'after' e updated_at <= 'until',
+        em ordem de (updated_at, _id). 'after' = (data, None) exclui a data inteira.
+        """
+
+    @abstractmethod
+    async def find_deleted(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        """
+        Como find_changed, sobre os registros de remoção ({'_id', 'deleted_at'}).
+        """
+
+    @abstractmethod
+    async def insert_tombstones(self, ids: List[UUID], deleted_at: Any) -> None:
+        """
+        Registra a remoção dos produtos para o feed de mudanças.
+        """
+
+    @abstractmethod
+    async def price_stats(self, boundaries: Sequence[float]) -> Dict[str, Any]:
+        """
+        Resumo do catálogo (campos de STATS_SUMMARY) mais o histograma de preços:
+        'buckets' mapeia o limite inferior de cada faixa à sua contagem (faixas vazias
+        podem faltar) e 'outside' conta os preços fora dos limites.
+        """
+
+    @abstractmethod
+    async def update_one(self, id: UUID, values: dict) -> Optional[dict]:
+        """
+        Aplica '$set' com 'values' e devolve o documento já atualizado (ou None).
+        """
+
+    @abstractmethod
+    async def adjust_quantity(self, id: UUID, delta: int, values: dict, minimum: Optional[int] = None) -> Optional[dict]:
+        """
+        Soma 'delta' à quantidade e aplica '$set' com 'values' em uma única operação
+        atômica. Com 'minimum', só altera se a quantidade atual for >= 'minimum'.
+        Devolve o documento já atualizado, ou None se nada foi alterado.
+        """
+
+    @abstractmethod
+    async def reserve_many(self, lines: List[Tuple[UUID, int]], values: dict, transaction: bool = False) -> Optional[int]:
+        """
+        Reserva (decrementa) todas as linhas (id, quantidade) ou nenhuma.
+        Retorna None se todas foram reservadas ou a posição da primeira linha que
+        falhou (produto inexistente ou sem estoque); nesse caso nada fica aplicado.
+        """
+
+    @abstractmethod
+    async def bulk_increment(self, deltas: List[Tuple[UUID, int]], values: dict, node: str, epoch: int) -> int:
+        """
+        Soma cada delta à quantidade do produto em uma única chamada, de forma
+        idempotente: o produto guarda o último epoch aplicado por 'node' e ignora
+        epochs iguais ou anteriores. Devolve a quantidade de produtos alterados.
+        """
+
+    @abstractmethod
+    async def delete_one(self, id: UUID) -> bool:
+        ...
+
+    @abstractmethod
+    async def bulk_update(self, updates: List[Tuple[UUID, dict]]) -> Tuple[int, int]:
+        """
+        Aplica vários '$set' em uma única chamada; devolve (matched, modified).
+        """
+
+    @abstractmethod
+    async def bulk_delete(self, ids: List[UUID]) -> int:
+        """
+        Deleta vários produtos em uma única chamada; devolve a quantidade deletada.
+        """
+
+class MongoProductRepository(ProductRepository):
+    """
+    Implementação sobre uma coleção do Motor.
+    """
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    @property
+    def tombstones(self) -> AsyncIOMotorCollection:
+        # Registros de remoção do feed de mudanças, no mesmo banco (com índice TTL)
+        return self.collection.database.get_collection("product_tombstones")
+
+    def _find(self, query: dict, projection: Optional[dict] = None):
+        if projection is None:
+            return self.collection.find(query)
+        return self.collection.find(query, projection)
+
+    async def insert_one(self, document: dict) -> None:
+        await self.collection.insert_one(document)
+
+    async def insert_many(self, documents: List[dict]) -> Dict[int, str]:
+        errors = {}
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", "Write error")
+        return errors
+
+    async def find_one(self, id: UUID, projection: Optional[dict] = None) -> Optional[dict]:
+        if projection is None:
+            return await self.collection.find_one({"_id": id})
+        return await self.collection.find_one({"_id": id}, projection)
+
+    async def find_page(self, sort_field: str, limit: int, after: Optional[Tuple[Any, UUID]] = None, projection: Optional[dict] = None) -> List[dict]:
+        # Paginação por keyset: em vez de skip(), filtra a partir do último (chave, _id) visto.
+        # O custo de cada página é o mesmo, não importa a profundidade.
+        query = {}
+        if after:
+            last_value, last_id = after
+            if sort_field == "_id":
+                query = {"_id": {"$gt": last_id}}
+            else:
+                query = {"$or": [
+                    {sort_field: {"$gt": last_value}},
+                    {sort_field: last_value, "_id": {"$gt": last_id}},
+                ]}
+
+        if sort_field == "_id":
+            sort = [("_id", ASCENDING)]
+        else:
+            sort = [(sort_field, ASCENDING), ("_id", ASCENDING)]
+
+        cursor = self._find(query, projection).sort(sort).limit(limit)
+        documents = []
+        async for document in cursor:
+            documents.append(document)
+        return documents
+
+    async def find_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None) -> List[dict]:
+        documents = []
+        cursor = self._find(price_range_query(min_price, max_price), projection)
+        try:
+            async for document in cursor: # Iterar sobre o cursor retornado
+                documents.append(document)
+        finally:
+            # Se a requisição for cancelada no meio (cliente desconectou, prazo), mata o cursor no servidor
+            await cursor.close()
+        return documents
+
+    async def iter_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, projection: Optional[dict] = None, batch_size: int = 500) -> AsyncIterator[dict]:
+        cursor = self._find(price_range_query(min_price, max_price), projection).batch_size(batch_size)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            # Libera o cursor no servidor mesmo se o cliente desconectar no meio do streaming
+            await cursor.close()
+
+    async def find_by_name_prefix(self, prefix: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        # Regex ancorada e sensível a maiúsculas: o MongoDB a converte em um intervalo
+        # do índice name_normalized_1__id_1, sem varrer a coleção.
+        query = {"name_normalized": {"$regex": f"^{re.escape(prefix)}"}}
+        cursor = self._find(query, projection).sort([("name_normalized", ASCENDING), ("_id", ASCENDING)]).limit(limit)
+        return [document async for document in cursor]
+
+    async def find_by_text(self, text: str, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        # Usa o índice de texto 'name_text'; ordena pela relevância calculada pelo servidor
+        cursor = self._find({"$text": {"$search": text}}, projection).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return [document async for document in cursor]
+
+    async def find_changed(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        # Keyset sobre o índice (updated_at, _id), como em find_page
+        cursor = self.collection.find(changed_after_query("updated_at", after, until))
+        cursor = cursor.sort([("updated_at", ASCENDING), ("_id", ASCENDING)]).limit(limit)
+        return [document async for document in cursor]
+
+    async def find_deleted(self, after: Optional[Tuple[Optional[Any], Optional[UUID]]], until: Any, limit: int) -> List[dict]:
+        cursor = self.tombstones.find(changed_after_query("deleted_at", after, until))
+        cursor = cursor.sort([("deleted_at", ASCENDING), ("_id", ASCENDING)]).limit(limit)
+        return [document async for document in cursor]
+
+    async def insert_tombstones(self, ids: List[UUID], deleted_at: Any) -> None:
+        # Upsert: repetir a remoção (retry) não duplica o registro
+        await self.tombstones.bulk_write([
+            UpdateOne({"_id": id}, {"$set": {"deleted_at": deleted_at}}, upsert=True) for id in ids
+        ], ordered=False)
+
+    async def price_stats(self, boundaries: Sequence[float]) -> Dict[str, Any]:
+        # Uma única agregação: o resumo e o histograma são calculados no servidor
+        # e só algumas centenas de bytes voltam pela rede.
+        pipeline = [{"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "total_quantity": {"$sum": "$quantity"},
+                "inventory_value": {"$sum": {"$multiply": ["$price", "$quantity"]}},
+                "price_sum": {"$sum": "$price"},
+                "price_avg": {"$avg": "$price"},
+                "price_min": {"$min": "$price"},
+                "price_max": {"$max": "$price"},
+            }}],
+            "histogram": [{"$bucket": {
+                "groupBy": "$price",
+                "boundaries": [float(b) for b in boundaries],
+                "default": "outside",
+                "output": {"count": {"$sum": 1}},
+            }}],
+        }}]
+        result = None
+        async for document in self.collection.aggregate(pipeline):
+            result = document
+
+        summary = result["summary"][0] if result and result["summary"] else {}
+        stats = {key: summary.get(key, default) for key, default in STATS_SUMMARY.items()}
+        stats["buckets"] = {}
+        stats["outside"] = 0
+        for bucket in result["histogram"] if result else []:
+            if bucket["_id"] == "outside":
+                stats["outside"] = bucket["count"]
+            else:
+                stats["buckets"][bucket["_id"]] = bucket["count"]
+        return stats
+
+    async def update_one(self, id: UUID, values: dict) -> Optional[dict]:
+        # Atualiza e devolve o documento já atualizado em um único comando atômico
+        return await self.collection.find_one_and_update(
+            {"_id": id},
+            {"$set": values},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def adjust_quantity(self, id: UUID, delta: int, values: dict, minimum: Optional[int] = None) -> Optional[dict]:
+        # A condição fica no filtro: verificar e decrementar é um único comando
+        # atômico no servidor, sem ler o documento antes e sem locks na aplicação.
+        query = {"_id": id}
+        if minimum is not None:
+            query["quantity"] = {"$gte": minimum}
+        return await self.collection.find_one_and_update(
+            query,
+            {"$inc": {"quantity": delta}, "$set": values},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def reserve_many(self, lines: List[Tuple[UUID, int]], values: dict, transaction: bool = False) -> Optional[int]:
+        # Cada linha é um update com pipeline: se a quantidade não basta, a expressão
+        # força um erro de conversão ($toInt de um texto). O texto depende do documento:
+        # uma expressão constante seria avaliada pelo otimizador antes do $cond e
+        # falharia em todas as linhas. Com ordered=True o bulk_write para na primeira
+        # linha sem estoque, e as anteriores já estão aplicadas.
+        operations = [
+            UpdateOne({"_id": id}, [{"$set": {
+                **values,
+                "quantity": {"$cond": [
+                    {"$gte": ["$quantity", quantity]},
+                    {"$subtract": ["$quantity", quantity]},
+                    {"$toInt": {"$concat": ["insufficient stock: ", {"$toString": {"$ifNull": ["$quantity", 0]}}]}},
+                ]},
+            }}])
+            for id, quantity in lines
+        ]
+
+        session = None
+        if transaction:
+            session = await self.collection.database.client.start_session()
+            session.start_transaction()
+        try:
+            try:
+                result = await self.collection.bulk_write(operations, ordered=True, session=session)
+                failed, matched, applied = None, result.matched_count, len(lines)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors") or []
+                # Só com erro de write concern todas as linhas foram executadas
+                applied = write_errors[0]["index"] if write_errors else len(lines)
+                if not write_errors or write_errors[0].get("code") != CONVERSION_FAILURE:
+                    # Não é falta de estoque (write concern, conflito, validação...):
+                    # desfaz o que foi aplicado e deixa o erro seguir
+                    await self._undo_reservation(session, lines[:applied], values)
+                    raise
+                failed, matched = applied, e.details["nMatched"]
+
+            if failed is None and matched == applied:
+                if session is not None:
+                    await session.commit_transaction()
+                return None
+
+            await self._undo_reservation(session, lines[:applied], values)
+            if matched < applied:
+                # Alguma linha anterior à falha não encontrou o produto (fora da sessão)
+                ids = [id for id, _ in lines[:applied]]
+                cursor = self.collection.find({"_id": {"$in": ids}}, {"_id": 1})
+                existing = {document["_id"] async for document in cursor}
+                failed = next(index for index, id in enumerate(ids) if id not in existing)
+            return failed
+        finally:
+            if session is not None:
+                await session.end_session()
+
+    async def _undo_reservation(self, session, lines: List[Tuple[UUID, int]], values: dict) -> None:
+        if session is not None:
+            # Desfaz antes de investigar: depois do erro o servidor já abortou a
+            # transação, e qualquer leitura na sessão falharia com NoSuchTransaction
+            await session.abort_transaction()
+        elif lines:
+            # Compensação: devolve o que as linhas executadas reservaram, fora do prazo
+            # da requisição e sem ser interrompida por um cancelamento (o estoque ficaria
+            # preso). Linhas de produtos inexistentes não encontram nada e não alteram nada.
+            await detached(lambda: self.collection.bulk_write([
+                UpdateOne({"_id": id}, {"$inc": {"quantity": quantity}, "$set": values})
+                for id, quantity in lines
+            ], ordered=False))
+
+    async def bulk_increment(self, deltas: List[Tuple[UUID, int]], values: dict, node: str, epoch: int) -> int:
+        # O epoch vai no filtro: um lote reaplicado (retry depois de uma falha de rede,
+        # recuperação do journal) não encontra o produto e não soma de novo.
+        field = f"quantity_epochs.{node}"
+        operations = [
+            UpdateOne(
+                {"_id": id, field: {"$not": {"$gte": epoch}}},
+                {"$inc": {"quantity": delta}, "$set": {**values, field: epoch}},
+            )
+            for id, delta in deltas
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def delete_one(self, id: UUID) -> bool:
+        result = await self.collection.delete_one({"_id": id})
+        return result.deleted_count > 0
+
+    async def bulk_update(self, updates: List[Tuple[UUID, dict]]) -> Tuple[int, int]:
+        operations = [UpdateOne({"_id": id}, {"$set": values}) for id, values in updates]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count, result.modified_count
+
+    async def bulk_delete(self, ids: List[UUID]) -> int:
+        operations = [DeleteOne({"_id": id}) for id in ids]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.deleted_count
@@ -1,6 +1,8 @@
-from pydantic import Field, UUID4
+from functools import lru_cache
+from pydantic import Field, PrivateAttr, UUID4, create_model
+from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import FrozenSet, List, Optional, Tuple, Type
 from src.schemas.base import BaseSchemaMixin
 
 class ProductIn(BaseSchemaMixin):
@@ -21,6 +23,12 @@ class ProductOut(ProductIn):
     created_at: datetime = Field(..., description="Data de criação do produto")
     updated_at: datetime = Field(..., description="Data da última atualização do produto")
 
+    def version(self) -> Tuple[UUID, datetime]:
+        """
+        Par (id, updated_at) usado como validador de cache HTTP (ETag).
+        """
+        return self.id, self.updated_at
+
 class ProductUpdate(BaseSchemaMixin):
     """
     Schema para atualização parcial de produtos.
@@ -28,4 +36,149 @@ class ProductUpdate(BaseSchemaMixin):
     """
     name: Optional[str] = Field(None, description="Novo nome do produto")
     quantity: Optional[int] = Field(None, description="Nova quantidade do produto em estoque")
-    price: Optional[float] = Field(None, description="Novo preço do produto")
\ No newline at end of file
+    price: Optional[float] = Field(None, description="Novo preço do produto")
+
+class StockChangeIn(BaseSchemaMixin):
+    """
+    Schema de entrada da reserva e da liberação de estoque.
+    """
+    quantity: int = Field(..., gt=0, description="Unidades a reservar ou liberar")
+
+class ReserveLine(StockChangeIn):
+    """
+    Linha da reserva em lote: o ID do produto e as unidades a reservar.
+    """
+    id: UUID = Field(..., description="ID do produto")
+
+class QuantityAdjustIn(BaseSchemaMixin):
+    """
+    Schema de entrada do ajuste de quantidade (positivo ou negativo).
+    """
+    delta: int = Field(..., description="Unidades a somar à quantidade (negativo para subtrair)")
+
+class QuantityAdjustQueuedOut(BaseSchemaMixin):
+    """
+    Schema de saída do ajuste aceito pelo buffer de quantidades (ainda não gravado).
+    """
+    id: UUID = Field(..., description="ID do produto")
+    pending: int = Field(..., description="Soma dos ajustes do produto ainda não gravados neste processo")
+
+class ReserveBatchOut(BaseSchemaMixin):
+    """
+    Schema de saída da reserva em lote (todas as linhas foram reservadas).
+    """
+    reserved: int = Field(..., description="Quantidade de linhas reservadas")
+    units: int = Field(..., description="Total de unidades reservadas")
+
+class BulkItemResult(BaseSchemaMixin):
+    """
+    Resultado de um item de uma operação em lote.
+    'index' é a posição do item no array enviado.
+    """
+    index: int = Field(..., description="Posição do item na requisição")
+    id: Optional[UUID4] = Field(None, description="ID do produto")
+    success: bool = Field(..., description="Indica se o item foi gravado")
+    error: Optional[str] = Field(None, description="Motivo da falha, quando houver")
+
+class BulkCreateOut(BaseSchemaMixin):
+    """
+    Schema de saída da criação de produtos em lote.
+    """
+    inserted: int = Field(..., description="Quantidade de produtos criados")
+    failed: int = Field(..., description="Quantidade de itens que falharam")
+    items: List[BulkItemResult] = Field(..., description="Resultado por item, na ordem da requisição")
+
+class ProductBulkUpdateItem(ProductUpdate):
+    """
+    Item de atualização em lote: o ID do produto mais os campos de ProductUpdate.
+    """
+    id: UUID = Field(..., description="ID do produto a ser atualizado")
+
+class ProductBulkDeleteIn(BaseSchemaMixin):
+    """
+    Schema de entrada da deleção de produtos em lote.
+    """
+    ids: List[UUID] = Field(..., description="IDs dos produtos a serem deletados")
+
+class BulkBatchResult(BaseSchemaMixin):
+    """
+    Contagens de um bloco enviado ao MongoDB em uma única chamada bulk_write.
+    """
+    batch: int = Field(..., description="Número do bloco, a partir de 0")
+    matched: int = Field(..., description="Produtos encontrados")
+    modified: int = Field(..., description="Produtos alterados (ou deletados)")
+    missing: int = Field(..., description="IDs sem produto correspondente")
+
+class BulkWriteOut(BaseSchemaMixin):
+    """
+    Schema de saída da atualização e da deleção em lote.
+    """
+    matched: int = Field(..., description="Total de produtos encontrados")
+    modified: int = Field(..., description="Total de produtos alterados (ou deletados)")
+    missing: int = Field(..., description="Total de IDs sem produto correspondente")
+    batches: List[BulkBatchResult] = Field(..., description="Contagens por bloco")
+
+class ProductChange(BaseSchemaMixin):
+    """
+    Item do feed de mudanças: o produto alterado (ou criado) ou o registro da remoção.
+    """
+    id: UUID = Field(..., description="ID do produto")
+    deleted: bool = Field(..., description="Indica se o produto foi deletado")
+    changed_at: datetime = Field(..., description="Data da mudança (updated_at do produto ou data da remoção)")
+    product: Optional[ProductOut] = Field(None, description="Produto atual (ausente em remoções)")
+
+class ProductChangesOut(BaseSchemaMixin):
+    """
+    Página do feed de mudanças, em ordem de (changed_at, id).
+    """
+    items: List[ProductChange] = Field(..., description="Mudanças da página")
+    next_cursor: str = Field(..., description="Token para continuar a partir do último item; guarde-o mesmo quando a página vier vazia")
+    has_more: bool = Field(..., description="Indica se já existem mais mudanças depois desta página")
+
+class PriceBucket(BaseSchemaMixin):
+    """
+    Faixa do histograma de preços: inclui 'lower' e exclui 'upper'.
+    """
+    lower: float = Field(..., description="Limite inferior (inclusivo)")
+    upper: float = Field(..., description="Limite superior (exclusivo)")
+    count: int = Field(..., description="Produtos com preço na faixa")
+
+class ProductStatsOut(BaseSchemaMixin):
+    """
+    Schema de saída das estatísticas do catálogo.
+    Os campos de preço são None quando não há produtos.
+    """
+    count: int = Field(..., description="Quantidade de produtos")
+    total_quantity: int = Field(..., description="Soma das quantidades em estoque")
+    inventory_value: float = Field(..., description="Valor total do estoque (soma de price * quantity)")
+    price_sum: float = Field(..., description="Soma dos preços")
+    price_avg: Optional[float] = Field(None, description="Preço médio")
+    price_min: Optional[float] = Field(None, description="Menor preço")
+    price_max: Optional[float] = Field(None, description="Maior preço")
+    histogram: List[PriceBucket] = Field(..., description="Histograma de preços, na ordem dos limites")
+    outside_histogram: int = Field(..., description="Produtos com preço fora dos limites do histograma")
+
+class ProductFields(BaseSchemaMixin):
+    """
+    Base dos schemas de saída parciais (sparse fieldsets, '?fields=').
+    Guarda fora da resposta o par (id, updated_at) para o cálculo do ETag,
+    mesmo quando esses campos não foram pedidos.
+    """
+    _version: Optional[Tuple[UUID, datetime]] = PrivateAttr(default=None)
+
+    def version(self) -> Tuple[UUID, datetime]:
+        return self._version
+
+PRODUCT_FIELDS: Tuple[str, ...] = tuple(ProductOut.model_fields)
+
+@lru_cache(maxsize=None)
+def product_fields_model(fields: FrozenSet[str]) -> Type[ProductFields]:
+    """
+    Cria (e memoriza) um schema de saída contendo apenas os campos pedidos de ProductOut.
+    """
+    definitions = {
+        name: (ProductOut.model_fields[name].annotation, ProductOut.model_fields[name])
+        for name in PRODUCT_FIELDS if name in fields
+    }
+    suffix = "_".join(name for name in PRODUCT_FIELDS if name in fields)
+    return create_model(f"ProductOut_{suffix}", __base__=ProductFields, **definitions)
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import json
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from src.core.text import normalize_name
+from src.database import client_options
+from src.settings import Settings
+
+class BackfillReport(BaseModel):
+    """
+    Resultado do preenchimento de um campo derivado.
+    """
+    field: str = Field(..., description="Campo preenchido")
+    pending: int = Field(0, description="Documentos sem o campo encontrados")
+    updated: int = Field(0, description="Documentos atualizados agora")
+
+async def backfill_name_normalized(collection: AsyncIOMotorCollection, batch_size: int = 1000, check_only: bool = False) -> BackfillReport:
+    """
+    Preenche 'name_normalized' (busca por prefixo) nos produtos gravados antes de o
+    campo existir, em lotes de 'batch_size' por bulk_write. Idempotente: só visita
+    os documentos sem o campo, então pode ser interrompido e executado de novo.
+
+    'updated_at' não é alterado: o campo é interno e não muda a representação do
+    produto (ETags, cache HTTP e o feed de mudanças continuam valendo).
+    """
+    report = BackfillReport(field="name_normalized")
+    query = {"name_normalized": {"$exists": False}}
+    if check_only:
+        report.pending = await collection.count_documents(query)
+        return report
+
+    async def write(operations: list) -> None:
+        result = await collection.bulk_write(operations, ordered=False)
+        report.updated += result.modified_count
+
+    operations = []
+    async for document in collection.find(query, {"name": 1}, batch_size=batch_size):
+        report.pending += 1
+        # O filtro inclui o nome lido: se o produto for renomeado no meio do caminho,
+        # o update já grava o 'name_normalized' novo e este é ignorado
+        operations.append(UpdateOne(
+            {"_id": document["_id"], "name": document["name"], **query},
+            {"$set": {"name_normalized": normalize_name(document["name"])}},
+        ))
+        if len(operations) >= batch_size:
+            await write(operations)
+            operations = []
+    if operations:
+        await write(operations)
+    return report
+
+async def _main(check_only: bool) -> int:
+    settings = Settings()
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options(settings))
+    try:
+        report = await backfill_name_normalized(client.get_database().get_collection("products"), check_only=check_only)
+    finally:
+        client.close()
+
+    print(json.dumps(report.model_dump(), indent=2))
+    return 1 if check_only and report.pending else 0
+
+if __name__ == "__main__":
+    # Uso em deploys, depois da reconciliação de índices: python -m src.usecases.backfill [--check]
+    parser = argparse.ArgumentParser(description="Preenche campos derivados ausentes nos produtos existentes.")
+    parser.add_argument("--check", action="store_true", help="Apenas conta os produtos pendentes; sai com código 1 se houver algum")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(check_only=args.check)))
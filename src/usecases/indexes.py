@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, TEXT, IndexModel
+
+from src.database import client_options
+from src.settings import Settings, settings
+
+# Registro declarativo dos índices de cada coleção.
+# Todo índice precisa de um 'name' explícito: é por ele que a reconciliação compara.
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "products": [
+        # Filtros de faixa de preço (get_by_price_range)
+        IndexModel([("price", ASCENDING)], name="price_1"),
+        # Feed de mudanças (/products/changes), keyset por (updated_at, _id); também
+        # atende as consultas só por updated_at (prefixo do índice)
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1"),
+        # Paginação por keyset ordenada por (price, _id)
+        IndexModel([("price", ASCENDING), ("_id", ASCENDING)], name="price_1__id_1"),
+        # Busca por prefixo (regex ancorada em /products/search), ordenada por nome
+        IndexModel([("name_normalized", ASCENDING), ("_id", ASCENDING)], name="name_normalized_1__id_1"),
+        # Busca textual ($text em /products/search?mode=text)
+        IndexModel([("name", TEXT)], name="name_text", default_language="portuguese"),
+    ],
+    "product_tombstones": [
+        # Remoções no feed de mudanças, keyset por (deleted_at, _id)
+        IndexModel([("deleted_at", ASCENDING), ("_id", ASCENDING)], name="deleted_at_1__id_1"),
+        # Expiração dos registros de remoção (TTL)
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=settings.CHANGES_TOMBSTONE_TTL_SECONDS),
+    ],
+}
+
+class IndexReport(BaseModel):
+    """
+    Resultado da reconciliação dos índices de uma coleção.
+    """
+    collection: str = Field(..., description="Nome da coleção")
+    created: List[str] = Field(default_factory=list, description="Índices declarados que foram criados agora")
+    missing: List[str] = Field(default_factory=list, description="Índices declarados que ainda não existem (modo check)")
+    modified: List[str] = Field(default_factory=list, description="Índices cujo TTL (expireAfterSeconds) foi ajustado agora com collMod")
+    mismatched: List[str] = Field(default_factory=list, description="Índices com o mesmo nome mas definição diferente")
+    undeclared: List[str] = Field(default_factory=list, description="Índices existentes que não estão no registro")
+
+def _normalize_key(key) -> list:
+    # O servidor pode devolver a direção como float (1.0); o IndexModel guarda int
+    items = key.items() if hasattr(key, "items") else key
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in items]
+
+def _existing_key(info: dict) -> list:
+    # Índices de texto são devolvidos como {'_fts': 'text', '_ftsx': 1}; os campos
+    # indexados ficam em 'weights'. Convertemos para o formato declarado.
+    key = _normalize_key(info["key"])
+    if "weights" not in info:
+        return key
+    text_fields = [(field, TEXT) for field in sorted(info["weights"])]
+    return [item for item in key if item[0] not in ("_fts", "_ftsx")] + text_fields
+
+def _declared_key(model: IndexModel) -> list:
+    key = _normalize_key(model.document["key"])
+    return [item for item in key if item[1] != TEXT] + sorted(item for item in key if item[1] == TEXT)
+
+# Opções comparadas além da chave. As demais que o servidor devolve (versão do
+# índice, language_override...) não fazem parte das declarações do registro.
+_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "default_language", "partialFilterExpression")
+
+def _options(document: dict, key: list) -> dict:
+    options = {name: document[name] for name in _OPTIONS if document.get(name) not in (None, False)}
+    if "expireAfterSeconds" in options:
+        options["expireAfterSeconds"] = int(options["expireAfterSeconds"])
+    if any(direction == TEXT for _, direction in key):
+        # Padrão do servidor para índices de texto sem idioma declarado
+        options.setdefault("default_language", "english")
+    return options
+
+def _ttl_only_change(existing: dict, declared: dict) -> bool:
+    # Só o expireAfterSeconds muda (e existe nos dois lados): ajustável com collMod,
+    # sem recriar o índice
+    if "expireAfterSeconds" not in existing or "expireAfterSeconds" not in declared:
+        return False
+    others = lambda options: {name: value for name, value in options.items() if name != "expireAfterSeconds"}
+    return others(existing) == others(declared)
+
+async def ensure_indexes(database: AsyncIOMotorDatabase, registry: Dict[str, List[IndexModel]] = INDEX_REGISTRY, check_only: bool = False) -> List[IndexReport]:
+    """
+    Reconcilia os índices do banco com o registro, de forma idempotente.
+    Cria apenas os índices que faltam (a não ser em 'check_only') e nunca remove
+    índices: os que existem sem estar declarados são apenas reportados.
+
+    Além da chave, compara as opções (TTL, idioma do texto, unique...). Uma
+    mudança só do TTL é aplicada com collMod; as demais divergências são
+    reportadas em 'mismatched', como as de chave, para recriação manual.
+    """
+    reports = []
+    for collection_name, models in registry.items():
+        collection = database.get_collection(collection_name)
+        existing = await collection.index_information()
+        declared = {model.document["name"]: model for model in models}
+        report = IndexReport(collection=collection_name)
+
+        to_create = []
+        for name, model in declared.items():
+            if name not in existing:
+                to_create.append(model)
+                continue
+            key = _declared_key(model)
+            if _existing_key(existing[name]) != key:
+                report.mismatched.append(name)
+                continue
+            existing_options, declared_options = _options(existing[name], key), _options(model.document, key)
+            if existing_options == declared_options:
+                continue
+            if check_only or not _ttl_only_change(existing_options, declared_options):
+                report.mismatched.append(name)
+            else:
+                await database.command("collMod", collection_name, index={
+                    "name": name, "expireAfterSeconds": declared_options["expireAfterSeconds"],
+                })
+                report.modified.append(name)
+
+        if to_create:
+            names = [model.document["name"] for model in to_create]
+            if check_only:
+                report.missing = names
+            else:
+                await collection.create_indexes(to_create)
+                report.created = names
+
+        report.undeclared = sorted(name for name in existing if name not in declared and name != "_id_")
+        reports.append(report)
+    return reports
+
+async def _main(check_only: bool) -> int:
+    settings = Settings()
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **client_options(settings))
+    try:
+        reports = await ensure_indexes(client.get_database(), check_only=check_only)
+    finally:
+        client.close()
+
+    print(json.dumps([report.model_dump() for report in reports], indent=2))
+    pending = any(report.missing or report.mismatched for report in reports)
+    return 1 if pending else 0
+
+if __name__ == "__main__":
+    # Uso em deploys: python -m src.usecases.indexes [--check]
+    parser = argparse.ArgumentParser(description="Reconcilia os índices do MongoDB com o registro declarado.")
+    parser.add_argument("--check", action="store_true", help="Apenas reporta, sem criar índices; sai com código 1 se houver pendências")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(check_only=args.check)))
@@ -1,94 +1,481 @@
-from typing import List, Optional
+from typing import AsyncIterator, FrozenSet, List, Optional, Sequence, Tuple, Union
 from uuid import UUID, uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
 
-from src.schemas.product import ProductIn, ProductOut, ProductUpdate
-from src.core.exceptions import NotFoundException
+from src.schemas.product import (
+    BulkBatchResult, BulkCreateOut, BulkItemResult, BulkWriteOut, PriceBucket,
+    ProductBulkUpdateItem, ProductChange, ProductChangesOut, ProductFields, ProductIn, ProductOut,
+    ProductStatsOut, ProductUpdate,
+    ReserveBatchOut, ReserveLine,
+    product_fields_model,
+)
+from src.core.cache import LRUCache
+from src.core.deadline import deadline, detached, query_deadline
+from src.core.exceptions import ExpiredWatermarkException, InsufficientStockException, NotFoundException
+from src.core.singleflight import SingleFlight
+from src.core.pagination import SORT_FIELDS, decode_change_cursor, decode_cursor, encode_change_cursor, encode_cursor
+from src.core.text import normalize_name
+from src.core.timing import timed
+from src.repositories.product import MongoProductRepository, ProductRepository
+
+def _now() -> datetime:
+    # O MongoDB guarda datas com precisão de milissegundos. Truncamos aqui para que o
+    # modelo devolvido sem reler o banco seja idêntico ao que uma leitura posterior traria.
+    now = datetime.now()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def _projection(fields: FrozenSet[str], *extra: str) -> dict:
+    # '_id' e 'updated_at' sempre vêm do banco: o primeiro vira 'id' e os dois formam o ETag.
+    # 'extra' inclui campos necessários internamente, como a chave do cursor de paginação.
+    projection = {"_id": 1, "updated_at": 1}
+    for name in (*fields, *extra):
+        if name not in ("id", "_id"):
+            projection[name] = 1
+    return projection
+
+def _to_product(document: dict, fields: Optional[FrozenSet[str]] = None, trusted: bool = False) -> Union[ProductOut, ProductFields]:
+    model = ProductOut if fields is None else product_fields_model(fields)
+    if trusted:
+        # Documento gravado pela própria API: model_construct pula a validação.
+        # Apenas os campos do schema são copiados (o documento tem extras como '_id').
+        values = {name: document[name] for name in model.model_fields if name in document}
+        if "id" in model.model_fields:
+            values["id"] = document["_id"]
+        product = model.model_construct(**values)
+    elif fields is None:
+        return ProductOut(**document)
+    else:
+        product = model(**{**document, "id": document["_id"]})
+    if fields is not None:
+        product._version = (document["_id"], document["updated_at"])
+    return product
 
 class ProductUsecase:
-    def __init__(self, client: AsyncIOMotorClient):
-        self.collection = client.get_database().get_collection("products")
+    def __init__(self, client: Optional[AsyncIOMotorClient] = None, cache: Optional[LRUCache] = None, trusted_reads: bool = False, repository: Optional[ProductRepository] = None, flights: Optional[SingleFlight] = None):
+        if repository is None:
+            repository = MongoProductRepository(client.get_database().get_collection("products"))
+        self.repository = repository
+        self.cache = cache
+        self.trusted_reads = trusted_reads
+        self.flights = flights
 
-    async def create(self, body: ProductIn) -> ProductOut:
+    @property
+    def collection(self):
+        # Coleção do Motor quando o repositório é o do MongoDB (None nos demais)
+        return getattr(self.repository, "collection", None)
+
+    def _invalidate(self, *ids: UUID) -> None:
+        if self.cache is not None:
+            for id in ids:
+                self.cache.invalidate(id)
+        if self.flights is not None:
+            # Leituras iniciadas depois da escrita não devem receber um resultado anterior a ela
+            for id in ids:
+                self.flights.forget("id", id)
+            self.flights.forget("price_range")
+
+    async def _coalesce(self, key: tuple, function):
+        # Leituras idênticas e concorrentes compartilham uma única consulta (SingleFlight)
+        if self.flights is None:
+            return await function()
+        # A execução compartilhada roda fora do contexto da requisição (sem o prazo
+        # nem as medições de quem a iniciou): a espera de cada chamador conta como 'db'
+        with timed("db"):
+            return await self.flights.do(key, function)
+
+    def _build_product(self, body: ProductIn) -> Tuple[ProductOut, dict]:
         # Gerar o UUID para o ID do produto
         product_id = uuid4()
-        
+        now = _now()
+
         # Criar o objeto ProductOut com o ID gerado e timestamps
         product_out_data = {
             "id": product_id,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
+            "created_at": now,
+            "updated_at": now,
             **body.model_dump()
         }
         product = ProductOut(**product_out_data)
-        
+
         # O MongoDB usa '_id' por padrão. Mapeamos o 'id' do Pydantic para '_id' no DB.
         # Ao usar product.model_dump(by_alias=True), o Pydantic já deveria fazer isso
         # se você configurou o alias corretamente no ProductOut.
         # No entanto, para garantir, vamos criar o dicionário para inserção explicitamente.
         db_product_data = product.model_dump(by_alias=True)
         db_product_data["_id"] = product_id # Garante que _id é o UUID
+        # Campo interno para a busca por prefixo; não faz parte do ProductOut
+        db_product_data["name_normalized"] = normalize_name(product.name)
+        return product, db_product_data
+
+    async def create(self, body: ProductIn) -> ProductOut:
+        product, db_product_data = self._build_product(body)
+
+        # O documento gravado é exatamente o ProductOut construído acima,
+        # então não é preciso relê-lo do banco: um único round trip.
+        with timed("db"), query_deadline():
+            await self.repository.insert_one(db_product_data)
+        self._invalidate()
+        return product
+
+    async def create_many(self, bodies: List[ProductIn], chunk_size: int = 1000, chunk_timeout: Optional[float] = None) -> BulkCreateOut:
+        items = []
+        built = [self._build_product(body) for body in bodies]
+
+        # insert_many não ordenado, em blocos: um round trip por bloco e uma falha
+        # isolada (ex.: chave duplicada) não interrompe o restante do bloco.
+        # Cada bloco tem 'chunk_timeout' segundos, no lugar do prazo total da requisição.
+        try:
+            for start in range(0, len(built), chunk_size):
+                chunk = built[start:start + chunk_size]
+                errors = {}
+                chunk_error = None
+                try:
+                    with deadline(chunk_timeout, override=True), timed("db"), query_deadline():
+                        errors = await self.repository.insert_many([document for _, document in chunk])
+                except PyMongoError as e:
+                    # Falha do bloco inteiro (rede...): reporta todos os itens do bloco.
+                    # O prazo do bloco estourado não cai aqui: vira 504.
+                    chunk_error = str(e)
+
+                for offset, (product, _) in enumerate(chunk):
+                    error = chunk_error or errors.get(offset)
+                    items.append(BulkItemResult(
+                        index=start + offset,
+                        id=product.id,
+                        success=error is None,
+                        error=error,
+                    ))
+        finally:
+            self._invalidate()
 
-        await self.collection.insert_one(db_product_data)
-        
-        # Após a inserção, recuperamos o produto do banco de dados para garantir que todos os campos
-        # gerados pelo DB (como _id) estejam presentes e corretos para a validação do ProductOut.
-        # Usamos o ID que geramos para a busca.
-        created_product_db = await self.collection.find_one({"_id": product_id})
-        if not created_product_db:
-            raise Exception("Product not found immediately after creation.")
-        return ProductOut(**created_product_db)
+        inserted = sum(1 for item in items if item.success)
+        return BulkCreateOut(inserted=inserted, failed=len(items) - inserted, items=items)
 
     async def get_all(self) -> List[ProductOut]:
-        products = []
-        # O método .find() retorna um cursor.
-        cursor = self.collection.find()
-        async for product in cursor: # Iterar sobre o cursor retornado
-            products.append(ProductOut(**product))
-        return products
-
-    async def get_by_id(self, id: UUID) -> Optional[ProductOut]:
-        product = await self.collection.find_one({"_id": id})
+        with timed("db"), query_deadline():
+            documents = await self.repository.find_by_price_range()
+        with timed("model"):
+            return [ProductOut(**product) for product in documents]
+
+    async def get_page(self, limit: int, after: Optional[str] = None, sort_by: str = "id", fields: Optional[FrozenSet[str]] = None) -> Tuple[List[Union[ProductOut, ProductFields]], Optional[str]]:
+        field = SORT_FIELDS[sort_by]
+        last_seen = decode_cursor(after, sort_by) if after else None
+        projection = _projection(fields, field) if fields is not None else None
+
+        # Pedimos um item a mais para saber se existe uma próxima página
+        with timed("db"), query_deadline():
+            documents = await self.repository.find_page(field, limit + 1, after=last_seen, projection=projection)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(sort_by, documents[-1])
+        with timed("model"):
+            return [_to_product(product, fields, self.trusted_reads) for product in documents], next_cursor
+
+    async def get_by_id(self, id: UUID, fields: Optional[FrozenSet[str]] = None) -> Optional[Union[ProductOut, ProductFields]]:
+        if self.cache is not None:
+            cached = self.cache.get(id)
+            if cached is not None:
+                if fields is None:
+                    return cached
+                return _to_product({**cached.model_dump(), "_id": cached.id}, fields, self.trusted_reads)
+        return await self._coalesce(("id", id, fields), lambda: self._load_by_id(id, fields))
+
+    async def _load_by_id(self, id: UUID, fields: Optional[FrozenSet[str]]) -> Optional[Union[ProductOut, ProductFields]]:
+        if fields is not None:
+            # Leitura parcial: projeção no MongoDB, sem popular o cache (que guarda o documento completo)
+            with timed("db"), query_deadline():
+                product = await self.repository.find_one(id, _projection(fields))
+            with timed("model"):
+                return _to_product(product, fields, self.trusted_reads) if product else None
+
+        # Geração anterior à leitura: se uma escrita invalidar o produto enquanto a
+        # consulta está em andamento, o documento lido não volta para o cache
+        generation = self.cache.generation() if self.cache is not None else None
+        with timed("db"), query_deadline():
+            product = await self.repository.find_one(id)
         if not product:
             return None
-        return ProductOut(**product)
+        with timed("model"):
+            product = _to_product(product, trusted=self.trusted_reads)
+        if self.cache is not None:
+            self.cache.set(id, product, generation=generation)
+        return product
 
-    async def update(self, id: UUID, body: ProductUpdate) -> Optional[ProductOut]:
-        product = await self.collection.find_one({"_id": id})
+    async def get_version(self, id: UUID) -> Optional[datetime]:
+        # Consulta projetada: traz apenas 'updated_at' para validar ETag/Last-Modified
+        # sem materializar o documento inteiro.
+        if self.cache is not None:
+            cached = self.cache.get(id)
+            if cached is not None:
+                return cached.updated_at
+
+        with timed("db"), query_deadline():
+            product = await self.repository.find_one(id, {"updated_at": 1})
         if not product:
             return None
+        return product["updated_at"]
 
+    async def update(self, id: UUID, body: ProductUpdate) -> Optional[ProductOut]:
         update_data = body.model_dump(exclude_none=True)
-        update_data["updated_at"] = datetime.now()
+        update_data["updated_at"] = _now()
+        if "name" in update_data:
+            update_data["name_normalized"] = normalize_name(update_data["name"])
 
         # Garante que o ID não seja atualizado
         if "_id" in update_data:
             del update_data["_id"]
 
-        await self.collection.update_one({"_id": id}, {"$set": update_data})
-
-        # Recupera o documento atualizado para retornar
-        updated_product = await self.collection.find_one({"_id": id})
+        # Atualiza e devolve o documento já atualizado em um único comando atômico
+        with timed("db"), query_deadline():
+            updated_product = await self.repository.update_one(id, update_data)
+        self._invalidate(id)
+        if not updated_product:
+            return None
         return ProductOut(**updated_product)
 
+    async def reserve(self, id: UUID, quantity: int) -> Optional[ProductOut]:
+        # Decremento condicional ($inc com quantity >= n no filtro): um round trip,
+        # sem perder atualizações sob concorrência.
+        with timed("db"), query_deadline():
+            product = await self.repository.adjust_quantity(id, -quantity, {"updated_at": _now()}, minimum=quantity)
+        self._invalidate(id)
+        if product:
+            return ProductOut(**product)
+
+        # Só no caminho de erro: distingue produto inexistente de estoque insuficiente
+        with timed("db"), query_deadline():
+            current = await self.repository.find_one(id, {"quantity": 1})
+        if current is None:
+            return None
+        raise InsufficientStockException(
+            f"Insufficient stock for product {id}: requested {quantity}, available {current['quantity']}"
+        )
+
+    async def reserve_batch(self, lines: List[ReserveLine], transaction: bool = False) -> ReserveBatchOut:
+        # Todas as linhas em um único bulk_write ordenado; se uma falha, o repositório
+        # desfaz as anteriores (ou aborta a transação) e nada fica reservado.
+        with timed("db"), query_deadline():
+            failed = await self.repository.reserve_many(
+                [(line.id, line.quantity) for line in lines], {"updated_at": _now()}, transaction=transaction,
+            )
+        self._invalidate(*(line.id for line in lines))
+        if failed is None:
+            return ReserveBatchOut(reserved=len(lines), units=sum(line.quantity for line in lines))
+
+        # Só no caminho de erro: descobre o motivo da falha da linha
+        line = lines[failed]
+        with timed("db"), query_deadline():
+            current = await self.repository.find_one(line.id, {"quantity": 1})
+        if current is None:
+            raise NotFoundException(f"Product not found with id: {line.id} (item {failed})")
+        raise InsufficientStockException(
+            f"Insufficient stock for product {line.id} (item {failed}): requested {line.quantity}, available {current['quantity']}"
+        )
+
+    async def release(self, id: UUID, quantity: int) -> Optional[ProductOut]:
+        with timed("db"), query_deadline():
+            product = await self.repository.adjust_quantity(id, quantity, {"updated_at": _now()})
+        self._invalidate(id)
+        if not product:
+            return None
+        return ProductOut(**product)
+
+    async def adjust(self, id: UUID, delta: int) -> Optional[ProductOut]:
+        # Ajuste livre (positivo ou negativo), sem verificação de estoque
+        with timed("db"), query_deadline():
+            product = await self.repository.adjust_quantity(id, delta, {"updated_at": _now()})
+        self._invalidate(id)
+        if not product:
+            return None
+        return ProductOut(**product)
+
+    async def apply_quantity_deltas(self, deltas: List[Tuple[UUID, int]], node: str, epoch: int) -> int:
+        """
+        Aplica um lote de ajustes agregados pelo QuantityBuffer: um '$inc' por produto
+        em um único bulk_write. Idempotente por (node, epoch).
+        """
+        with timed("db"), query_deadline():
+            modified = await self.repository.bulk_increment(deltas, {"updated_at": _now()}, node, epoch)
+        self._invalidate(*(id for id, _ in deltas))
+        return modified
+
     async def delete(self, id: UUID) -> bool:
-        # Primeiro, tenta deletar o produto.
-        result = await self.collection.delete_one({"_id": id})
-        return result.deleted_count > 0
-
-    async def get_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[ProductOut]:
-        query = {}
-        if min_price is not None and max_price is not None:
-            query["price"] = {"$gte": min_price, "$lte": max_price}
-        elif min_price is not None:
-            query["price"] = {"$gte": min_price}
-        elif max_price is not None:
-            query["price"] = {"$lte": max_price}
-
-        products = []
-        cursor = self.collection.find(query)
-        async for product in cursor: # Iterar sobre o cursor retornado
-            products.append(ProductOut(**product))
-        return products
\ No newline at end of file
+        with timed("db"), query_deadline():
+            deleted = await self.repository.delete_one(id)
+        with timed("db"):
+            await self._record_deletions([id])
+        self._invalidate(id)
+        return deleted
+
+    async def _record_deletions(self, ids: List[UUID]) -> None:
+        # Registro das remoções para o feed de mudanças, fora do prazo da requisição
+        # e sem ser interrompido se o cliente desconectar: com o produto já deletado,
+        # perder o registro deixaria a remoção fora do feed. Também é gravado quando
+        # nada foi deletado, para que repetir um delete interrompido entre as duas
+        # escritas ainda registre a remoção (IDs desconhecidos só geram remoções extras).
+        await detached(lambda: self.repository.insert_tombstones(ids, _now()))
+
+    async def iter_products(self, min_price: Optional[float] = None, max_price: Optional[float] = None, batch_size: int = 500, fields: Optional[FrozenSet[str]] = None, batch_timeout: Optional[float] = None) -> AsyncIterator[Union[ProductOut, ProductFields]]:
+        # Gerador assíncrono: apenas um lote de 'batch_size' documentos fica em memória.
+        # É consumido depois que os headers da resposta já foram enviados, quando um
+        # 504 não é mais possível: o prazo total da requisição não vale aqui e cada
+        # leitura do cursor (no máximo um getMore) tem 'batch_timeout' segundos.
+        projection = _projection(fields) if fields is not None else None
+        documents = self.repository.iter_by_price_range(min_price, max_price, projection=projection, batch_size=batch_size)
+        try:
+            while True:
+                with deadline(batch_timeout, override=True), timed("db"), query_deadline():
+                    try:
+                        document = await documents.__anext__()
+                    except StopAsyncIteration:
+                        return
+                with timed("model"):
+                    product = _to_product(document, fields, self.trusted_reads)
+                yield product
+        finally:
+            # Fecha o cursor também quando o consumidor para no meio (ex.: cliente desconectou)
+            await documents.aclose()
+
+    async def _chunked(self, write, items: list, chunk_size: int, deleting: bool = False, chunk_timeout: Optional[float] = None) -> BulkWriteOut:
+        # Como no streaming, o prazo total da requisição não vale aqui: um lote grande
+        # não cabe nele, e um 504 depois de blocos já gravados perderia o resultado
+        # deles. Cada bloco tem 'chunk_timeout' segundos.
+        batches = []
+        for number, start in enumerate(range(0, len(items), chunk_size)):
+            chunk = items[start:start + chunk_size]
+            with deadline(chunk_timeout, override=True), timed("db"), query_deadline():
+                if deleting:
+                    matched = modified = await write(chunk)
+                else:
+                    matched, modified = await write(chunk)
+            batches.append(BulkBatchResult(
+                batch=number,
+                matched=matched,
+                modified=modified,
+                missing=len(chunk) - matched,
+            ))
+
+        return BulkWriteOut(
+            matched=sum(b.matched for b in batches),
+            modified=sum(b.modified for b in batches),
+            missing=sum(b.missing for b in batches),
+            batches=batches,
+        )
+
+    async def update_many(self, items: List[ProductBulkUpdateItem], chunk_size: int = 1000, chunk_timeout: Optional[float] = None) -> BulkWriteOut:
+        now = _now()
+        # Um update por produto: itens repetidos são combinados na ordem recebida (o
+        # último valor de cada campo vence, como se fossem aplicados em sequência) e
+        # o 'missing' de cada bloco conta produtos, não itens
+        updates = {}
+        for item in items:
+            update_data = item.model_dump(exclude_none=True, exclude={"id"})
+            update_data["updated_at"] = now
+            if "name" in update_data:
+                update_data["name_normalized"] = normalize_name(update_data["name"])
+            updates.setdefault(item.id, {}).update(update_data)
+        try:
+            return await self._chunked(self.repository.bulk_update, list(updates.items()), chunk_size, chunk_timeout=chunk_timeout)
+        finally:
+            self._invalidate(*(item.id for item in items))
+
+    async def delete_many(self, ids: List[UUID], chunk_size: int = 1000, chunk_timeout: Optional[float] = None) -> BulkWriteOut:
+        async def delete_chunk(chunk: List[UUID]) -> int:
+            deleted = await self.repository.bulk_delete(chunk)
+            # O bulk_write não diz quais foram deletados, mas ao final nenhum ID do
+            # bloco existe mais: todos são registrados
+            await self._record_deletions(chunk)
+            return deleted
+
+        try:
+            # IDs repetidos seriam contados como ausentes: o segundo delete não encontra nada
+            return await self._chunked(delete_chunk, list(dict.fromkeys(ids)), chunk_size, deleting=True, chunk_timeout=chunk_timeout)
+        finally:
+            self._invalidate(*ids)
+
+    async def get_by_price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None, fields: Optional[FrozenSet[str]] = None) -> List[Union[ProductOut, ProductFields]]:
+        products = await self._coalesce(
+            ("price_range", min_price, max_price, fields),
+            lambda: self._load_by_price_range(min_price, max_price, fields),
+        )
+        # Cópia da lista: ela é compartilhada entre os chamadores agrupados
+        return list(products)
+
+    async def _load_by_price_range(self, min_price: Optional[float], max_price: Optional[float], fields: Optional[FrozenSet[str]]) -> List[Union[ProductOut, ProductFields]]:
+        projection = _projection(fields) if fields is not None else None
+        with timed("db"), query_deadline():
+            documents = await self.repository.find_by_price_range(min_price, max_price, projection=projection)
+        with timed("model"):
+            return [_to_product(product, fields, self.trusted_reads) for product in documents]
+
+    async def search(self, q: str, mode: str = "prefix", limit: int = 20, fields: Optional[FrozenSet[str]] = None) -> List[Union[ProductOut, ProductFields]]:
+        projection = _projection(fields) if fields is not None else None
+        if mode == "text":
+            with timed("db"), query_deadline():
+                documents = await self.repository.find_by_text(q, limit, projection=projection)
+        else:
+            prefix = normalize_name(q)
+            if not prefix:
+                return []
+            with timed("db"), query_deadline():
+                documents = await self.repository.find_by_name_prefix(prefix, limit, projection=projection)
+        with timed("model"):
+            return [_to_product(product, fields, self.trusted_reads) for product in documents]
+
+    async def get_stats(self, boundaries: Sequence[float]) -> ProductStatsOut:
+        with timed("db"), query_deadline():
+            stats = await self.repository.price_stats(boundaries)
+        buckets = stats.pop("buckets")
+        outside = stats.pop("outside")
+        # Faixas sem produtos não vêm da agregação: completamos com zero
+        histogram = [
+            PriceBucket(lower=lower, upper=upper, count=buckets.get(lower, 0))
+            for lower, upper in zip(boundaries, boundaries[1:])
+        ]
+        return ProductStatsOut(**stats, histogram=histogram, outside_histogram=outside)
+
+    async def get_changes(self, since: Optional[datetime] = None, after: Optional[str] = None, limit: int = 100, settle_ms: int = 1000, retention_seconds: Optional[float] = None) -> ProductChangesOut:
+        """
+        Página do feed de mudanças: produtos alterados e remoções depois da posição
+        ('after', o token da página anterior, ou a data 'since'), em ordem de (data, id).
+        Sem posição, começa do início (sincronização completa).
+
+        A data de atualização é gerada pela aplicação antes da escrita, então uma escrita
+        em andamento pode gravar uma data anterior à de outra já visível. O feed só
+        entrega mudanças com mais de 'settle_ms' para que o token não passe por cima dela.
+        """
+        position = decode_change_cursor(after) if after else (since, None)
+        now = _now()
+        if retention_seconds is not None and position[0] is not None and position[0] < now - timedelta(seconds=retention_seconds):
+            raise ExpiredWatermarkException(
+                "Changes position is older than the deletion retention; a full resync is required"
+            )
+        until = now - timedelta(milliseconds=settle_ms)
+        after_position = position if position[0] is not None else None
+
+        # Um item a mais de cada fonte para saber se existe uma próxima página
+        with timed("db"), query_deadline():
+            changed = await self.repository.find_changed(after_position, until, limit + 1)
+            deleted = await self.repository.find_deleted(after_position, until, limit + 1)
+
+        with timed("model"):
+            changes = [
+                ProductChange(id=document["_id"], deleted=False, changed_at=document["updated_at"], product=_to_product(document, trusted=self.trusted_reads))
+                for document in changed
+            ] + [
+                ProductChange(id=document["_id"], deleted=True, changed_at=document["deleted_at"])
+                for document in deleted
+            ]
+            changes.sort(key=lambda change: (change.changed_at, change.id))
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            next_cursor = encode_change_cursor(changes[-1].changed_at, changes[-1].id)
+        else:
+            next_cursor = after or encode_change_cursor(*position)
+        return ProductChangesOut(items=changes, next_cursor=next_cursor, has_more=has_more)
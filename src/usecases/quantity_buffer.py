@@ -0,0 +1,314 @@
+import asyncio
+import contextvars
+import fcntl
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+
+from src.usecases.product import ProductUsecase
+
+def _records(node: str, last_epoch: int, pending: Dict[UUID, int], unconfirmed: List[Tuple[int, List[Tuple[UUID, int]]]] = ()) -> bytes:
+    # Conteúdo de um journal compactado: o node, os flushes a repetir e os ajustes pendentes
+    records = [{"node": node, "epoch": last_epoch}]
+    records += [{"retry": epoch, "items": [[str(id), delta] for id, delta in items]} for epoch, items in unconfirmed]
+    records += [{"d": [str(id), delta]} for id, delta in pending.items()]
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Falhas do flush já ficam em 'failures'; marca a exceção como observada
+    if not task.cancelled():
+        task.exception()
+
+class QuantityJournal:
+    """
+    Journal em disco (JSON por linha) dos ajustes ainda não aplicados no MongoDB.
+
+    Registros: {"node": ..., "epoch": ...} no início (o node e o último epoch usado),
+    {"d": [id, delta]} por ajuste recebido, {"f": epoch, "items": [...]} antes de
+    cada flush e {"ok": epoch} depois.
+    Na compactação, os flushes sem confirmação são regravados como {"retry": ...},
+    que não descontam dos ajustes pendentes.
+    Cada worker trava (flock) o primeiro quantity-N.lock livre do diretório e usa o
+    quantity-N.journal correspondente. A trava fica em um arquivo à parte porque a
+    compactação troca o journal com os.replace (outro inode): uma trava no journal
+    poderia ser obtida no arquivo antigo por outro worker. Ao reiniciar, o worker
+    que pegar a trava de um processo que caiu recupera o que faltou.
+    O node fica no arquivo: cada arquivo é um node estável, e os produtos guardam
+    um epoch por arquivo (não por execução do processo).
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._file = None
+        self._lock = None
+        # Registros gravados durante uma compactação, copiados para o arquivo novo
+        self._carry: Optional[List[bytes]] = None
+
+    def open(self) -> Tuple[str, int, Dict[UUID, int], List[Tuple[int, List[Tuple[UUID, int]]]]]:
+        """
+        Trava um arquivo do diretório e retorna (node, último epoch, ajustes pendentes,
+        flushes sem confirmação).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        index = 0
+        while True:
+            lock = open(os.path.join(self.directory, f"quantity-{index}.lock"), "a+b")
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                index += 1
+                continue
+            break
+
+        path = os.path.join(self.directory, f"quantity-{index}.journal")
+        file = open(path, "a+b")
+        self.path, self._file, self._lock = path, file, lock
+        file.seek(0)
+        node = None
+        last_epoch = 0
+        pending: Dict[UUID, int] = defaultdict(int)
+        flushes: Dict[int, List[Tuple[UUID, int]]] = {}
+        for line in file.read().splitlines():
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                break  # última linha incompleta (queda no meio da escrita)
+            last_epoch = max(last_epoch, record.get("epoch", 0), record.get("f", 0), record.get("retry", 0))
+            if "node" in record:
+                node = record["node"]
+            elif "d" in record:
+                pending[UUID(record["d"][0])] += record["d"][1]
+            elif "f" in record:
+                items = [(UUID(id), delta) for id, delta in record["items"]]
+                flushes[record["f"]] = items
+                # Os ajustes do flush saíram do buffer quando ele começou
+                for id, delta in items:
+                    pending[id] -= delta
+            elif "retry" in record:
+                flushes[record["retry"]] = [(UUID(id), delta) for id, delta in record["items"]]
+            elif "ok" in record:
+                flushes.pop(record["ok"], None)
+
+        node = node or uuid.uuid4().hex
+        pending = {id: delta for id, delta in pending.items() if delta}
+        unconfirmed = sorted(flushes.items())
+        self.rewrite(node, last_epoch, pending, unconfirmed)
+        return node, last_epoch, pending, unconfirmed
+
+    def _write(self, record: dict, sync: bool = False) -> None:
+        line = orjson.dumps(record) + b"\n"
+        self._file.write(line)
+        self._file.flush()
+        if self._carry is not None:
+            self._carry.append(line)
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def delta(self, id: UUID, delta: int) -> None:
+        # Sem fsync por ajuste: sobrevive à queda do processo (o SO já tem os dados),
+        # e o fsync do próximo flush cobre a queda da máquina.
+        self._write({"d": [str(id), delta]})
+
+    def flush_started(self, epoch: int, items: List[Tuple[UUID, int]]) -> None:
+        self._write({"f": epoch, "items": [[str(id), delta] for id, delta in items]}, sync=True)
+
+    def flush_done(self, epoch: int) -> None:
+        self._write({"ok": epoch})
+
+    def rewrite(self, node: str, last_epoch: int, pending: Dict[UUID, int], unconfirmed: List[Tuple[int, List[Tuple[UUID, int]]]] = ()) -> None:
+        """
+        Compacta o journal para o estado atual: grava um arquivo novo e o coloca no
+        lugar do antigo com os.replace (atômico).
+        """
+        tmp_path = f"{self.path}.tmp"
+        self._replace(tmp_path, self._write_file(tmp_path, _records(node, last_epoch, pending, unconfirmed)))
+
+    async def compact(self, node: str, last_epoch: int, pending: Dict[UUID, int]) -> None:
+        """
+        Como rewrite, mas o arquivo novo é gravado e sincronizado em uma thread, sem
+        parar o event loop. Os ajustes recebidos enquanto isso continuam indo para o
+        journal atual e são copiados para o novo antes da troca.
+        """
+        tmp_path = f"{self.path}.tmp"
+        data = _records(node, last_epoch, pending)
+        self._carry = []
+        try:
+            file = await asyncio.to_thread(self._write_file, tmp_path, data)
+        finally:
+            carried, self._carry = self._carry, None
+        file.write(b"".join(carried))
+        file.flush()
+        self._replace(tmp_path, file)
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        file = open(path, "w+b")
+        try:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            file.close()
+            raise
+        return file
+
+    def _replace(self, tmp_path: str, file) -> None:
+        os.replace(tmp_path, self.path)
+        old, self._file = self._file, file
+        old.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+class QuantityBuffer:
+    """
+    Agrega em memória os ajustes de quantidade por produto e os aplica em lote:
+    um '$inc' por produto em um único bulk_write, a cada 'flush_interval' segundos
+    ou quando a soma dos ajustes pendentes (em módulo) chega a 'max_pending'.
+
+    Cada flush tem um epoch crescente, gravado no produto junto com o '$inc'
+    (ver ProductRepository.bulk_increment). Reaplicar um flush já aplicado não
+    altera nada, então um flush que falhou ou ficou sem confirmação no journal
+    pode ser repetido com segurança.
+
+    O journal é obrigatório: um ajuste respondido com 202 só existe nele até o
+    flush. O epoch é um contador persistido no journal (não o relógio), então
+    continua crescendo depois de um reinício mesmo que o relógio volte.
+    """
+    def __init__(self, flush_interval: float, max_pending: int, journal: QuantityJournal):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.journal = journal
+        self.node: Optional[str] = None
+        self.usecase: Optional[ProductUsecase] = None
+        self._pending: Dict[UUID, int] = defaultdict(int)
+        self._pending_units = 0
+        self._retry: List[Tuple[int, List[Tuple[UUID, int]]]] = []
+        self._last_epoch = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {"adjustments": 0, "flushes": 0, "failures": 0, "products_written": 0}
+
+    async def start(self, usecase: ProductUsecase) -> None:
+        """
+        Recupera o journal e inicia o flush periódico.
+        """
+        self.usecase = usecase
+        self.node, self._last_epoch, pending, self._retry = self.journal.open()
+        for id, delta in pending.items():
+            self._add(id, delta)
+        await self.flush()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Para o flush periódico e aplica o que estiver pendente.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            self.journal.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # shield: o stop() não interrompe um flush no meio (ele espera o lock)
+                await asyncio.shield(self._start_flush())
+            except Exception:
+                # Já contabilizado em 'failures'; o lote é repetido no próximo ciclo
+                pass
+
+    def _start_flush(self) -> asyncio.Task:
+        # Task em um contexto vazio: o flush disparado por um ajuste não herda o prazo
+        # (nem as medições) da requisição que o disparou
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush(), context=contextvars.Context())
+        self._flush_task.add_done_callback(_consume_exception)
+        return self._flush_task
+
+    def _add(self, id: UUID, delta: int) -> None:
+        self._pending[id] += delta
+        self._pending_units += abs(delta)
+
+    def add(self, id: UUID, delta: int) -> int:
+        """
+        Registra um ajuste e retorna o total pendente do produto.
+        Ao atingir 'max_pending', agenda um flush imediato.
+        """
+        self.journal.delta(id, delta)
+        self._add(id, delta)
+        self._stats["adjustments"] += 1
+        if self._pending_units >= self.max_pending and not self._lock.locked() and (self._flush_task is None or self._flush_task.done()):
+            self._start_flush()
+        return self._pending[id]
+
+    def _next_epoch(self) -> int:
+        # Persistido no journal (registro do node e de cada flush) antes de chegar ao banco
+        self._last_epoch += 1
+        return self._last_epoch
+
+    async def flush(self) -> int:
+        """
+        Aplica os ajustes pendentes; retorna a quantidade de produtos alterados.
+        """
+        async with self._lock:
+            if self._pending:
+                items = [(id, delta) for id, delta in self._pending.items() if delta]
+                self._pending = defaultdict(int)
+                self._pending_units = 0
+                if items:
+                    epoch = self._next_epoch()
+                    # Escrita com fsync: em uma thread, sem parar o event loop
+                    try:
+                        await asyncio.to_thread(self.journal.flush_started, epoch, items)
+                    except Exception:
+                        # Sem o registro no journal o lote não pode ir ao banco: volta a ficar pendente
+                        for id, delta in items:
+                            self._add(id, delta)
+                        raise
+                    self._retry.append((epoch, items))
+            if not self._retry:
+                # Nada a gravar: o journal não é reescrito (nem sincronizado com o disco)
+                return 0
+
+            written = 0
+            while self._retry:
+                epoch, items = self._retry[0]
+                try:
+                    written += await self.usecase.apply_quantity_deltas(items, self.node, epoch)
+                except Exception:
+                    self._stats["failures"] += 1
+                    raise
+                self._retry.pop(0)
+                self._stats["flushes"] += 1
+                self.journal.flush_done(epoch)
+
+            self._stats["products_written"] += written
+            await self.journal.compact(self.node, self._last_epoch, dict(self._pending))
+            return written
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "pending_products": len(self._pending),
+            "pending_units": self._pending_units,
+            "unconfirmed_flushes": len(self._retry),
+        }
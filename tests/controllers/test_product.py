@@ -2,6 +2,8 @@ import pytest
 from fastapi.testclient import TestClient
 from src.main import app
 from src.schemas.product import ProductIn, ProductOut, ProductUpdate
+from src.core.monitoring import command_counter
+from src.settings import settings
 from uuid import UUID
 from datetime import datetime, timedelta
 
@@ -146,4 +148,397 @@ def test_get_products_by_price_range(client: TestClient, product_in_data: dict,
     response = client.get("/products/price_range")
     assert response.status_code == 200
     products = [ProductOut(**p) for p in response.json()]
-    assert len(products) == 3
\ No newline at end of file
+    assert len(products) == 3
+
+
+def test_get_all_products_paginated(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa a paginação por cursor de GET /products, seguindo o header X-Next-Cursor até o fim.
+    """
+    for price in [30.0, 10.0, 50.0, 20.0, 40.0]:
+        client.post("/products", json={**product_in_data, "price": price})
+
+    seen_prices = []
+    after = None
+    pages = 0
+    while True:
+        params = {"limit": 2, "sort_by": "price"}
+        if after:
+            params["after"] = after
+        response = client.get("/products", params=params)
+        assert response.status_code == 200
+        seen_prices.extend(p["price"] for p in response.json())
+        pages += 1
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+
+    assert pages == 3
+    assert seen_prices == [10.0, 20.0, 30.0, 40.0, 50.0]
+
+def test_get_all_products_invalid_cursor(client: TestClient, clear_database):
+    """
+    Testa que um cursor inválido em GET /products resulta em 400.
+    """
+    response = client.get("/products", params={"after": "nao-e-um-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+def test_get_all_products_ndjson_stream(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa o modo streaming NDJSON de GET /products, com lotes menores que o catálogo.
+    """
+    for i in range(5):
+        client.post("/products", json={**product_in_data, "name": f"Produto {i}"})
+
+    response = client.get("/products", params={"batch_size": 2}, headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    products = [ProductOut.model_validate_json(line) for line in lines]
+    assert sorted(p.name for p in products) == [f"Produto {i}" for i in range(5)]
+
+    # O prazo total da requisição não corta o streaming (cada lote tem o seu)
+    response = client.get("/products", params={"batch_size": 2}, headers={"Accept": "application/x-ndjson", "X-Request-Timeout-Ms": "1"})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 5
+
+def test_get_products_by_price_range_json_stream(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa o modo streaming em array JSON de GET /products/price_range.
+    """
+    client.post("/products", json={**product_in_data, "name": "Produto Barato", "price": 50.00})
+    client.post("/products", json={**product_in_data, "name": "Produto Medio", "price": 150.00})
+    client.post("/products", json={**product_in_data, "name": "Produto Caro", "price": 250.00})
+
+    response = client.get("/products/price_range", params={"min_price": 100, "stream": "true", "batch_size": 1})
+    assert response.status_code == 200
+    products = [ProductOut(**p) for p in response.json()]
+    assert sorted(p.name for p in products) == ["Produto Caro", "Produto Medio"]
+
+    response = client.get("/products/price_range", params={"min_price": 1000, "stream": "true"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_post_products_bulk(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa o endpoint POST /products/bulk para criar produtos em lote.
+    """
+    payload = [{**product_in_data, "name": f"Produto {i}"} for i in range(3)]
+
+    response = client.post("/products/bulk", json=payload)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 3
+    assert result["failed"] == 0
+    assert [item["index"] for item in result["items"]] == [0, 1, 2]
+    assert all(item["success"] for item in result["items"])
+
+    for i, item in enumerate(result["items"]):
+        get_response = client.get(f"/products/{item['id']}")
+        assert get_response.status_code == 200
+        assert get_response.json()["name"] == f"Produto {i}"
+
+    invalid_response = client.post("/products/bulk", json=[product_in_data, {**product_in_data, "quantity": "dez"}])
+    assert invalid_response.status_code == 422
+
+def test_patch_and_delete_products_bulk(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa os endpoints PATCH /products/bulk e DELETE /products/bulk.
+    """
+    created = client.post("/products/bulk", json=[product_in_data, product_in_data]).json()
+    ids = [item["id"] for item in created["items"]]
+    missing_id = "a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c70"
+
+    patch_response = client.patch("/products/bulk", json=[
+        {"id": ids[0], "price": 10.0},
+        {"id": ids[1], "name": "Renomeado"},
+        {"id": missing_id, "price": 1.0},
+    ])
+    assert patch_response.status_code == 200
+    result = patch_response.json()
+    assert (result["matched"], result["modified"], result["missing"]) == (2, 2, 1)
+    assert len(result["batches"]) == 1
+    assert client.get(f"/products/{ids[0]}").json()["price"] == 10.0
+    assert client.get(f"/products/{ids[1]}").json()["name"] == "Renomeado"
+
+    delete_response = client.request("DELETE", "/products/bulk", json={"ids": [ids[0], missing_id]})
+    assert delete_response.status_code == 200
+    result = delete_response.json()
+    assert (result["matched"], result["missing"]) == (1, 1)
+    assert client.get(f"/products/{ids[0]}").status_code == 404
+    assert client.get(f"/products/{ids[1]}").status_code == 200
+
+@pytest.mark.skipif(settings.PRODUCT_REPOSITORY != "mongo", reason="conta comandos do MongoDB")
+def test_write_path_round_trips(client: TestClient, product_in_data: dict, product_update_data: dict, clear_database):
+    """
+    Testa que criar e atualizar um produto custam exatamente um comando no MongoDB cada.
+    """
+    with command_counter.measure() as create_commands:
+        post_response = client.post("/products", json=product_in_data)
+    assert post_response.status_code == 201
+    assert create_commands == {"insert": 1}
+
+    product_id_str = post_response.json()["id"]
+    with command_counter.measure() as update_commands:
+        patch_response = client.patch(f"/products/{product_id_str}", json=product_update_data)
+    assert patch_response.status_code == 200
+    assert update_commands == {"findAndModify": 1}
+
+    # O produto devolvido na criação é idêntico ao que uma leitura posterior traz
+    assert client.get(f"/products/{product_id_str}").json() == patch_response.json()
+
+def test_get_cache_stats(client: TestClient):
+    """
+    Testa o endpoint GET /internal/cache com o cache desativado (padrão).
+    """
+    response = client.get("/internal/cache")
+    assert response.status_code == 200
+    assert response.json() == {"enabled": False}
+
+def test_get_pool_stats(client: TestClient):
+    """
+    Testa o endpoint GET /internal/pool com a configuração e os contadores do pool.
+    """
+    response = client.get("/internal/pool")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["max_pool_size"] == settings.MONGO_MAX_POOL_SIZE
+    assert {"open", "checked_out", "checked_out_max", "wait_ms_avg", "pool_cleared"} <= stats.keys()
+
+def test_get_product_conditional(client: TestClient, product_in_data: dict, product_update_data: dict, clear_database):
+    """
+    Testa GET condicional de /products/{id} com ETag/If-None-Match e Last-Modified/If-Modified-Since.
+    """
+    product_id_str = client.post("/products", json=product_in_data).json()["id"]
+
+    response = client.get(f"/products/{product_id_str}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    not_modified = client.get(f"/products/{product_id_str}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    not_modified = client.get(f"/products/{product_id_str}", headers={"If-Modified-Since": last_modified})
+    assert not_modified.status_code == 304
+
+    client.patch(f"/products/{product_id_str}", json=product_update_data)
+    modified = client.get(f"/products/{product_id_str}", headers={"If-None-Match": etag})
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+    assert modified.json()["name"] == product_update_data["name"]
+
+    not_found_id = UUID("a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c71")
+    assert client.get(f"/products/{not_found_id}", headers={"If-None-Match": etag}).status_code == 404
+
+def test_get_all_products_conditional(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa GET condicional da listagem: 304 enquanto a página não muda, 200 após uma deleção.
+    """
+    ids = [client.post("/products", json=product_in_data).json()["id"] for _ in range(2)]
+
+    response = client.get("/products")
+    etag = response.headers["ETag"]
+    assert client.get("/products", headers={"If-None-Match": etag}).status_code == 304
+
+    client.delete(f"/products/{ids[0]}")
+    response = client.get("/products", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+def test_get_products_sparse_fields(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa o parâmetro ?fields= nos endpoints de leitura.
+    """
+    product_id_str = client.post("/products", json=product_in_data).json()["id"]
+
+    response = client.get(f"/products/{product_id_str}", params={"fields": "id,name"})
+    assert response.status_code == 200
+    assert response.json() == {"id": product_id_str, "name": product_in_data["name"]}
+    # A resposta parcial é outra representação e tem outro ETag
+    assert response.headers["ETag"] != client.get(f"/products/{product_id_str}").headers["ETag"]
+    assert client.get(f"/products/{product_id_str}", params={"fields": "id,name"}, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    response = client.get("/products", params={"fields": "name,price", "sort_by": "price"})
+    assert response.status_code == 200
+    assert response.json() == [{"name": product_in_data["name"], "price": product_in_data["price"]}]
+
+    response = client.get("/products/price_range", params={"fields": "price"})
+    assert response.json() == [{"price": product_in_data["price"]}]
+
+    response = client.get("/products", params={"fields": "id,secret"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: secret"
+
+def test_get_products_stats(client: TestClient, clear_database):
+    """
+    Testa GET /products/stats: resumo, valor do estoque e histograma com limites da query.
+    """
+    for name, quantity, price in [("A", 2, 5.0), ("B", 1, 15.0), ("C", 4, 15.0), ("D", 1, 200.0)]:
+        client.post("/products", json={"name": name, "quantity": quantity, "price": price})
+
+    response = client.get("/products/stats", params={"boundaries": "0,10,20,100"})
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["count"] == 4
+    assert stats["total_quantity"] == 8
+    assert stats["inventory_value"] == 2 * 5.0 + 15.0 + 4 * 15.0 + 200.0
+    assert (stats["price_min"], stats["price_max"], stats["price_avg"]) == (5.0, 200.0, 58.75)
+    assert stats["histogram"] == [
+        {"lower": 0.0, "upper": 10.0, "count": 1},
+        {"lower": 10.0, "upper": 20.0, "count": 2},
+        {"lower": 20.0, "upper": 100.0, "count": 0},
+    ]
+    assert stats["outside_histogram"] == 1
+
+    response = client.get("/products/stats", params={"boundaries": "10,5"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Boundaries must be strictly increasing"
+
+def test_search_products_prefix(client: TestClient, clear_database):
+    """
+    Testa GET /products/search no modo prefixo: ignora acentos e maiúsculas, ordena e limita.
+    """
+    for name in ["Café Torrado", "cafeteira elétrica", "Chá Verde", "Café em Cápsulas"]:
+        client.post("/products", json={"name": name, "quantity": 1, "price": 10.0})
+
+    response = client.get("/products/search", params={"q": "CAFE"})
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Café em Cápsulas", "Café Torrado", "cafeteira elétrica"]
+
+    response = client.get("/products/search", params={"q": "café t", "limit": 1, "fields": "name"})
+    assert response.json() == [{"name": "Café Torrado"}]
+
+    # Renomear atualiza o campo normalizado
+    product_id = client.get("/products/search", params={"q": "cha"}).json()[0]["id"]
+    client.patch(f"/products/{product_id}", json={"name": "Mate"})
+    assert client.get("/products/search", params={"q": "cha"}).json() == []
+    assert [p["id"] for p in client.get("/products/search", params={"q": "mat"}).json()] == [product_id]
+
+    assert client.get("/products/search", params={"q": ""}).status_code == 422
+
+def test_get_metrics(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa GET /metrics: as requisições aparecem pelo template da rota, não pelo caminho.
+    """
+    product_id = client.post("/products", json=product_in_data).json()["id"]
+    client.get(f"/products/{product_id}")
+    client.get("/nao-existe")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/products/{id}",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert product_id not in body
+    assert "# TYPE mongodb_command_duration_seconds histogram" in body
+
+def test_reserve_and_release_product(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa a reserva atômica de estoque: decrementa, devolve 409 sem estoque e libera de volta.
+    """
+    product_id = client.post("/products", json=product_in_data).json()["id"]  # quantity = 10
+
+    response = client.post(f"/products/{product_id}/reserve", json={"quantity": 4})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 6
+
+    response = client.post(f"/products/{product_id}/reserve", json={"quantity": 7})
+    assert response.status_code == 409
+    assert response.json()["detail"] == f"Insufficient stock for product {product_id}: requested 7, available 6"
+    assert client.get(f"/products/{product_id}").json()["quantity"] == 6
+
+    response = client.post(f"/products/{product_id}/release", json={"quantity": 4})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 10
+
+    assert client.post(f"/products/{product_id}/reserve", json={"quantity": 0}).status_code == 422
+    missing = "00000000-0000-4000-8000-000000000000"
+    assert client.post(f"/products/{missing}/reserve", json={"quantity": 1}).status_code == 404
+    assert client.post(f"/products/{missing}/release", json={"quantity": 1}).status_code == 404
+
+def test_reserve_batch(client: TestClient, clear_database):
+    """
+    Testa a reserva em lote: tudo ou nada, com o item que falhou na mensagem.
+    """
+    ids = [
+        client.post("/products", json={"name": f"Produto {i}", "quantity": 5, "price": 10.0}).json()["id"]
+        for i in range(3)
+    ]
+
+    response = client.post("/products/reserve-batch", json=[{"id": ids[0], "quantity": 2}, {"id": ids[1], "quantity": 5}])
+    assert response.status_code == 200
+    assert response.json() == {"reserved": 2, "units": 7}
+
+    # A terceira linha não tem estoque: as duas primeiras são devolvidas
+    response = client.post("/products/reserve-batch", json=[
+        {"id": ids[0], "quantity": 3}, {"id": ids[2], "quantity": 1}, {"id": ids[1], "quantity": 1},
+    ])
+    assert response.status_code == 409
+    assert response.json()["detail"] == f"Insufficient stock for product {ids[1]} (item 2): requested 1, available 0"
+    assert [client.get(f"/products/{id}").json()["quantity"] for id in ids] == [3, 0, 5]
+
+    missing = "00000000-0000-4000-8000-000000000000"
+    response = client.post("/products/reserve-batch", json=[{"id": ids[2], "quantity": 1}, {"id": missing, "quantity": 1}])
+    assert response.status_code == 404
+    assert client.get(f"/products/{ids[2]}").json()["quantity"] == 5
+
+    assert client.post("/products/reserve-batch", json=[]).status_code == 422
+
+def test_adjust_product_quantity(client: TestClient, product_in_data: dict, clear_database):
+    """
+    Testa o ajuste de quantidade sem o buffer: grava na hora e devolve o produto.
+    """
+    product_id = client.post("/products", json=product_in_data).json()["id"]  # quantity = 10
+
+    response = client.post(f"/products/{product_id}/adjust", json={"delta": -3})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 7
+    assert client.post(f"/products/{product_id}/adjust", json={"delta": 5}).json()["quantity"] == 12
+
+    missing = "00000000-0000-4000-8000-000000000000"
+    assert client.post(f"/products/{missing}/adjust", json={"delta": 1}).status_code == 404
+    assert client.get("/internal/quantity-buffer").json() == {"enabled": False}
+
+def test_get_product_changes(client: TestClient, clear_database, monkeypatch):
+    """
+    Testa o feed de mudanças: alterações e remoções em ordem, retomando pelo token.
+    """
+    monkeypatch.setattr(settings, "CHANGES_SETTLE_MS", 0)
+    ids = [client.post("/products", json={"name": f"Produto {n}", "quantity": n, "price": 10.0}).json()["id"] for n in range(3)]
+
+    full = client.get("/products/changes").json()["items"]
+    assert sorted(item["id"] for item in full) == sorted(ids)
+    assert full == sorted(full, key=lambda item: (item["changed_at"], item["id"]))
+
+    response = client.get("/products/changes", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["items"] == full[:2]
+    assert page["has_more"] is True
+
+    page = client.get("/products/changes", params={"after": page["next_cursor"]}).json()
+    assert page["items"] == full[2:]
+    assert page["has_more"] is False
+
+    # A partir da última posição, só o que mudou depois dela
+    cursor = page["next_cursor"]
+    client.patch(f"/products/{ids[0]}", json={"price": 20.0})
+    client.delete(f"/products/{ids[1]}")
+    page = client.get("/products/changes", params={"after": cursor}).json()
+    changes = {item["id"]: item for item in page["items"]}
+    assert set(changes) == {ids[0], ids[1]}
+    assert changes[ids[0]]["product"]["price"] == 20.0
+    assert changes[ids[1]]["deleted"] is True and changes[ids[1]]["product"] is None
+
+    # Página vazia devolve a mesma posição para a próxima consulta
+    empty = client.get("/products/changes", params={"after": page["next_cursor"]}).json()
+    assert empty["items"] == [] and empty["next_cursor"] == page["next_cursor"]
+
+    assert client.get("/products/changes", params={"since": (datetime.now() + timedelta(days=1)).isoformat()}).json()["items"] == []
+    assert client.get("/products/changes", params={"since": "2000-01-01T00:00:00"}).status_code == 410
+    assert client.get("/products/changes", params={"after": "invalido"}).status_code == 400
@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.core.admission import AdmissionController, AdmissionMiddleware, classify_request
+
+def make_controller(max_concurrency: int = 10, read=(1, 1), list=(1, 1), write=(1, 1), queue_timeout: float = 1.0) -> AdmissionController:
+    return AdmissionController(max_concurrency, {"read": read, "list": list, "write": write}, queue_timeout)
+
+def test_classify_request():
+    """
+    Testa a classe de cada rota: leituras pontuais, listagens e escritas; as demais rotas ficam de fora.
+    """
+    def classify(method: str, path: str):
+        return classify_request({"method": method, "path": path})
+
+    assert classify("GET", "/products/6f1c0c1e-0000-4000-8000-000000000000") == "read"
+    assert classify("GET", "/products/search") == "read"
+    assert classify("GET", "/products/") == "list"
+    assert classify("GET", "/products/price_range") == "list"
+    assert classify("GET", "/products/changes") == "list"
+    assert classify("POST", "/products/bulk") == "write"
+    assert classify("DELETE", "/products/6f1c0c1e-0000-4000-8000-000000000000") == "write"
+    assert classify("GET", "/internal/admission") is None
+    assert classify("GET", "/productsx") is None
+
+
+@pytest.mark.asyncio
+async def test_admission_queue_and_reject():
+    """
+    Testa que, no limite, a requisição espera na fila e, com a fila cheia, é recusada na hora.
+    """
+    controller = make_controller()
+    assert await controller.acquire("read")
+
+    queued = asyncio.create_task(controller.acquire("read"))
+    await asyncio.sleep(0)
+    assert await controller.acquire("read") is False  # fila cheia
+
+    controller.release("read")
+    assert await queued
+    stats = controller.stats()["classes"]["read"]
+    assert (stats["in_flight"], stats["admitted"], stats["rejected"]) == (1, 2, 1)
+
+@pytest.mark.asyncio
+async def test_admission_queue_timeout():
+    """
+    Testa que a espera na fila é limitada e conta como recusa.
+    """
+    controller = make_controller(queue_timeout=0.01)
+    assert await controller.acquire("list")
+    assert await controller.acquire("list") is False
+    stats = controller.stats()["classes"]["list"]
+    assert (stats["queued"], stats["timeouts"], stats["rejected"]) == (0, 1, 1)
+
+@pytest.mark.asyncio
+async def test_admission_reads_have_priority():
+    """
+    Testa que, com o limite total atingido, a vaga liberada vai para a leitura pontual e não para a listagem.
+    """
+    controller = make_controller(max_concurrency=1, read=(5, 5), list=(5, 5))
+    assert await controller.acquire("write")
+
+    listing = asyncio.create_task(controller.acquire("list"))
+    await asyncio.sleep(0)
+    reading = asyncio.create_task(controller.acquire("read"))
+    await asyncio.sleep(0)
+
+    controller.release("write")
+    assert await reading
+    assert not listing.done()
+
+    controller.release("read")
+    assert await listing
+
+@pytest.mark.asyncio
+async def test_admission_middleware_sheds_with_503():
+    """
+    Testa a resposta 503 com Retry-After quando a classe está saturada.
+    """
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/products/{id}")
+    async def get_product(id: str):
+        await release.wait()
+        return {"id": id}
+
+    controller = make_controller(read=(1, 0))
+    app.add_middleware(AdmissionMiddleware, controller=controller, retry_after_seconds=2)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/products/1"))
+        await asyncio.sleep(0.01)
+        shed = await client.get("/products/2")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "2"
+
+        release.set()
+        assert (await first).status_code == 200
+
+    assert controller.stats()["in_flight"] == 0
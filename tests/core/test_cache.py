@@ -0,0 +1,81 @@
+from src.core.cache import LRUCache
+
+class FakeClock:
+    """
+    Relógio controlável para testar a expiração por TTL.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_lru_cache_hit_and_miss():
+    """
+    Testa os contadores de hit e miss do cache.
+    """
+    cache = LRUCache(max_size=2, ttl_seconds=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    Testa que, ao exceder o tamanho máximo, a entrada usada há mais tempo é descartada.
+    """
+    cache = LRUCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # 'a' passa a ser a mais recente
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_cache_ttl_and_invalidate():
+    """
+    Testa a expiração por TTL e a invalidação explícita.
+    """
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.invalidate("b")
+    assert cache.get("b") is None
+
+def test_lru_cache_skips_fill_invalidated_during_read():
+    """
+    Testa que um valor lido antes de uma invalidação da chave não é gravado no cache.
+    """
+    cache = LRUCache(max_size=1, ttl_seconds=10)
+    generation = cache.generation()
+    cache.invalidate("a")
+    cache.set("a", "antigo", generation=generation)
+    assert cache.get("a") is None
+    assert cache.stats()["stale_fills"] == 1
+
+    # Outras chaves não são afetadas enquanto a invalidação é lembrada
+    generation = cache.generation()
+    cache.set("b", 2, generation=generation)
+    assert cache.get("b") == 2
+
+    # Chaves esquecidas (além de max_size) ficam cobertas pelo piso: na dúvida, não grava
+    generation = cache.generation()
+    cache.invalidate("a")
+    cache.invalidate("c")
+    cache.set("a", "antigo", generation=generation)
+    assert cache.get("a") is None
+    cache.set("a", "novo", generation=cache.generation())
+    assert cache.get("a") == "novo"
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from pymongo.errors import ExecutionTimeout, OperationFailure
+
+from src.core.deadline import DeadlineMiddleware, deadline, detached, query_deadline, remaining
+from src.core.exceptions import DeadlineExceededException
+
+def test_deadline_nesting():
+    """
+    Testa que um prazo interno não estende o prazo externo.
+    """
+    assert remaining() is None
+    with deadline(1.0):
+        assert 0.9 < remaining() <= 1.0
+        with deadline(10.0):
+            assert remaining() <= 1.0
+        with deadline(0.5):
+            assert remaining() <= 0.5
+    assert remaining() is None
+
+def test_query_deadline_errors():
+    """
+    Testa que prazo vencido e timeout do MongoDB viram DeadlineExceededException,
+    e que os demais erros do MongoDB passam adiante.
+    """
+    with query_deadline():
+        pass  # sem prazo, nada muda
+
+    with deadline(0.001):
+        time.sleep(0.002)
+        with pytest.raises(DeadlineExceededException):
+            with query_deadline():
+                pass
+
+    with deadline(1.0):
+        with pytest.raises(DeadlineExceededException):
+            with query_deadline():
+                raise ExecutionTimeout("operation exceeded time limit", 50)
+        with pytest.raises(OperationFailure):
+            with query_deadline():
+                raise OperationFailure("other error", 2)
+
+@pytest.mark.asyncio
+async def test_detached():
+    """
+    Testa que a função executa sem o prazo do chamador e vai até o fim mesmo
+    quando o chamador é cancelado.
+    """
+    seen = []
+
+    async def write():
+        seen.append(remaining())
+        await asyncio.sleep(0.05)
+        seen.append("done")
+        return "ok"
+
+    with deadline(1.0):
+        assert await detached(write) == "ok"
+        caller = asyncio.ensure_future(detached(write))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+    await asyncio.sleep(0.1)
+    assert seen == [None, "done", None, "done"]
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/products/{id}")
+    async def get_product(id: str):
+        return {"remaining": remaining()}
+
+    @app.get("/products/")
+    async def list_products():
+        with query_deadline():
+            await asyncio.sleep(0.05)
+        with query_deadline():
+            return {}
+
+    @app.exception_handler(DeadlineExceededException)
+    async def handler(request: Request, exc: DeadlineExceededException):
+        return ORJSONResponse(status_code=504, content={"detail": exc.message})
+
+    app.add_middleware(DeadlineMiddleware, defaults_ms={"read": 2000, "list": 10, "write": None}, max_ms=5000)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_deadline_middleware_budget():
+    """
+    Testa o prazo padrão da classe da rota, o header (limitado a max_ms) e o 504 quando estoura.
+    """
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+        assert 1.9 < (await client.get("/products/1")).json()["remaining"] <= 2.0
+        response = await client.get("/products/1", headers={"X-Request-Timeout-Ms": "100"})
+        assert response.json()["remaining"] <= 0.1
+        response = await client.get("/products/1", headers={"X-Request-Timeout-Ms": "999999"})
+        assert 4.9 < response.json()["remaining"] <= 5.0
+        response = await client.get("/products/1", headers={"X-Request-Timeout-Ms": "abc"})
+        assert response.json()["remaining"] <= 2.0
+
+        assert (await client.get("/products/")).status_code == 504
+        assert (await client.get("/products/", headers={"X-Request-Timeout-Ms": "1000"})).status_code == 200
+
+@pytest.mark.asyncio
+async def test_deadline_middleware_cancels_on_disconnect():
+    """
+    Testa que a requisição é cancelada quando o cliente desconecta antes da resposta.
+    """
+    cancelled = asyncio.Event()
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return messages.pop(0)
+
+    async def send(message):
+        raise AssertionError("nenhuma resposta deve ser enviada")
+
+    middleware = DeadlineMiddleware(app, defaults_ms={})
+    scope = {"type": "http", "method": "GET", "path": "/products/", "headers": []}
+    await asyncio.wait_for(middleware(scope, receive, send), timeout=1)
+    assert cancelled.is_set()
@@ -0,0 +1,24 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from src.core.http_cache import http_date
+
+@pytest.fixture
+def sao_paulo_timezone(monkeypatch):
+    """
+    Fixtura que coloca o processo em um fuso diferente de UTC durante o teste.
+    """
+    monkeypatch.setenv("TZ", "America/Sao_Paulo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_http_date_converts_local_time_to_utc(sao_paulo_timezone):
+    """
+    Testa que datas sem fuso (horário local do servidor) são convertidas para UTC
+    no Last-Modified, em vez de apenas rotuladas como UTC.
+    """
+    assert http_date(datetime(2024, 7, 1, 12, 0, 0)) == "Mon, 01 Jul 2024 15:00:00 GMT"
@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+from src.core.metrics import CommandMetrics, Counter, Histogram, mongo_command_duration, mongo_command_failures
+
+def test_histogram_render():
+    """
+    Testa que o histograma exporta faixas acumuladas, soma e contagem por label.
+    """
+    histogram = Histogram("latency_seconds", "Latência", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    histogram.observe(0.1, "/b")
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latência", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    # Limite superior inclusivo, como no Prometheus
+    assert 'latency_seconds_bucket{route="/b",le="0.1"} 1' in lines
+    assert histogram.count("/b") == 1
+
+def test_counter_render_escapes_labels():
+    """
+    Testa o contador e o escape de aspas nos valores dos labels.
+    """
+    counter = Counter("errors_total", "Erros", ("reason",))
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+
+    assert counter.render()[-1] == 'errors_total{reason="say \\"hi\\""} 3'
+
+def _event(command_name: str, command: dict, request_id: int) -> MagicMock:
+    """
+    Cria um evento de comando com os campos usados pelo listener.
+    """
+    event = MagicMock()
+    event.command_name = command_name
+    event.command = command
+    event.request_id = request_id
+    event.connection_id = ("localhost", 27017)
+    event.duration_micros = 1500
+    return event
+
+def test_command_metrics_labels_by_collection():
+    """
+    Testa que a duração dos comandos é registrada com o nome da coleção guardado no início.
+    """
+    listener = CommandMetrics()
+    before = mongo_command_duration.count("find", "products")
+    listener.started(_event("find", {"find": "products"}, 1))
+    listener.succeeded(_event("find", {}, 1))
+    assert mongo_command_duration.count("find", "products") == before + 1
+
+    before = mongo_command_duration.count("getMore", "products")
+    listener.started(_event("getMore", {"getMore": 123, "collection": "products"}, 2))
+    listener.succeeded(_event("getMore", {}, 2))
+    assert mongo_command_duration.count("getMore", "products") == before + 1
+
+    before = mongo_command_failures.value("insert", "products")
+    listener.started(_event("insert", {"insert": "products"}, 3))
+    listener.failed(_event("insert", {}, 3))
+    assert mongo_command_failures.value("insert", "products") == before + 1
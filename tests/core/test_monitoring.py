@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock
+
+from src.core.monitoring import CommandCounter, PoolMonitor
+
+def _started(command_name: str) -> MagicMock:
+    """
+    Cria um evento de início de comando com o nome informado.
+    """
+    event = MagicMock()
+    event.command_name = command_name
+    return event
+
+def test_command_counter_counts_by_name():
+    """
+    Testa que o contador agrupa os comandos iniciados pelo nome.
+    """
+    counter = CommandCounter()
+    counter.started(_started("insert"))
+    counter.started(_started("find"))
+    counter.started(_started("find"))
+
+    assert counter.counts == {"insert": 1, "find": 2}
+    assert counter.total == 3
+
+    counter.reset()
+    assert counter.total == 0
+
+def test_command_counter_measure():
+    """
+    Testa que measure() conta apenas os comandos emitidos dentro do bloco.
+    """
+    counter = CommandCounter()
+    counter.started(_started("ping"))
+
+    with counter.measure() as delta:
+        counter.started(_started("findAndModify"))
+
+    assert delta == {"findAndModify": 1}
+
+def test_pool_monitor_tracks_checkouts():
+    """
+    Testa que o monitor do pool acompanha conexões abertas, em uso e o máximo simultâneo.
+    """
+    monitor = PoolMonitor()
+    event = MagicMock()
+    monitor.connection_created(event)
+    monitor.connection_created(event)
+    for _ in range(2):
+        monitor.connection_check_out_started(event)
+        monitor.connection_checked_out(event)
+    monitor.connection_checked_in(event)
+    monitor.connection_closed(event)
+
+    stats = monitor.stats()
+    assert (stats["open"], stats["checked_out"], stats["checked_out_max"], stats["checkouts"]) == (1, 1, 2, 2)
+    assert stats["wait_ms_max"] >= stats["wait_ms_avg"] >= 0
+
+def test_pool_monitor_failures_and_clears():
+    """
+    Testa a contagem de falhas de checkout por motivo e de limpezas do pool.
+    """
+    monitor = PoolMonitor()
+    failed = MagicMock()
+    failed.reason = "timeout"
+    monitor.connection_check_out_started(failed)
+    monitor.connection_check_out_failed(failed)
+    monitor.pool_cleared(MagicMock())
+
+    stats = monitor.stats()
+    assert stats["checkout_failures"] == {"timeout": 1}
+    assert stats["pool_cleared"] == 1
+    assert stats["checkouts"] == 0
+
+    monitor.reset()
+    assert monitor.stats()["checkout_failures"] == {}
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from src.core.deadline import deadline, remaining
+from src.core.exceptions import DeadlineExceededException
+from src.core.singleflight import SingleFlight
+
+class SlowQuery:
+    """
+    Consulta que só termina quando o teste libera o evento.
+    """
+    def __init__(self, result="ok"):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    """
+    Testa que chamadas concorrentes com a mesma chave executam a função uma única vez.
+    """
+    flights = SingleFlight()
+    query = SlowQuery()
+    tasks = [asyncio.create_task(flights.do(("id", 1), query)) for _ in range(5)]
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await asyncio.gather(*tasks) == ["ok"] * 5
+    assert query.calls == 1
+    assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 4}
+
+    # Terminada a chamada, nada fica guardado: a próxima executa de novo
+    assert await flights.do(("id", 1), query) == "ok"
+    assert query.calls == 2
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exceptions():
+    """
+    Testa que a exceção da execução chega a todos os chamadores agrupados.
+    """
+    flights = SingleFlight()
+    query = SlowQuery(ValueError("boom"))
+    tasks = [asyncio.create_task(flights.do(("id", 1), query)) for _ in range(3)]
+    await asyncio.sleep(0)
+    query.release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert query.calls == 1
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation():
+    """
+    Testa que cancelar quem iniciou a execução não cancela os demais chamadores.
+    """
+    flights = SingleFlight()
+    query = SlowQuery()
+    leader = asyncio.create_task(flights.do(("id", 1), query))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do(("id", 1), query))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    query.release.set()
+    assert await follower == "ok"
+    assert leader.cancelled()
+
+@pytest.mark.asyncio
+async def test_single_flight_forget_by_prefix():
+    """
+    Testa que forget() faz as chamadas seguintes executarem de novo, sem afetar quem já aguarda.
+    """
+    flights = SingleFlight()
+    query = SlowQuery()
+    first = asyncio.create_task(flights.do(("id", 1, None), query))
+    other = asyncio.create_task(flights.do(("id", 2, None), query))
+    await asyncio.sleep(0)
+
+    flights.forget("id", 1)
+    second = asyncio.create_task(flights.do(("id", 1, None), query))
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await asyncio.gather(first, second, other) == ["ok"] * 3
+    assert query.calls == 3
+    assert flights.stats()["coalesced"] == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_applies_each_callers_deadline():
+    """
+    Testa que a execução compartilhada não herda o prazo de quem a iniciou: um
+    chamador com prazo curto recebe DeadlineExceededException sozinho e os demais
+    recebem o resultado.
+    """
+    flights = SingleFlight()
+    seen = []
+
+    async def query():
+        seen.append(remaining())
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def impatient():
+        with deadline(0.01):
+            return await flights.do(("id", 1), query)
+
+    leader = asyncio.create_task(impatient())
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do(("id", 1), query))
+
+    with pytest.raises(DeadlineExceededException):
+        await leader
+    assert await follower == "ok"
+    assert seen == [None]
+    assert flights.stats()["executions"] == 1
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_when_no_one_waits():
+    """
+    Testa que a execução é cancelada quando todos os chamadores desistem (prazo
+    vencido), e que a chamada seguinte executa de novo.
+    """
+    flights = SingleFlight()
+    query = SlowQuery()
+
+    with deadline(0.01):
+        with pytest.raises(DeadlineExceededException):
+            await flights.do(("id", 1), query)
+    assert flights.stats()["in_flight"] == 0
+
+    task = asyncio.create_task(flights.do(("id", 1), query))
+    await asyncio.sleep(0)
+    query.release.set()
+    assert await task == "ok"
+    assert query.calls == 2
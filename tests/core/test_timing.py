@@ -0,0 +1,66 @@
+import json
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.serialization import fast_response
+from src.core.timing import ServerTimingMiddleware, current_timings, timed
+from src.schemas.product import ProductIn
+
+def make_app(**options) -> FastAPI:
+    """
+    Cria um app mínimo instrumentado cuja rota passa pelas fases db, model e serialize.
+    """
+    app = FastAPI()
+
+    @app.get("/items/{id}")
+    async def get_item(id: int):
+        with timed("db"):
+            time.sleep(0.002)
+        with timed("model"):
+            item = ProductIn(name=f"Item {id}", quantity=1, price=1.0)
+        return fast_response(item)
+
+    app.add_middleware(ServerTimingMiddleware, **options)
+    return app
+
+def test_server_timing_header():
+    """
+    Testa que o header Server-Timing traz cada fase medida e o total.
+    """
+    client = TestClient(make_app(slow_threshold_ms=10_000))
+    response = client.get("/items/1")
+
+    assert response.status_code == 200
+    entries = dict(entry.split(";dur=") for entry in response.headers["server-timing"].split(", "))
+    assert list(entries) == ["db", "model", "serialize", "total"]
+    assert float(entries["db"]) >= 2.0
+    assert float(entries["total"]) >= float(entries["db"])
+
+def test_slow_request_log(caplog):
+    """
+    Testa o log estruturado das requisições acima do limite, com a rota como template.
+    """
+    client = TestClient(make_app(slow_threshold_ms=0))
+    with caplog.at_level(logging.WARNING, logger="store_api.timing"):
+        client.get("/items/7")
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["event"] == "slow_request"
+    assert (record["route"], record["path"], record["status"]) == ("/items/{id}", "/items/7", 200)
+    assert record["db_ms"] >= 2.0
+
+def test_slow_request_log_sampling(caplog):
+    """
+    Testa que a amostragem zero não registra nada, e que timed() fora de uma requisição não mede.
+    """
+    client = TestClient(make_app(slow_threshold_ms=0, sample_rate=0.0))
+    with caplog.at_level(logging.WARNING, logger="store_api.timing"):
+        client.get("/items/7")
+    assert caplog.records == []
+
+    with timed("db"):
+        pass
+    assert current_timings() is None
@@ -0,0 +1,158 @@
+import pytest
+from src.repositories.memory import InMemoryProductRepository
+from src.schemas.product import ProductIn
+from src.usecases.product import ProductUsecase
+from uuid import UUID
+from datetime import datetime, timedelta
+
+def make_document(n: int, price: float) -> dict:
+    """
+    Monta um documento no formato gravado pelo usecase, com IDs previsíveis.
+    """
+    now = datetime.now()
+    return {
+        "_id": UUID(int=n), "id": UUID(int=n),
+        "name": f"Produto {n}", "quantity": n, "price": price,
+        "created_at": now, "updated_at": now,
+    }
+
+@pytest.fixture
+def repository():
+    """
+    Fixtura com cinco produtos; dois deles empatados no preço.
+    """
+    prices = [50.0, 10.0, 30.0, 10.0, 20.0]
+    return InMemoryProductRepository([make_document(n, price) for n, price in enumerate(prices, start=1)])
+
+
+@pytest.mark.asyncio
+async def test_find_by_price_range(repository: InMemoryProductRepository):
+    """
+    Testa a faixa de preço pelo índice ordenado, com limites inclusivos e desempate por _id.
+    """
+    documents = await repository.find_by_price_range(min_price=10.0, max_price=30.0)
+    assert [d["_id"].int for d in documents] == [2, 4, 5, 3]
+
+    assert [d["_id"].int for d in await repository.find_by_price_range(min_price=30.0)] == [3, 1]
+    assert [d["_id"].int for d in await repository.find_by_price_range(max_price=10.0)] == [2, 4]
+    assert await repository.find_by_price_range(min_price=60.0) == []
+
+
+@pytest.mark.asyncio
+async def test_find_page_keyset(repository: InMemoryProductRepository):
+    """
+    Testa a paginação por (price, _id) e por _id a partir do último item visto.
+    """
+    first = await repository.find_page("price", 2)
+    assert [d["_id"].int for d in first] == [2, 4]
+    second = await repository.find_page("price", 2, after=(first[-1]["price"], first[-1]["_id"]))
+    assert [d["_id"].int for d in second] == [5, 3]
+
+    by_id = await repository.find_page("_id", 3, after=(None, UUID(int=2)), projection={"_id": 1, "price": 1})
+    assert by_id == [{"_id": UUID(int=n), "price": p} for n, p in [(3, 30.0), (4, 10.0), (5, 20.0)]]
+
+
+@pytest.mark.asyncio
+async def test_update_reindexes_price(repository: InMemoryProductRepository):
+    """
+    Testa que mudar o preço reposiciona o produto no índice e que o documento guardado não vaza.
+    """
+    updated = await repository.update_one(UUID(int=1), {"price": 5.0})
+    assert updated["price"] == 5.0
+    updated["price"] = 999.0  # alterar a cópia devolvida não afeta o repositório
+
+    documents = await repository.find_by_price_range(max_price=10.0)
+    assert [d["_id"].int for d in documents] == [1, 2, 4]
+
+    assert await repository.bulk_update([(UUID(int=2), {"price": 10.0}), (UUID(int=99), {"price": 1.0})]) == (1, 0)
+    assert await repository.bulk_delete([UUID(int=1), UUID(int=99)]) == 1
+    assert [d["_id"].int for d in await repository.find_by_price_range(max_price=10.0)] == [2, 4]
+    assert len(repository) == 4
+
+
+@pytest.mark.asyncio
+async def test_iter_by_price_range_survives_writes(repository: InMemoryProductRepository):
+    """
+    Testa que a iteração em lotes retoma da última posição mesmo com escritas entre os lotes.
+    """
+    seen = []
+    async for document in repository.iter_by_price_range(min_price=10.0, batch_size=2):
+        seen.append(document["_id"].int)
+        if len(seen) == 2:
+            await repository.delete_one(UUID(int=5))
+    assert seen == [2, 4, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_price_stats(repository: InMemoryProductRepository):
+    """
+    Testa o resumo e o histograma calculados sobre o índice de preços.
+    """
+    stats = await repository.price_stats((10.0, 20.0, 50.0))
+
+    assert stats["count"] == 5
+    assert stats["total_quantity"] == 15
+    assert stats["inventory_value"] == 50.0 + 20.0 + 90.0 + 40.0 + 100.0
+    assert (stats["price_min"], stats["price_max"], stats["price_avg"]) == (10.0, 50.0, 24.0)
+    assert stats["buckets"] == {10.0: 2, 20.0: 2}
+    assert stats["outside"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_by_name():
+    """
+    Testa a busca por prefixo no índice de nomes e a busca textual por termos.
+    """
+    repository = InMemoryProductRepository()
+    for n, name in enumerate(["cafe torrado", "cafeteira", "cha de cafe", "mate"], start=1):
+        await repository.insert_one({**make_document(n, 10.0), "name_normalized": name})
+
+    assert [d["_id"].int for d in await repository.find_by_name_prefix("cafe", 10)] == [1, 2]
+    assert [d["_id"].int for d in await repository.find_by_name_prefix("cafe", 1)] == [1]
+    assert await repository.find_by_name_prefix("x", 10) == []
+
+    documents = await repository.find_by_text("Café de", 10)
+    assert [d["_id"].int for d in documents] == [3, 1]
+
+    await repository.update_one(UUID(int=4), {"name_normalized": "cafe gelado"})
+    assert [d["_id"].int for d in await repository.find_by_name_prefix("cafe g", 10)] == [4]
+
+
+@pytest.mark.asyncio
+async def test_usecase_with_memory_repository(product_in_data: dict):
+    """
+    Testa o ProductUsecase completo sobre o repositório em memória, sem MongoDB.
+    """
+    usecase = ProductUsecase(repository=InMemoryProductRepository())
+    created = await usecase.create(ProductIn(**product_in_data))
+
+    assert usecase.collection is None
+    assert await usecase.get_by_id(created.id) == created
+    page, next_cursor = await usecase.get_page(limit=10, sort_by="price")
+    assert [p.id for p in page] == [created.id] and next_cursor is None
+    assert await usecase.delete(created.id) is True
+    assert await usecase.get_by_id(created.id) is None
+
+@pytest.mark.asyncio
+async def test_find_changed_and_deleted(repository: InMemoryProductRepository):
+    """
+    Testa o keyset do feed de mudanças por (updated_at, _id) e os registros de remoção.
+    """
+    t0 = datetime(2024, 1, 1)
+    for n, minutes in [(1, 2), (2, 1), (3, 1), (4, 3), (5, 10)]:
+        await repository.update_one(UUID(int=n), {"updated_at": t0 + timedelta(minutes=minutes)})
+    until = t0 + timedelta(minutes=5)
+
+    documents = await repository.find_changed(None, until, 10)
+    assert [d["_id"].int for d in documents] == [2, 3, 1, 4]
+    assert [d["_id"].int for d in await repository.find_changed((t0 + timedelta(minutes=1), UUID(int=2)), until, 2)] == [3, 1]
+    # Sem _id, a data inteira já foi vista
+    assert [d["_id"].int for d in await repository.find_changed((t0 + timedelta(minutes=1), None), until, 10)] == [1, 4]
+
+    await repository.delete_one(UUID(int=4))
+    await repository.insert_tombstones([UUID(int=4)], t0 + timedelta(minutes=4))
+    await repository.insert_tombstones([UUID(int=4)], t0 + timedelta(minutes=4))
+    assert await repository.find_deleted((t0 + timedelta(minutes=3), None), until, 10) == [
+        {"_id": UUID(int=4), "deleted_at": t0 + timedelta(minutes=4)},
+    ]
+    assert await repository.find_deleted(None, t0 + timedelta(minutes=3), 10) == []
@@ -0,0 +1,66 @@
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from src.database import client_options
+from src.repositories.product import MongoProductRepository
+from src.settings import Settings
+from uuid import uuid4
+
+settings = Settings()
+
+@pytest.fixture
+async def mongod():
+    """
+    Cliente para um mongod de verdade (os pipelines de update só são avaliados pelo
+    servidor) e a resposta do 'hello'. Sem servidor disponível, o teste é pulado.
+    """
+    client = AsyncIOMotorClient(settings.DATABASE_URL, **{**client_options(settings), "serverSelectionTimeoutMS": 1000})
+    try:
+        hello = await client.admin.command("hello")
+    except PyMongoError:
+        client.close()
+        pytest.skip("mongod indisponível")
+    yield client, hello
+    client.close()
+
+@pytest.fixture
+async def repository(mongod):
+    """
+    Repositório sobre uma coleção temporária, com três produtos de quantidade 5.
+    """
+    client, _ = mongod
+    collection = client[settings.DB_NAME][f"test_products_{uuid4().hex}"]
+    ids = [uuid4() for _ in range(3)]
+    await collection.insert_many([{"_id": id, "quantity": 5} for id in ids])
+    yield MongoProductRepository(collection), ids
+    await collection.drop()
+
+async def quantities(repository: MongoProductRepository, ids: list) -> list:
+    documents = {d["_id"]: d["quantity"] async for d in repository.collection.find({"_id": {"$in": ids}})}
+    return [documents[id] for id in ids]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transaction", [False, True])
+async def test_reserve_many(mongod, repository, transaction: bool):
+    """
+    Testa a reserva em lote no servidor: aplica tudo quando há estoque e, quando uma
+    linha falha (sem estoque ou produto inexistente), aponta a linha e não deixa nada
+    aplicado, compensando ou abortando a transação.
+    """
+    _, hello = mongod
+    if transaction and "setName" not in hello:
+        pytest.skip("transações exigem um replica set")
+    repository, ids = repository
+    values = {"reserved": True}
+
+    assert await repository.reserve_many([(ids[0], 2), (ids[1], 5)], values, transaction=transaction) is None
+    assert await quantities(repository, ids) == [3, 0, 5]
+
+    assert await repository.reserve_many([(ids[0], 3), (ids[2], 1), (ids[1], 1)], values, transaction=transaction) == 2
+    assert await quantities(repository, ids) == [3, 0, 5]
+
+    # Linhas com estoque depois da falha não mudam o resultado
+    assert await repository.reserve_many([(ids[2], 6), (ids[0], 1)], values, transaction=transaction) == 0
+    assert await repository.reserve_many([(ids[2], 1), (uuid4(), 1), (ids[0], 1)], values, transaction=transaction) == 1
+    assert await quantities(repository, ids) == [3, 0, 5]
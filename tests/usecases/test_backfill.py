@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from src.usecases.backfill import backfill_name_normalized
+
+def create_cursor(documents):
+    """
+    Cria um cursor mockado para 'async for' sobre os documentos.
+    """
+    cursor = MagicMock()
+    cursor.__aiter__.return_value = documents
+    return cursor
+
+@pytest.mark.asyncio
+async def test_backfill_name_normalized():
+    """
+    Testa que os produtos sem 'name_normalized' são atualizados em lotes, sem alterar 'updated_at'.
+    """
+    documents = [{"_id": uuid4(), "name": name} for name in ("Café Torrado", "  Açúcar  Mascavo", "Sal")]
+    collection = MagicMock()
+    collection.find.return_value = create_cursor(documents)
+    collection.bulk_write = AsyncMock(side_effect=lambda operations, **kwargs: MagicMock(modified_count=len(operations)))
+
+    report = await backfill_name_normalized(collection, batch_size=2)
+
+    assert (report.pending, report.updated) == (3, 3)
+    collection.find.assert_called_once_with({"name_normalized": {"$exists": False}}, {"name": 1}, batch_size=2)
+    batches = [call.args[0] for call in collection.bulk_write.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1]
+
+    first = batches[0][0]._doc
+    assert first == {"$set": {"name_normalized": "cafe torrado"}}
+    assert batches[0][0]._filter == {"_id": documents[0]["_id"], "name": "Café Torrado", "name_normalized": {"$exists": False}}
+    assert batches[0][1]._doc == {"$set": {"name_normalized": "acucar mascavo"}}
+
+@pytest.mark.asyncio
+async def test_backfill_name_normalized_check_only():
+    """
+    Testa que o modo check apenas conta os produtos pendentes.
+    """
+    collection = MagicMock()
+    collection.count_documents = AsyncMock(return_value=5)
+    collection.bulk_write = AsyncMock()
+
+    report = await backfill_name_normalized(collection, check_only=True)
+
+    assert (report.pending, report.updated) == (5, 0)
+    collection.bulk_write.assert_not_called()
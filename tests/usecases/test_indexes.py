@@ -0,0 +1,144 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo import ASCENDING, TEXT, IndexModel
+
+from src.usecases.indexes import INDEX_REGISTRY, ensure_indexes
+
+# Fixture para um banco mockado com uma única coleção
+@pytest.fixture
+def mock_database():
+    """
+    Fixtura que retorna um banco mockado cuja coleção já possui alguns índices.
+    """
+    mock_collection = AsyncMock()
+    mock_collection.index_information.return_value = {
+        "_id_": {"key": [("_id", 1)]},
+        "price_1": {"key": [("price", 1.0)]},
+        "updated_at_1": {"key": [("updated_at", -1)]},
+        "name_1": {"key": [("name", 1)]},
+    }
+    mock_db = MagicMock()
+    mock_db.get_collection.return_value = mock_collection
+    return mock_db
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_missing(mock_database):
+    """
+    Testa que a reconciliação cria apenas os índices ausentes e reporta divergentes e não declarados.
+    """
+    reports = await ensure_indexes(mock_database, registry={"products": INDEX_REGISTRY["products"]})
+
+    assert len(reports) == 1
+    report = reports[0]
+    assert report.collection == "products"
+    assert report.created == ["updated_at_1__id_1", "price_1__id_1", "name_normalized_1__id_1", "name_text"]
+    assert report.mismatched == []
+    assert report.undeclared == ["name_1", "updated_at_1"]
+
+    collection = mock_database.get_collection.return_value
+    created_models = collection.create_indexes.call_args.args[0]
+    assert [model.document["name"] for model in created_models] == ["updated_at_1__id_1", "price_1__id_1", "name_normalized_1__id_1", "name_text"]
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_check_only(mock_database):
+    """
+    Testa que o modo check apenas reporta os índices ausentes, sem criá-los.
+    """
+    reports = await ensure_indexes(mock_database, registry={"products": INDEX_REGISTRY["products"]}, check_only=True)
+
+    assert reports[0].missing == ["updated_at_1__id_1", "price_1__id_1", "name_normalized_1__id_1", "name_text"]
+    assert reports[0].created == []
+    mock_database.get_collection.return_value.create_indexes.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_idempotent(mock_database):
+    """
+    Testa que nada é criado quando todos os índices declarados já existem.
+    """
+    registry = {"products": [IndexModel([("price", ASCENDING)], name="price_1")]}
+    reports = await ensure_indexes(mock_database, registry=registry)
+
+    assert reports[0].created == []
+    mock_database.get_collection.return_value.create_indexes.assert_not_called()
+
+def test_index_registry_tombstones_ttl():
+    """
+    Testa que os registros de remoção do feed de mudanças expiram por um índice TTL.
+    """
+    ttl = [model.document for model in INDEX_REGISTRY["product_tombstones"] if "expireAfterSeconds" in model.document]
+    assert len(ttl) == 1
+    assert ttl[0]["key"] == {"deleted_at": ASCENDING}
+
+def test_index_registry_names():
+    """
+    Testa que todo índice do registro tem um nome explícito e único.
+    """
+    for models in INDEX_REGISTRY.values():
+        names = [model.document.get("name") for model in models]
+        assert all(names)
+        assert len(names) == len(set(names))
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_text_index(mock_database):
+    """
+    Testa que um índice de texto existente (devolvido como _fts/_ftsx) não é reportado como divergente.
+    """
+    collection = mock_database.get_collection.return_value
+    collection.index_information.return_value = {
+        "_id_": {"key": [("_id", 1)]},
+        "name_text": {"key": [("_fts", "text"), ("_ftsx", 1)], "weights": {"name": 1}},
+    }
+    registry = {"products": [IndexModel([("name", TEXT)], name="name_text")]}
+    reports = await ensure_indexes(mock_database, registry=registry)
+
+    assert reports[0].mismatched == []
+    assert reports[0].created == []
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_updates_ttl_with_coll_mod(mock_database):
+    """
+    Testa que uma mudança só do expireAfterSeconds é aplicada com collMod (e reportada
+    como pendente no modo check), sem recriar o índice.
+    """
+    mock_database.command = AsyncMock()
+    collection = mock_database.get_collection.return_value
+    collection.index_information.return_value = {
+        "_id_": {"key": [("_id", 1)]},
+        "deleted_at_ttl": {"key": [("deleted_at", 1)], "expireAfterSeconds": 3600.0},
+    }
+    registry = {"product_tombstones": [IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=86400)]}
+
+    reports = await ensure_indexes(mock_database, registry=registry, check_only=True)
+    assert reports[0].mismatched == ["deleted_at_ttl"]
+    mock_database.command.assert_not_called()
+
+    reports = await ensure_indexes(mock_database, registry=registry)
+    assert (reports[0].modified, reports[0].mismatched) == (["deleted_at_ttl"], [])
+    mock_database.command.assert_awaited_once_with("collMod", "product_tombstones", index={"name": "deleted_at_ttl", "expireAfterSeconds": 86400})
+    collection.create_indexes.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_reports_option_mismatch(mock_database):
+    """
+    Testa que opções diferentes que não podem ser ajustadas (idioma do texto, TTL
+    removido) são reportadas como divergentes.
+    """
+    mock_database.command = AsyncMock()
+    collection = mock_database.get_collection.return_value
+    collection.index_information.return_value = {
+        "_id_": {"key": [("_id", 1)]},
+        "name_text": {"key": [("_fts", "text"), ("_ftsx", 1)], "weights": {"name": 1}, "default_language": "english"},
+        "deleted_at_ttl": {"key": [("deleted_at", 1)], "expireAfterSeconds": 3600},
+    }
+    registry = {"products": [
+        IndexModel([("name", TEXT)], name="name_text", default_language="portuguese"),
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl"),
+    ]}
+    reports = await ensure_indexes(mock_database, registry=registry)
+
+    assert reports[0].mismatched == ["name_text", "deleted_at_ttl"]
+    assert reports[0].modified == []
+    mock_database.command.assert_not_called()
@@ -1,10 +1,18 @@
+import asyncio
 import pytest
-from src.schemas.product import ProductIn, ProductOut, ProductUpdate
+from src.schemas.product import ProductIn, ProductOut, ProductUpdate, ProductBulkUpdateItem, ReserveLine
 from src.usecases.product import ProductUsecase
+from src.repositories.memory import InMemoryProductRepository
+from src.core.cache import LRUCache
+from src.core.singleflight import SingleFlight
+from src.core.deadline import deadline, remaining
+from src.core.exceptions import DeadlineExceededException, InsufficientStockException, NotFoundException
 from motor.motor_asyncio import AsyncIOMotorClient
 from uuid import UUID, uuid4
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 
 # Fixture para mockar o cliente MongoDB (não se conecta a um DB real)
 @pytest.fixture
@@ -16,6 +24,9 @@ def mock_mongo_client(mocker):
     mock_collection = AsyncMock() # Usar AsyncMock diretamente para a coleção
     mock_db = MagicMock() # Usar MagicMock para o DB
     mock_db.get_collection.return_value = mock_collection
+    # Coleção dos registros de remoção (feed de mudanças), acessada via collection.database
+    mock_collection.database = MagicMock()
+    mock_collection.database.get_collection.return_value = AsyncMock()
     mock_client = MagicMock() # Usar MagicMock para o cliente
     mock_client.get_database.return_value = mock_db
     return mock_client
@@ -47,38 +58,26 @@ def create_async_mock_cursor(data):
 async def test_create_product_usecase(product_usecase: ProductUsecase, product_in_data: dict, mocker):
     """
     Testa a criação de um produto através do usecase.
+    O produto é devolvido sem reler o banco: apenas o insert_one é executado.
     """
-    # Gerar um UUID para o produto que será "inserido"
-    product_id = uuid4()
-
-    # Mock do insert_one
-    mocker.patch.object(product_usecase.collection, "insert_one", new_callable=AsyncMock, return_value=MagicMock(inserted_id=product_id))
-
-    # Mock do find_one para a recuperação pós-criação
-    # Garante que o _id no mock do DB é um UUID, para corresponder ao ProductOut
-    mock_product_db = {
-        "_id": product_id, # Usar o UUID gerado
-        "name": product_in_data["name"],
-        "quantity": product_in_data["quantity"],
-        "price": product_in_data["price"],
-        "created_at": datetime.now(), # Estes serão sobrescritos no ProductOut
-        "updated_at": datetime.now(), # Estes serão sobrescritos no ProductOut
-    }
-    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=mock_product_db)
+    mocker.patch.object(product_usecase.collection, "insert_one", new_callable=AsyncMock)
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock)
 
     product_created = await product_usecase.create(body=ProductIn(**product_in_data))
 
     assert isinstance(product_created, ProductOut)
-    assert product_created.id == product_id # Comparar com o UUID gerado
     assert product_created.name == product_in_data["name"]
     assert product_created.quantity == product_in_data["quantity"]
     assert product_created.price == product_in_data["price"]
     assert isinstance(product_created.created_at, datetime)
     assert isinstance(product_created.updated_at, datetime)
+    # Datas truncadas em milissegundos, como o MongoDB as armazena
+    assert product_created.created_at.microsecond % 1000 == 0
 
     product_usecase.collection.insert_one.assert_called_once()
-    # A chamada a find_one é feita com o ID gerado internamente pelo usecase
-    product_usecase.collection.find_one.assert_called_once_with({"_id": product_created.id})
+    inserted = product_usecase.collection.insert_one.call_args.args[0]
+    assert inserted["_id"] == product_created.id
+    product_usecase.collection.find_one.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -144,10 +143,12 @@ async def test_get_product_by_id_usecase(product_usecase: ProductUsecase, mocker
 async def test_update_product_usecase(product_usecase: ProductUsecase, mocker, product_in_data: dict):
     """
     Testa a atualização de um produto através do usecase.
+    A atualização é um único find_one_and_update que já devolve o documento atualizado.
     """
     product_id = uuid4() # Usar UUID
     original_product_db = {
         "_id": product_id,
+        "id": product_id,
         "name": "Produto Original",
         "quantity": 10,
         "price": 100.00,
@@ -156,11 +157,9 @@ async def test_update_product_usecase(product_usecase: ProductUsecase, mocker, p
     }
     updated_data = {"name": "Produto Atualizado", "price": 120.00}
 
-    # Mock do find_one para simular que o produto existe antes da atualização
-    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, side_effect=[original_product_db, {**original_product_db, **updated_data, "updated_at": datetime.now()}])
-
-    # Mock do update_one para simular a atualização no banco de dados
-    mocker.patch.object(product_usecase.collection, "update_one", new_callable=AsyncMock, return_value=MagicMock(modified_count=1))
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock)
+    mocker.patch.object(product_usecase.collection, "update_one", new_callable=AsyncMock)
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value={**original_product_db, **updated_data, "updated_at": datetime.now()})
 
     product_update_in = ProductUpdate(**updated_data)
     updated_product = await product_usecase.update(id=product_id, body=product_update_in)
@@ -172,12 +171,17 @@ async def test_update_product_usecase(product_usecase: ProductUsecase, mocker, p
     assert updated_product.quantity == original_product_db["quantity"] # Quantidade não deve mudar
     assert updated_product.updated_at > original_product_db["updated_at"] # updated_at deve ser mais recente
 
-    # Verifica se find_one foi chamado duas vezes
-    assert product_usecase.collection.find_one.call_count == 2
-    product_usecase.collection.update_one.assert_called_once()
-
-    # Teste para produto não encontrado para atualização (re-mock find_one para retornar None)
-    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=None)
+    product_usecase.collection.find_one_and_update.assert_called_once()
+    call = product_usecase.collection.find_one_and_update.call_args
+    assert call.args[0] == {"_id": product_id}
+    assert call.args[1]["$set"]["name"] == updated_data["name"]
+    assert "updated_at" in call.args[1]["$set"]
+    assert call.kwargs["return_document"] == ReturnDocument.AFTER
+    product_usecase.collection.find_one.assert_not_called()
+    product_usecase.collection.update_one.assert_not_called()
+
+    # Teste para produto não encontrado para atualização
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value=None)
     product_not_found = await product_usecase.update(id=uuid4(), body=product_update_in) # Usar um novo UUID
     assert product_not_found is None
 
@@ -198,11 +202,17 @@ async def test_delete_product_usecase(product_usecase: ProductUsecase, mocker):
     assert result is True
     # Apenas assert delete_one foi chamado, pois find_one não é chamado no usecase.delete
     product_usecase.collection.delete_one.assert_called_once_with({"_id": product_id})
+    # A remoção fica registrada para o feed de mudanças
+    tombstones = product_usecase.repository.tombstones
+    operation = tombstones.bulk_write.call_args.args[0][0]
+    assert operation._filter == {"_id": product_id}
 
     # Teste para produto não encontrado para deleção (deleted_count=0)
     mocker.patch.object(product_usecase.collection, "delete_one", new_callable=AsyncMock, return_value=MagicMock(deleted_count=0))
     result_not_found = await product_usecase.delete(id=uuid4()) # Usar um novo UUID
     assert result_not_found is False
+    # Registrada mesmo assim: pode ser a repetição de um delete interrompido
+    assert tombstones.bulk_write.call_count == 2
 
 @pytest.mark.asyncio
 async def test_get_products_by_price_range_usecase(product_usecase: ProductUsecase, mocker):
@@ -256,4 +266,612 @@ async def test_get_products_by_price_range_usecase(product_usecase: ProductUseca
     products = await product_usecase.get_by_price_range()
     assert len(products) == 3
     product_usecase.collection.find.assert_called_once_with({})
-    product_usecase.collection.find.reset_mock()
\ No newline at end of file
+    product_usecase.collection.find.reset_mock()
+
+@pytest.mark.asyncio
+async def test_get_page_products_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa a paginação por keyset do usecase: limit + 1 documentos, próximo cursor e filtro a partir do cursor.
+    """
+    products_db = []
+    for i, price in enumerate([10.00, 20.00, 30.00]):
+        product_id = uuid4()
+        products_db.append({
+            "_id": product_id, "id": product_id,
+            "name": f"Produto {i}", "quantity": 1, "price": price,
+            "created_at": datetime.now(), "updated_at": datetime.now()
+        })
+
+    # find() do Motor é síncrono e devolve um cursor encadeável (sort/limit)
+    mock_cursor_instance = MagicMock()
+    mock_cursor_instance.__aiter__.return_value = products_db
+    mock_cursor_instance.sort.return_value = mock_cursor_instance
+    mock_cursor_instance.limit.return_value = mock_cursor_instance
+    mocker.patch.object(product_usecase.collection, "find", new_callable=MagicMock, return_value=mock_cursor_instance)
+
+    products, next_cursor = await product_usecase.get_page(limit=2, sort_by="price")
+
+    assert [p.name for p in products] == ["Produto 0", "Produto 1"]
+    assert next_cursor is not None
+    product_usecase.collection.find.assert_called_once_with({})
+    mock_cursor_instance.sort.assert_called_once_with([("price", 1), ("_id", 1)])
+    mock_cursor_instance.limit.assert_called_once_with(3)
+
+    # A segunda página filtra a partir do último (price, _id) retornado, sem skip()
+    mock_cursor_instance.__aiter__.return_value = [products_db[2]]
+    product_usecase.collection.find.reset_mock()
+    products, last_cursor = await product_usecase.get_page(limit=2, after=next_cursor, sort_by="price")
+
+    assert [p.name for p in products] == ["Produto 2"]
+    assert last_cursor is None
+    product_usecase.collection.find.assert_called_once_with({"$or": [
+        {"price": {"$gt": 20.00}},
+        {"price": 20.00, "_id": {"$gt": products_db[1]["_id"]}},
+    ]})
+
+
+@pytest.mark.asyncio
+async def test_iter_products_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que o gerador de streaming repassa o batch_size ao cursor e fecha o cursor ao final.
+    """
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id,
+        "name": "Produto A", "quantity": 1, "price": 10.00,
+        "created_at": datetime.now(), "updated_at": datetime.now()
+    }
+    mock_cursor_instance = MagicMock()
+    mock_cursor_instance.__aiter__.return_value = [product_db]
+    mock_cursor_instance.batch_size.return_value = mock_cursor_instance
+    mock_cursor_instance.close = AsyncMock()
+    mocker.patch.object(product_usecase.collection, "find", new_callable=MagicMock, return_value=mock_cursor_instance)
+
+    products = [p async for p in product_usecase.iter_products(min_price=5, batch_size=50)]
+
+    assert [p.name for p in products] == ["Produto A"]
+    product_usecase.collection.find.assert_called_once_with({"price": {"$gte": 5}})
+    mock_cursor_instance.batch_size.assert_called_once_with(50)
+    mock_cursor_instance.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_many_products_usecase(product_usecase: ProductUsecase, mocker, product_in_data: dict):
+    """
+    Testa a criação em lote: insert_many não ordenado por bloco e falhas reportadas por item.
+    """
+    bulk_error = BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key error"}], "nInserted": 1})
+    mocker.patch.object(product_usecase.collection, "insert_many", new_callable=AsyncMock, side_effect=[bulk_error, MagicMock()])
+
+    bodies = [ProductIn(**{**product_in_data, "name": f"Produto {i}"}) for i in range(3)]
+    result = await product_usecase.create_many(bodies=bodies, chunk_size=2)
+
+    assert product_usecase.collection.insert_many.call_count == 2
+    first_chunk = product_usecase.collection.insert_many.call_args_list[0]
+    assert len(first_chunk.args[0]) == 2
+    assert first_chunk.kwargs == {"ordered": False}
+
+    assert result.inserted == 2
+    assert result.failed == 1
+    assert [item.success for item in result.items] == [True, False, True]
+    assert result.items[1].error == "E11000 duplicate key error"
+    assert result.items[2].index == 2
+
+
+@pytest.mark.asyncio
+async def test_delete_records_tombstone_outside_deadline_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que o registro da remoção roda fora do prazo da requisição e termina
+    mesmo que a requisição seja cancelada enquanto ele está em andamento.
+    """
+    recorded = []
+
+    async def bulk_write(operations, **kwargs):
+        await asyncio.sleep(0.05)
+        recorded.append((remaining(), [op._filter for op in operations]))
+
+    mocker.patch.object(product_usecase.collection, "delete_one", new_callable=AsyncMock, return_value=MagicMock(deleted_count=1))
+    tombstones = product_usecase.repository.tombstones
+    tombstones.bulk_write = AsyncMock(side_effect=bulk_write)
+    product_id = uuid4()
+
+    with deadline(5.0):
+        request = asyncio.ensure_future(product_usecase.delete(id=product_id))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+    await asyncio.sleep(0.1)
+    assert recorded == [(None, [{"_id": product_id}])]
+
+
+@pytest.mark.asyncio
+async def test_update_many_products_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa a atualização em lote: um bulk_write por bloco e contagem de IDs ausentes por bloco.
+    """
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=[
+        MagicMock(matched_count=2, modified_count=1),
+        MagicMock(matched_count=0, modified_count=0),
+    ])
+
+    items = [ProductBulkUpdateItem(id=uuid4(), price=float(i)) for i in range(3)]
+    result = await product_usecase.update_many(items=items, chunk_size=2)
+
+    assert product_usecase.collection.bulk_write.call_count == 2
+    first_operations = product_usecase.collection.bulk_write.call_args_list[0].args[0]
+    assert first_operations[0]._filter == {"_id": items[0].id}
+    assert first_operations[0]._doc["$set"]["price"] == 0.0
+    assert "updated_at" in first_operations[0]._doc["$set"]
+
+    assert [(b.matched, b.modified, b.missing) for b in result.batches] == [(2, 1, 0), (0, 0, 1)]
+    assert (result.matched, result.modified, result.missing) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_delete_many_products_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa a deleção em lote via bulk_write.
+    """
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, return_value=MagicMock(deleted_count=1))
+
+    result = await product_usecase.delete_many(ids=[uuid4(), uuid4()])
+
+    product_usecase.collection.bulk_write.assert_called_once()
+    assert (result.matched, result.modified, result.missing) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes_deduplicate_ids_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que IDs repetidos viram uma única operação e não são contados como ausentes.
+    """
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=[
+        MagicMock(matched_count=1, modified_count=1),
+        MagicMock(deleted_count=1),
+    ])
+    product_id = uuid4()
+
+    updated = await product_usecase.update_many(items=[
+        ProductBulkUpdateItem(id=product_id, price=1.0, name="Primeiro"),
+        ProductBulkUpdateItem(id=product_id, price=2.0),
+    ])
+    deleted = await product_usecase.delete_many(ids=[product_id, product_id])
+
+    update_operations, delete_operations = [call.args[0] for call in product_usecase.collection.bulk_write.call_args_list]
+    assert len(update_operations) == len(delete_operations) == 1
+    assert update_operations[0]._doc["$set"]["price"] == 2.0
+    assert update_operations[0]._doc["$set"]["name"] == "Primeiro"
+    assert (updated.matched, updated.missing) == (1, 0)
+    assert (deleted.matched, deleted.missing) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_get_product_by_id_cached_usecase(mock_mongo_client, mocker, product_in_data: dict):
+    """
+    Testa que, com cache, leituras repetidas não vão ao banco e que update/delete invalidam a entrada.
+    """
+    cache = LRUCache(max_size=10, ttl_seconds=60)
+    product_usecase = ProductUsecase(client=mock_mongo_client, cache=cache)
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id, **product_in_data,
+        "created_at": datetime.now(), "updated_at": datetime.now(),
+    }
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=product_db)
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value={**product_db, "price": 1.0})
+
+    first = await product_usecase.get_by_id(id=product_id)
+    second = await product_usecase.get_by_id(id=product_id)
+    assert first == second
+    assert product_usecase.collection.find_one.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    await product_usecase.update(id=product_id, body=ProductUpdate(price=1.0))
+    await product_usecase.get_by_id(id=product_id)
+    assert product_usecase.collection.find_one.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_cache_not_filled_by_read_overlapping_update_usecase(mock_mongo_client, mocker, product_in_data: dict):
+    """
+    Testa que uma leitura iniciada antes de um update, e concluída depois dele,
+    não grava o documento antigo no cache.
+    """
+    cache = LRUCache(max_size=10, ttl_seconds=60)
+    product_usecase = ProductUsecase(client=mock_mongo_client, cache=cache)
+    product_id = uuid4()
+    old_db = {
+        "_id": product_id, "id": product_id, **product_in_data,
+        "created_at": datetime.now(), "updated_at": datetime.now(),
+    }
+    new_db = {**old_db, "price": 1.0}
+    read_started = asyncio.Event()
+    update_done = asyncio.Event()
+
+    async def slow_find_one(*args, **kwargs):
+        # A leitura traz o documento antigo, mas só termina depois do update
+        read_started.set()
+        await update_done.wait()
+        return old_db
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, side_effect=slow_find_one)
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value=new_db)
+
+    pending = asyncio.ensure_future(product_usecase.get_by_id(id=product_id))
+    await read_started.wait()
+    await product_usecase.update(id=product_id, body=ProductUpdate(price=1.0))
+    update_done.set()
+    assert (await pending).price == old_db["price"]
+
+    assert cache.get(product_id) is None
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=new_db)
+    assert (await product_usecase.get_by_id(id=product_id)).price == 1.0
+    assert cache.get(product_id).price == 1.0
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_single_flight_usecase(mock_mongo_client, mocker, product_in_data: dict):
+    """
+    Testa que leituras concorrentes do mesmo produto fazem uma única consulta,
+    e que uma escrita faz a leitura seguinte consultar de novo.
+    """
+    flights = SingleFlight()
+    product_usecase = ProductUsecase(client=mock_mongo_client, flights=flights)
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id, **product_in_data,
+        "created_at": datetime.now(), "updated_at": datetime.now(),
+    }
+
+    async def slow_find_one(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return product_db
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, side_effect=slow_find_one)
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value=product_db)
+
+    results = await asyncio.gather(*(product_usecase.get_by_id(id=product_id) for _ in range(10)))
+    assert all(result.id == product_id for result in results)
+    assert product_usecase.collection.find_one.call_count == 1
+    assert flights.stats()["coalesced"] == 9
+
+    pending = asyncio.ensure_future(product_usecase.get_by_id(id=product_id))
+    await asyncio.sleep(0)
+    await product_usecase.update(id=product_id, body=ProductUpdate(price=1.0))
+    await asyncio.gather(pending, product_usecase.get_by_id(id=product_id))
+    assert product_usecase.collection.find_one.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_version_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que get_version usa uma consulta projetada apenas com updated_at.
+    """
+    product_id = uuid4()
+    updated_at = datetime.now()
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value={"_id": product_id, "updated_at": updated_at})
+
+    assert await product_usecase.get_version(id=product_id) == updated_at
+    product_usecase.collection.find_one.assert_called_once_with({"_id": product_id}, {"updated_at": 1})
+
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=None)
+    assert await product_usecase.get_version(id=uuid4()) is None
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_with_fields_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que '?fields=' vira uma projeção no MongoDB e um schema de saída parcial.
+    """
+    product_id = uuid4()
+    updated_at = datetime.now()
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value={
+        "_id": product_id, "name": "Produto A", "price": 10.0, "updated_at": updated_at,
+    })
+
+    product = await product_usecase.get_by_id(id=product_id, fields=frozenset({"id", "name", "price"}))
+
+    product_usecase.collection.find_one.assert_called_once_with({"_id": product_id}, {"_id": 1, "updated_at": 1, "name": 1, "price": 1})
+    assert product.model_dump() == {"id": product_id, "name": "Produto A", "price": 10.0}
+    assert product.version() == (product_id, updated_at)
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_trusted_reads_usecase(mock_mongo_client, mocker, product_in_data: dict):
+    """
+    Testa que o caminho confiável monta o mesmo ProductOut sem validar o documento.
+    """
+    product_usecase = ProductUsecase(client=mock_mongo_client, trusted_reads=True)
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id, **product_in_data,
+        "created_at": datetime.now(), "updated_at": datetime.now(),
+    }
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=product_db)
+    validate = mocker.spy(ProductOut, "__init__")
+
+    product = await product_usecase.get_by_id(id=product_id)
+
+    assert product == ProductOut(**product_db)
+    assert validate.call_count == 1 # apenas a construção usada na comparação acima
+
+
+@pytest.mark.asyncio
+async def test_get_stats_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que as estatísticas vêm de uma única agregação e que faixas vazias são completadas.
+    """
+    aggregate_result = MagicMock()
+    aggregate_result.__aiter__.return_value = [{
+        "summary": [{"_id": None, "count": 3, "total_quantity": 6, "inventory_value": 70.0,
+                     "price_sum": 40.0, "price_avg": 40.0 / 3, "price_min": 5.0, "price_max": 25.0}],
+        "histogram": [{"_id": 0.0, "count": 1}, {"_id": 20.0, "count": 1}, {"_id": "outside", "count": 1}],
+    }]
+    mocker.patch.object(product_usecase.collection, "aggregate", new_callable=MagicMock, return_value=aggregate_result)
+
+    stats = await product_usecase.get_stats((0.0, 10.0, 20.0, 25.0))
+
+    product_usecase.collection.aggregate.assert_called_once()
+    assert stats.count == 3
+    assert [(b.lower, b.count) for b in stats.histogram] == [(0.0, 1), (10.0, 0), (20.0, 1)]
+    assert stats.outside_histogram == 1
+
+
+@pytest.mark.asyncio
+async def test_get_stats_empty_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa as estatísticas de um catálogo vazio.
+    """
+    aggregate_result = MagicMock()
+    aggregate_result.__aiter__.return_value = [{"summary": [], "histogram": []}]
+    mocker.patch.object(product_usecase.collection, "aggregate", new_callable=MagicMock, return_value=aggregate_result)
+
+    stats = await product_usecase.get_stats((0.0, 10.0))
+
+    assert (stats.count, stats.inventory_value, stats.price_avg) == (0, 0.0, None)
+    assert [b.count for b in stats.histogram] == [0]
+
+
+@pytest.mark.asyncio
+async def test_search_prefix_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que a busca por prefixo usa uma regex ancorada sobre o nome normalizado.
+    """
+    mock_cursor_instance = MagicMock()
+    mock_cursor_instance.__aiter__.return_value = []
+    mock_cursor_instance.sort.return_value = mock_cursor_instance
+    mock_cursor_instance.limit.return_value = mock_cursor_instance
+    mocker.patch.object(product_usecase.collection, "find", new_callable=MagicMock, return_value=mock_cursor_instance)
+
+    assert await product_usecase.search("  Café (Pó)", limit=5) == []
+
+    product_usecase.collection.find.assert_called_once_with({"name_normalized": {"$regex": r"^cafe\ \(po\)"}})
+    mock_cursor_instance.sort.assert_called_once_with([("name_normalized", 1), ("_id", 1)])
+    mock_cursor_instance.limit.assert_called_once_with(5)
+
+
+@pytest.mark.asyncio
+async def test_search_text_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que a busca textual usa $text e ordena pela relevância.
+    """
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id,
+        "name": "Café Torrado", "quantity": 1, "price": 10.00,
+        "created_at": datetime.now(), "updated_at": datetime.now()
+    }
+    mock_cursor_instance = MagicMock()
+    mock_cursor_instance.__aiter__.return_value = [product_db]
+    mock_cursor_instance.sort.return_value = mock_cursor_instance
+    mock_cursor_instance.limit.return_value = mock_cursor_instance
+    mocker.patch.object(product_usecase.collection, "find", new_callable=MagicMock, return_value=mock_cursor_instance)
+
+    products = await product_usecase.search("café", mode="text", limit=10)
+
+    assert [p.id for p in products] == [product_id]
+    product_usecase.collection.find.assert_called_once_with({"$text": {"$search": "café"}})
+    mock_cursor_instance.sort.assert_called_once_with([("score", {"$meta": "textScore"})])
+
+
+@pytest.mark.asyncio
+async def test_reserve_usecase(product_usecase: ProductUsecase, mocker, product_in_data: dict):
+    """
+    Testa que a reserva é um único find_one_and_update com $inc e condição de estoque no filtro.
+    """
+    product_id = uuid4()
+    product_db = {
+        "_id": product_id, "id": product_id, **product_in_data, "quantity": 7,
+        "created_at": datetime.now(), "updated_at": datetime.now(),
+    }
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value=product_db)
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock)
+
+    product = await product_usecase.reserve(id=product_id, quantity=3)
+
+    assert product.quantity == 7
+    query, update = product_usecase.collection.find_one_and_update.call_args.args
+    assert query == {"_id": product_id, "quantity": {"$gte": 3}}
+    assert update["$inc"] == {"quantity": -3}
+    assert product_usecase.collection.find_one_and_update.call_args.kwargs["return_document"] == ReturnDocument.AFTER
+    product_usecase.collection.find_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reserve_insufficient_stock_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que uma reserva sem estoque levanta InsufficientStockException e uma sem produto retorna None.
+    """
+    product_id = uuid4()
+    mocker.patch.object(product_usecase.collection, "find_one_and_update", new_callable=AsyncMock, return_value=None)
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, side_effect=[{"_id": product_id, "quantity": 2}, None])
+
+    with pytest.raises(InsufficientStockException):
+        await product_usecase.reserve(id=product_id, quantity=3)
+    assert await product_usecase.reserve(id=product_id, quantity=3) is None
+
+
+@pytest.mark.asyncio
+async def test_reserve_batch_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que a reserva em lote é um único bulk_write ordenado quando todas as linhas têm estoque.
+    """
+    lines = [ReserveLine(id=uuid4(), quantity=2), ReserveLine(id=uuid4(), quantity=3)]
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, return_value=MagicMock(matched_count=2))
+
+    result = await product_usecase.reserve_batch(lines)
+
+    assert (result.reserved, result.units) == (2, 5)
+    product_usecase.collection.bulk_write.assert_awaited_once()
+    operations = product_usecase.collection.bulk_write.call_args.args[0]
+    assert [op._filter for op in operations] == [{"_id": line.id} for line in lines]
+    assert product_usecase.collection.bulk_write.call_args.kwargs["ordered"] is True
+
+
+@pytest.mark.asyncio
+async def test_reserve_batch_compensates_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que, quando uma linha falha, as linhas anteriores são devolvidas ao estoque.
+    """
+    lines = [ReserveLine(id=uuid4(), quantity=2), ReserveLine(id=uuid4(), quantity=3), ReserveLine(id=uuid4(), quantity=1)]
+    bulk_error = BulkWriteError({"writeErrors": [{"index": 1, "code": 241, "errmsg": "Failed to parse number 'insufficient stock: 1'"}], "nMatched": 1})
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=[bulk_error, MagicMock()])
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value={"_id": lines[1].id, "quantity": 1})
+
+    with pytest.raises(InsufficientStockException) as exc_info:
+        await product_usecase.reserve_batch(lines)
+
+    assert "(item 1): requested 3, available 1" in exc_info.value.message
+    compensation = product_usecase.collection.bulk_write.call_args_list[1].args[0]
+    assert [(op._filter, op._doc["$inc"]) for op in compensation] == [({"_id": lines[0].id}, {"quantity": 2})]
+
+
+@pytest.mark.asyncio
+async def test_reserve_batch_compensation_outside_deadline_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que a compensação roda fora do prazo da requisição e termina mesmo
+    que a requisição seja cancelada enquanto ela está em andamento.
+    """
+    lines = [ReserveLine(id=uuid4(), quantity=2), ReserveLine(id=uuid4(), quantity=3)]
+    bulk_error = BulkWriteError({"writeErrors": [{"index": 1, "code": 241, "errmsg": "Failed to parse number 'insufficient stock: 1'"}], "nMatched": 1})
+    compensated = []
+
+    async def bulk_write(operations, **kwargs):
+        if kwargs.get("ordered"):
+            raise bulk_error
+        await asyncio.sleep(0.05)
+        compensated.append((remaining(), [op._filter for op in operations]))
+
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=bulk_write)
+
+    with deadline(5.0):
+        request = asyncio.ensure_future(product_usecase.reserve_batch(lines))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+    await asyncio.sleep(0.1)
+    assert compensated == [(None, [{"_id": lines[0].id}])]
+
+
+@pytest.mark.asyncio
+async def test_reserve_batch_other_write_errors_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que erros que não são falta de estoque (outro código, só write concern)
+    desfazem as linhas executadas e seguem adiante em vez de virar 409.
+    """
+    lines = [ReserveLine(id=uuid4(), quantity=2), ReserveLine(id=uuid4(), quantity=3)]
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock)
+    validation_error = BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}], "nMatched": 1})
+    write_concern_error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}], "nMatched": 2})
+
+    for error, undone in ((validation_error, lines[:1]), (write_concern_error, lines)):
+        mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=[error, MagicMock()])
+        with pytest.raises(BulkWriteError):
+            await product_usecase.reserve_batch(lines)
+        compensation = product_usecase.collection.bulk_write.call_args_list[1].args[0]
+        assert [op._filter for op in compensation] == [{"_id": line.id} for line in undone]
+
+    product_usecase.collection.find_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reserve_batch_transaction_aborts_before_lookup_usecase(product_usecase: ProductUsecase, mocker):
+    """
+    Testa que, com transação, a falha aborta a transação antes de procurar o produto
+    inexistente, e que essa busca é feita fora da sessão (já abortada pelo servidor).
+    """
+    lines = [ReserveLine(id=uuid4(), quantity=2), ReserveLine(id=uuid4(), quantity=3)]
+    events = []
+    session = MagicMock()
+    session.abort_transaction = AsyncMock(side_effect=lambda: events.append("abort"))
+    session.end_session = AsyncMock()
+    client = product_usecase.collection.database.client
+    client.start_session = AsyncMock(return_value=session)
+    bulk_error = BulkWriteError({"writeErrors": [{"index": 1, "code": 241, "errmsg": "Failed to parse number 'insufficient stock: 1'"}], "nMatched": 0})
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=bulk_error)
+
+    def find(*args, **kwargs):
+        events.append(("find", kwargs.get("session")))
+        return create_async_mock_cursor([])
+    mocker.patch.object(product_usecase.collection, "find", new_callable=MagicMock, side_effect=find)
+    mocker.patch.object(product_usecase.collection, "find_one", new_callable=AsyncMock, return_value=None)
+
+    with pytest.raises(NotFoundException) as exc_info:
+        await product_usecase.reserve_batch(lines, transaction=True)
+
+    assert "(item 0)" in exc_info.value.message
+    assert events == ["abort", ("find", None)]
+    session.commit_transaction.assert_not_called()
+    product_usecase.collection.bulk_write.assert_awaited_once()
+    session.end_session.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes_use_chunk_deadline_usecase(product_usecase: ProductUsecase, mocker, product_in_data: dict):
+    """
+    Testa que cada bloco das escritas em lote tem o próprio prazo ('chunk_timeout')
+    no lugar do prazo total da requisição: com ele vencido, os blocos ainda são
+    enviados e o resultado de cada um é devolvido.
+    """
+    budgets = []
+
+    async def insert_many(documents, **kwargs):
+        budgets.append(remaining())
+
+    async def bulk_write(operations, **kwargs):
+        budgets.append(remaining())
+        return MagicMock(matched_count=len(operations), modified_count=len(operations), deleted_count=len(operations))
+
+    mocker.patch.object(product_usecase.collection, "insert_many", new_callable=AsyncMock, side_effect=insert_many)
+    mocker.patch.object(product_usecase.collection, "bulk_write", new_callable=AsyncMock, side_effect=bulk_write)
+
+    with deadline(0.001):
+        await asyncio.sleep(0.002)
+        created = await product_usecase.create_many([ProductIn(**product_in_data)] * 3, chunk_size=2, chunk_timeout=5.0)
+        updated = await product_usecase.update_many([ProductBulkUpdateItem(id=uuid4(), price=1.0)], chunk_timeout=5.0)
+        deleted = await product_usecase.delete_many([uuid4()], chunk_timeout=5.0)
+        with pytest.raises(DeadlineExceededException):
+            await product_usecase.update_many([ProductBulkUpdateItem(id=uuid4(), price=1.0)], chunk_timeout=-1)
+
+    assert created.inserted == 3
+    assert (updated.matched, deleted.matched) == (1, 1)
+    # Dois blocos de criação, a atualização e a deleção (sem o registro da remoção, fora do prazo)
+    assert len(budgets) == 4
+    assert all(4.9 < budget <= 5.0 for budget in budgets)
+
+
+@pytest.mark.asyncio
+async def test_iter_products_ignores_request_deadline_usecase(product_in_data: dict):
+    """
+    Testa que o streaming não é cortado pelo prazo total da requisição (os headers
+    já foram enviados): cada leitura do cursor tem o próprio prazo de lote.
+    """
+    now = datetime.now()
+    ids = [uuid4() for _ in range(5)]
+    documents = [{"_id": id, "id": id, **product_in_data, "created_at": now, "updated_at": now} for id in ids]
+    product_usecase = ProductUsecase(repository=InMemoryProductRepository(documents))
+
+    with deadline(0.001):
+        await asyncio.sleep(0.002)
+        products = [product async for product in product_usecase.iter_products(batch_size=2, batch_timeout=1.0)]
+    assert sorted(product.id for product in products) == sorted(ids)
@@ -0,0 +1,251 @@
+import asyncio
+import threading
+
+import pytest
+from src.core.deadline import deadline, remaining
+from src.repositories.memory import InMemoryProductRepository
+from src.usecases.product import ProductUsecase
+from src.usecases.quantity_buffer import QuantityBuffer, QuantityJournal
+from uuid import UUID
+from datetime import datetime
+
+def make_document(n: int, quantity: int) -> dict:
+    now = datetime.now()
+    return {
+        "_id": UUID(int=n), "id": UUID(int=n),
+        "name": f"Produto {n}", "quantity": quantity, "price": 10.0,
+        "created_at": now, "updated_at": now,
+    }
+
+@pytest.fixture
+def repository():
+    return InMemoryProductRepository([make_document(1, 100), make_document(2, 50)])
+
+class FailingUsecase:
+    """
+    Usecase que falha na primeira gravação e delega ao real nas seguintes.
+    """
+    def __init__(self, usecase: ProductUsecase):
+        self.usecase = usecase
+        self.calls = 0
+
+    async def apply_quantity_deltas(self, deltas, node, epoch):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("network")
+        return await self.usecase.apply_quantity_deltas(deltas, node, epoch)
+
+
+@pytest.mark.asyncio
+async def test_buffer_coalesces_deltas(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa que vários ajustes do mesmo produto viram um único incremento na gravação.
+    """
+    buffer = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await buffer.start(ProductUsecase(repository=repository))
+
+    assert buffer.add(UUID(int=1), 5) == 5
+    assert buffer.add(UUID(int=1), -2) == 3
+    buffer.add(UUID(int=2), 7)
+    buffer.add(UUID(int=99), 1)  # produto inexistente: descartado na gravação
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 100
+
+    assert await buffer.flush() == 2
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 103
+    assert (await repository.find_one(UUID(int=2)))["quantity"] == 57
+
+    await buffer.stop()
+    stats = buffer.stats()
+    assert stats["adjustments"] == 4
+    assert stats["flushes"] == 1
+    assert stats["pending_units"] == 0
+
+@pytest.mark.asyncio
+async def test_bulk_increment_is_idempotent(repository: InMemoryProductRepository):
+    """
+    Testa que reaplicar o mesmo (node, epoch) não soma de novo.
+    """
+    usecase = ProductUsecase(repository=repository)
+    assert await usecase.apply_quantity_deltas([(UUID(int=1), 10)], "node-a", 5) == 1
+    assert await usecase.apply_quantity_deltas([(UUID(int=1), 10)], "node-a", 5) == 0
+    assert await usecase.apply_quantity_deltas([(UUID(int=1), 10)], "node-b", 5) == 1
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 120
+
+@pytest.mark.asyncio
+async def test_buffer_retries_failed_flush(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa que um lote que falhou é repetido com o mesmo epoch, junto dos ajustes novos.
+    """
+    buffer = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await buffer.start(FailingUsecase(ProductUsecase(repository=repository)))
+
+    buffer.add(UUID(int=1), 5)
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert buffer.stats()["unconfirmed_flushes"] == 1
+
+    buffer.add(UUID(int=1), 1)
+    await buffer.flush()
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 106
+    assert buffer.stats()["failures"] == 1
+    assert buffer.stats()["unconfirmed_flushes"] == 0
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_journal_recovers_after_crash(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa a recuperação do journal: ajustes não gravados e um lote sem confirmação
+    (gravado ou não antes da queda) são aplicados uma única vez no reinício.
+    """
+    usecase = ProductUsecase(repository=repository)
+    crashed = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    crashed.usecase = usecase
+    crashed.node, crashed._last_epoch, _, _ = crashed.journal.open()
+
+    # Lote aplicado no banco, mas o processo cai antes de registrar a confirmação
+    crashed.add(UUID(int=1), 4)
+    epoch = crashed._next_epoch()
+    crashed.journal.flush_started(epoch, [(UUID(int=1), 4)])
+    await usecase.apply_quantity_deltas([(UUID(int=1), 4)], crashed.node, epoch)
+    crashed._pending.clear()
+    # Ajuste recebido depois, ainda só no journal
+    crashed.add(UUID(int=2), -3)
+    crashed.journal.close()
+
+    recovered = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await recovered.start(usecase)
+    await recovered.stop()
+
+    assert recovered.node == crashed.node
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 104
+    assert (await repository.find_one(UUID(int=2)))["quantity"] == 47
+
+    # Depois de um desligamento limpo, não sobra nada para recuperar
+    again = QuantityJournal(str(tmp_path))
+    node, last_epoch, pending, unconfirmed = again.open()
+    again.close()
+    assert node == crashed.node and last_epoch == recovered._last_epoch > epoch
+    assert pending == {} and unconfirmed == []
+
+@pytest.mark.asyncio
+async def test_journal_keeps_node_and_epoch_across_restarts(repository: InMemoryProductRepository, tmp_path, monkeypatch):
+    """
+    Testa que o node e o epoch vêm do journal: um reinício (mesmo com o relógio
+    atrasado) continua o mesmo node e não reutiliza epochs já gravados nos produtos.
+    """
+    usecase = ProductUsecase(repository=repository)
+    first = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await first.start(usecase)
+    first.add(UUID(int=1), 1)
+    await first.flush()
+    first.add(UUID(int=1), 1)
+    await first.stop()
+
+    monkeypatch.setattr("time.time_ns", lambda: 0)
+    second = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await second.start(usecase)
+    second.add(UUID(int=1), 1)
+    await second.flush()
+    await second.stop()
+
+    document = await repository.find_one(UUID(int=1))
+    assert document["quantity"] == 103
+    assert list(document["quantity_epochs"]) == [first.node]
+    assert second.node == first.node
+    assert document["quantity_epochs"][first.node] == 3
+
+@pytest.mark.asyncio
+async def test_flush_without_pending_work_keeps_journal(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa que um flush sem nada pendente não reescreve o journal.
+    """
+    buffer = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=QuantityJournal(str(tmp_path)))
+    await buffer.start(ProductUsecase(repository=repository))
+    journal_file = buffer.journal._file
+
+    assert await buffer.flush() == 0
+    assert buffer.journal._file is journal_file
+    await buffer.stop()
+
+def test_journal_lock_survives_compaction(tmp_path):
+    """
+    Testa que a trava do journal continua valendo depois da compactação (que troca
+    o arquivo do journal): outro worker pega o próximo arquivo livre.
+    """
+    first = QuantityJournal(str(tmp_path))
+    node, _, _, _ = first.open()
+    first.rewrite(node, 1, {UUID(int=1): 2})
+    first.rewrite(node, 2, {})
+
+    second = QuantityJournal(str(tmp_path))
+    second.open()
+    assert first.path.endswith("quantity-0.journal")
+    assert second.path.endswith("quantity-1.journal")
+
+    first.close()
+    third = QuantityJournal(str(tmp_path))
+    assert third.open()[0] == node
+    second.close()
+    third.close()
+
+@pytest.mark.asyncio
+async def test_threshold_flush_runs_outside_request(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa que o flush disparado por max_pending não herda o prazo da requisição
+    e que ajustes seguidos não disparam flushes repetidos.
+    """
+    usecase = ProductUsecase(repository=repository)
+    budgets = []
+
+    class RecordingUsecase:
+        async def apply_quantity_deltas(self, deltas, node, epoch):
+            budgets.append(remaining())
+            return await usecase.apply_quantity_deltas(deltas, node, epoch)
+
+    buffer = QuantityBuffer(flush_interval=60, max_pending=5, journal=QuantityJournal(str(tmp_path)))
+    await buffer.start(RecordingUsecase())
+    with deadline(0.5):
+        buffer.add(UUID(int=1), 5)
+        buffer.add(UUID(int=1), 5)
+    flush_task = buffer._flush_task
+    await flush_task
+
+    assert budgets == [None]
+    assert (await repository.find_one(UUID(int=1)))["quantity"] == 110
+    await buffer.stop()
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_deltas_received_meanwhile(repository: InMemoryProductRepository, tmp_path):
+    """
+    Testa que um ajuste recebido enquanto o journal é compactado (em uma thread)
+    continua no journal depois da troca de arquivos.
+    """
+    journal = QuantityJournal(str(tmp_path))
+    buffer = QuantityBuffer(flush_interval=60, max_pending=10_000, journal=journal)
+    await buffer.start(ProductUsecase(repository=repository))
+
+    started, release = threading.Event(), threading.Event()
+    write_file = journal._write_file
+
+    def slow_write_file(path, data):
+        started.set()
+        release.wait(5)
+        return write_file(path, data)
+
+    journal._write_file = slow_write_file
+    buffer.add(UUID(int=1), 5)
+    flush = asyncio.ensure_future(buffer.flush())
+    while not started.is_set():
+        await asyncio.sleep(0.001)
+    buffer.add(UUID(int=2), 3)
+    release.set()
+    await flush
+    # Queda: o ajuste novo não chega a ser gravado no banco
+    buffer._task.cancel()
+    journal.close()
+
+    recovered = QuantityJournal(str(tmp_path))
+    _, _, pending, unconfirmed = recovered.open()
+    recovered.close()
+    assert pending == {UUID(int=2): 3}
+    assert unconfirmed == []